@@ -0,0 +1,36 @@
+"""Benchmark ELO rating calculations as seasons are added to the match history"""
+
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from scripts.benchmarks.helpers import team_match_data, timed
+from server.data_processors.feature_functions import add_elo_rating
+
+SEASON_COUNTS = [5, 10, 20, 30, 40, 52]
+
+
+def main():
+    """Time add_elo_rating for increasingly long match histories"""
+
+    data_frame = team_match_data()
+    first_year = data_frame["year"].min()
+
+    print("seasons\trows\tseconds\tms per season")
+
+    for season_count in SEASON_COUNTS:
+        season_data_frame = data_frame[data_frame["year"] < first_year + season_count]
+        elapsed_time, _ = timed(add_elo_rating, season_data_frame)
+
+        print(
+            f"{season_count}\t{len(season_data_frame)}\t{elapsed_time:.3f}\t"
+            f"{elapsed_time * 1000 / season_count:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
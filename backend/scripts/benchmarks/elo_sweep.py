@@ -0,0 +1,41 @@
+"""Benchmark ELO parameter sweeps as the parameter grid grows"""
+
+import os
+import sys
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from scripts.benchmarks.helpers import team_match_data, timed
+from server.data_processors.feature_functions import add_elo_rating
+from server.data_processors.elo_sweep import elo_param_grid, sweep_elo_ratings
+
+GRID_SIZES = [1, 10, 100, 1000]
+
+
+def main():
+    """Time sweep_elo_ratings for increasingly large grids of K values"""
+
+    data_frame = team_match_data()
+    elapsed_time, _ = timed(add_elo_rating, data_frame)
+
+    print(f"add_elo_rating: {elapsed_time:.3f} seconds")
+    print("params\tseconds\tbest accuracy")
+
+    for grid_size in GRID_SIZES:
+        elo_params = elo_param_grid(k=list(np.linspace(10, 60, grid_size)))
+        elapsed_time, (_, param_accuracy) = timed(
+            sweep_elo_ratings, data_frame, elo_params
+        )
+
+        print(
+            f"{grid_size}\t{elapsed_time:.3f}\t"
+            f"{param_accuracy['accuracy'].max():.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
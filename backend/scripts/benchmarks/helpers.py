@@ -0,0 +1,61 @@
+"""Helper functions for loading benchmark data"""
+
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple, Any
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from project.settings.common import DATA_DIR
+from server.data_processors import TeamDataStacker
+
+MATCH_COL_TRANSLATIONS = {"season": "year", "round": "round_number"}
+
+
+def team_match_data(start_year: int = 0, end_year: int = 3000) -> pd.DataFrame:
+    """Load footywire match results as a team-match data frame"""
+
+    match_data_frame = (
+        pd.read_csv(os.path.join(DATA_DIR, "ft_match_list.csv"), parse_dates=["date"])
+        .rename(columns=MATCH_COL_TRANSLATIONS)
+        .drop(["crowd", "round_label"], axis=1)
+        .astype({"round_number": int, "home_score": int, "away_score": int})
+    )
+    match_data_frame = match_data_frame[
+        (match_data_frame["year"] >= start_year)
+        & (match_data_frame["year"] <= end_year)
+    ]
+
+    return TeamDataStacker().transform(match_data_frame)
+
+
+def timed(func: Callable, *args, **kwargs) -> Tuple[float, Any]:
+    """Run the function, returning the elapsed wall time and the function's result"""
+
+    start_time = time.perf_counter()
+    result = func(*args, **kwargs)
+
+    return time.perf_counter() - start_time, result
+
+
+def traced(func: Callable, *args, **kwargs) -> Tuple[float, float, Any]:
+    """
+    Run the function, returning the elapsed wall time, the peak memory allocated
+    while it ran (in MB) and the function's result
+    """
+
+    tracemalloc.start()
+
+    try:
+        elapsed_time, result = timed(func, *args, **kwargs)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return elapsed_time, peak_memory / 1e6, result
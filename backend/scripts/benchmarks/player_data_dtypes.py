@@ -0,0 +1,39 @@
+"""Compare memory used by PlayerModelData's data with & without compact dtypes"""
+
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from server.data_processors.dtype_policy import compact_dtypes, memory_report
+from server.ml_models.player_model import PlayerModelData
+from server.ml_models.player_model.player_model import DATA_TRANSFORMERS
+
+
+def main():
+    """
+    Build PlayerModelData with its default data transformers and without
+    compact_dtypes, then print the memory that each data frame uses by dtype (in MB)
+    """
+
+    uncompacted_data = PlayerModelData(
+        data_transformers=[
+            data_transformer
+            for data_transformer in DATA_TRANSFORMERS
+            if data_transformer is not compact_dtypes
+        ]
+    ).data
+    compact_data = PlayerModelData().data
+
+    print(
+        memory_report({"before": uncompacted_data, "after": compact_data})
+        .round(2)
+        .to_string()
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark win streak calculations on increasingly large sets of team-matches"""
+
+import os
+import sys
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from scripts.benchmarks.helpers import team_match_data, timed
+from server.data_processors.feature_functions import (
+    add_result,
+    add_shifted_team_features,
+    add_win_streak,
+)
+
+# Number of copies of the match history, with each copy's teams renamed
+# to simulate larger data sets (e.g. player-aggregated data)
+HISTORY_COPIES = [1, 2, 4, 8, 16]
+
+
+def main():
+    """Time add_win_streak and report rows processed per second"""
+
+    data_frame = add_shifted_team_features(shift_columns=["result"])(
+        add_result(team_match_data())
+    )
+
+    print("rows\tseconds\trows per second")
+
+    for history_copies in HISTORY_COPIES:
+        copied_data_frame = pd.concat(
+            [
+                data_frame.assign(team=data_frame["team"] + str(copy_idx))
+                for copy_idx in range(history_copies)
+            ]
+        ).set_index(["team", "year", "round_number"], drop=False)
+        elapsed_time, _ = timed(add_win_streak, copied_data_frame)
+
+        print(
+            f"{len(copied_data_frame)}\t{elapsed_time:.3f}\t"
+            f"{len(copied_data_frame) / elapsed_time:,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Script for saving teams' end-of-round states (ELO ratings, ladder stats, etc.),
+so features for new rounds can be calculated without the full match history.
+Run it after each round to add states for any newly-played rounds.
+"""
+
+import os
+import sys
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from project.settings.common import DATA_DIR
+from server.data_readers import FitzroyDataReader
+from server.data_processors import TeamDataStacker
+from server.data_processors.team_states import (
+    team_round_states,
+    update_team_round_states,
+)
+from server.ml_models.match_model.match_model import COL_TRANSLATIONS
+
+TEAM_STATES_FILEPATH = os.path.join(DATA_DIR, "team_round_states.pkl")
+
+
+def team_match_data() -> pd.DataFrame:
+    """Load played matches as team-match data"""
+
+    data_frame = (
+        FitzroyDataReader()
+        .match_results(fetch_data=True)
+        .rename(columns=COL_TRANSLATIONS)
+        .astype({"year": int})
+    )
+
+    # Same round-robin rounds that are dropped from MatchModelData
+    data_frame = data_frame[
+        ((data_frame["year"] != 1897) | (data_frame["round_number"] != 15))
+        & ((data_frame["year"] != 1924) | (data_frame["round_number"] != 19))
+    ]
+
+    return TeamDataStacker().transform(data_frame)
+
+
+def main():
+    """Calculate states for rounds that haven't been saved yet"""
+
+    data_frame = team_match_data()
+
+    if not os.path.isfile(TEAM_STATES_FILEPATH):
+        team_round_states(data_frame).to_pickle(TEAM_STATES_FILEPATH)
+        return None
+
+    team_states = pd.read_pickle(TEAM_STATES_FILEPATH)
+    latest_year, latest_round_number = max(
+        zip(team_states["year"], team_states["round_number"])
+    )
+    new_data_frame = data_frame[
+        (data_frame["year"] > latest_year)
+        | (
+            (data_frame["year"] == latest_year)
+            & (data_frame["round_number"] > latest_round_number)
+        )
+    ]
+
+    if not new_data_frame.empty:
+        update_team_round_states(team_states, new_data_frame).to_pickle(
+            TEAM_STATES_FILEPATH
+        )
+
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Module for adding feature columns to data frames without copying them.
+
+DataFrame.assign and pd.concat copy every existing column to add new ones,
+so a chain of feature functions copies the full data frame at every step.
+Inside active_column_builder, add_columns inserts new columns into a data frame
+that the builder owns instead, which leaves the existing columns where they are,
+and the builder materializes the final data frame once at the end. Feature functions
+that reorder rows copy the data frame anyway, so reorder_rows overwrites columns
+in that copy, which then becomes the builder's data frame.
+"""
+
+from typing import Dict, List, Any
+from contextlib import contextmanager
+import pandas as pd
+import numpy as np
+
+
+class ColumnBuilder:
+    """Data frame that feature columns get added to in place.
+
+    Args:
+        data_frame (pandas.DataFrame): Data frame to add columns to. The builder
+            takes ownership of it, so it mustn't be used outside of the builder.
+
+    Attributes:
+        data_frame (pandas.DataFrame): The builder's current data frame.
+        added_columns (list): Labels of the columns added in place.
+        copies (int): Number of times the builder had to copy a data frame
+            to take ownership of it.
+    """
+
+    def __init__(self, data_frame: pd.DataFrame) -> None:
+        self.data_frame = data_frame
+        self.added_columns: List[str] = []
+        self.copies = 0
+
+    def owns(self, data_frame: pd.DataFrame) -> bool:
+        """Whether the data frame is the builder's own (i.e. safe to add columns to)"""
+
+        return data_frame is self.data_frame
+
+    def add_columns(self, data_frame: pd.DataFrame, **columns: Any) -> pd.DataFrame:
+        """
+        Add the columns to the data frame, aligning them on the index like
+        DataFrame.assign. Data frames that the builder doesn't own, or that would
+        have existing columns overwritten, get copied first, and the copy becomes
+        the builder's data frame.
+        """
+
+        overwrites_columns = any([label in data_frame.columns for label in columns])
+
+        if not self.owns(data_frame) or overwrites_columns:
+            self.data_frame = data_frame.assign(**columns)
+            self.copies += 1
+
+            return self.data_frame
+
+        # Inserting a column adds it to the data frame's internal blocks
+        # without copying any of the existing ones
+        for label, values in columns.items():
+            data_frame[label] = values
+
+        self.added_columns.extend(columns.keys())
+
+        return data_frame
+
+    def drop_columns(self, data_frame: pd.DataFrame, *labels: str) -> pd.DataFrame:
+        """
+        Drop the columns from the data frame like DataFrame.drop, deleting them
+        in place if the builder owns it. Other data frames get copied without
+        the columns, and the copy becomes the builder's data frame.
+        """
+
+        if not self.owns(data_frame):
+            self.data_frame = data_frame.drop(list(labels), axis=1)
+            self.copies += 1
+
+            return self.data_frame
+
+        # Deleting a column only copies the remaining columns of its own block
+        for label in labels:
+            del data_frame[label]
+
+        return data_frame
+
+    def reorder_rows(
+        self, data_frame: pd.DataFrame, rows: np.ndarray, **columns: Any
+    ) -> pd.DataFrame:
+        """
+        Take the data frame's rows in the given order, overwriting the given columns
+        with values in the new row order. The reordered data frame is a copy anyway,
+        so the columns get overwritten in place, and the copy becomes
+        the builder's data frame.
+        """
+
+        self.data_frame = _reorder_rows(data_frame, rows, columns)
+        self.copies += 1
+        self.added_columns.extend(columns.keys())
+
+        return self.data_frame
+
+    def materialize(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Finish building the data frame. Columns added in place are stored
+        separately, so the builder's own data frame gets consolidated into
+        a new one with each dtype's columns stored together.
+        """
+
+        if not self.owns(data_frame) or not any(self.added_columns):
+            return data_frame
+
+        return data_frame.copy()
+
+
+def _reorder_rows(
+    data_frame: pd.DataFrame, rows: np.ndarray, columns: Dict[str, Any]
+) -> pd.DataFrame:
+    reordered_data_frame = data_frame.take(rows)
+
+    # Nothing else shares the taken rows' values, so overwriting them is safe
+    for label, values in columns.items():
+        reordered_data_frame[label] = values
+
+    return reordered_data_frame
+
+
+_ACTIVE_BUILDERS: List[ColumnBuilder] = []
+
+
+@contextmanager
+def active_column_builder(data_frame: pd.DataFrame):
+    """
+    Add columns in place via add_columns inside the context, starting with
+    the given data frame, which must not be used outside of the context.
+    """
+
+    builder = ColumnBuilder(data_frame)
+    _ACTIVE_BUILDERS.append(builder)
+
+    try:
+        yield builder
+    finally:
+        _ACTIVE_BUILDERS.remove(builder)
+
+
+def add_columns(data_frame: pd.DataFrame, **columns: Any) -> pd.DataFrame:
+    """
+    Add columns to a data frame like DataFrame.assign, but in place if the data frame
+    belongs to the active ColumnBuilder. Callers must use the returned data frame.
+    """
+
+    if not any(_ACTIVE_BUILDERS):
+        return data_frame.assign(**columns)
+
+    return _ACTIVE_BUILDERS[-1].add_columns(data_frame, **columns)
+
+
+def drop_columns(data_frame: pd.DataFrame, *labels: str) -> pd.DataFrame:
+    """
+    Drop columns from a data frame like DataFrame.drop, but in place if the data frame
+    belongs to the active ColumnBuilder. Callers must use the returned data frame.
+    """
+
+    if not any(_ACTIVE_BUILDERS):
+        return data_frame.drop(list(labels), axis=1)
+
+    return _ACTIVE_BUILDERS[-1].drop_columns(data_frame, *labels)
+
+
+def reorder_rows(
+    data_frame: pd.DataFrame, rows: np.ndarray, **columns: Any
+) -> pd.DataFrame:
+    """
+    Take a data frame's rows in the given order (like DataFrame.take), with the given
+    columns overwritten or added with values in the new row order, copying the data
+    frame only once. Inside an active ColumnBuilder, the reordered data frame becomes
+    the builder's own, so callers must use the returned data frame.
+    """
+
+    if not any(_ACTIVE_BUILDERS):
+        return _reorder_rows(data_frame, rows, columns)
+
+    return _ACTIVE_BUILDERS[-1].reorder_rows(data_frame, rows, **columns)
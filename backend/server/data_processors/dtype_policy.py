@@ -0,0 +1,196 @@
+"""Module for keeping model data in compact dtypes.
+
+Team, venue & round type names repeat on every row, so they're stored as pandas
+categoricals with the fixed category sets from data_config (plus any unexpected
+values, so they don't get lost), and player names & IDs as categoricals of
+the values given. Numeric columns get downcast to the smallest dtype that holds
+their values exactly. Transformers keep categoricals as they are, so applying
+the policy to the raw data carries it through the whole pipeline. Keys made up
+of several integer columns (e.g. player-match IDs) can be packed into single int64s.
+"""
+
+from typing import Dict, List, Optional
+import pandas as pd
+from pandas.api.types import (
+    CategoricalDtype,
+    is_categorical_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+)
+import numpy as np
+
+from server.ml_models.data_config import TEAM_NAMES, VENUES, ROUND_TYPES, INDEX_COLS
+
+TEAM_CATEGORY_COLS = ["team", "oppo_team", "home_team", "away_team", "playing_for"]
+CATEGORIES: Dict[str, List[str]] = {
+    **{col: TEAM_NAMES for col in TEAM_CATEGORY_COLS},
+    "venue": sorted(VENUES),
+    "round_type": ROUND_TYPES,
+}
+OPEN_CATEGORY_COLS = ["player_name", "player_id"]
+# MultiIndex levels are always int64, so index columns stay that way
+# to keep matching the index (see ml_model.TransformerPlan)
+UNCOMPACTED_COLS = [col for col in INDEX_COLS if col not in CATEGORIES]
+
+
+def category_dtype(values: pd.Series, categories: List[str]) -> CategoricalDtype:
+    """
+    Categorical dtype with the given categories, followed by any other values
+    in sorted order
+    """
+
+    unexpected_values = np.setdiff1d(values.dropna().unique(), categories)
+
+    return CategoricalDtype(list(categories) + list(unexpected_values))
+
+
+def _compact_categories(values: pd.Series) -> pd.Series:
+    if values.name in CATEGORIES:
+        dtype = category_dtype(values, CATEGORIES[str(values.name)])
+
+        return (
+            values
+            if is_categorical_dtype(values) and values.dtype == dtype
+            else values.astype(dtype)
+        )
+
+    return values if is_categorical_dtype(values) else values.astype("category")
+
+
+def _compact_numbers(values: pd.Series) -> pd.Series:
+    if is_integer_dtype(values):
+        return pd.to_numeric(values, downcast="integer")
+
+    if not is_float_dtype(values):
+        return values
+
+    float_values = values.values
+
+    if np.isfinite(float_values).all() and np.array_equal(
+        np.round(float_values), float_values
+    ):
+        return pd.to_numeric(values.astype(np.int64), downcast="integer")
+
+    # Comparing the cast values (rather than using pd.to_numeric) makes sure
+    # that no values change
+    if np.allclose(
+        float_values.astype(np.float32), float_values, rtol=0, atol=0, equal_nan=True
+    ):
+        return values.astype(np.float32)
+
+    return values
+
+
+def compact_dtypes(
+    data_frame: pd.DataFrame, category_cols: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Convert a data frame's columns to compact dtypes.
+
+    Args:
+        data_frame (pandas.DataFrame): Data frame to convert.
+        category_cols (list, optional): Columns to store as categoricals. Defaults to
+            the columns with fixed categories and player names & IDs.
+
+    Returns:
+        pandas.DataFrame with the same values, in compact dtypes.
+    """
+
+    category_cols = category_cols or list(CATEGORIES.keys()) + OPEN_CATEGORY_COLS
+    compact_columns = [
+        _compact_categories(values)
+        if label in category_cols
+        else values
+        if label in UNCOMPACTED_COLS
+        else _compact_numbers(values)
+        for label, values in data_frame.iteritems()
+    ]
+
+    compact_data_frame = pd.concat(compact_columns, axis=1)
+    # concat uses Series names, which would lose any duplicate labels' order
+    compact_data_frame.columns = data_frame.columns
+
+    return compact_data_frame
+
+
+def fill_missing_values(data_frame: pd.DataFrame, value: float = 0) -> pd.DataFrame:
+    """
+    Fill missing values like DataFrame.fillna, except in categorical columns,
+    which can only be filled with their categories
+    """
+
+    is_category = np.array([is_categorical_dtype(dtype) for dtype in data_frame.dtypes])
+
+    if not is_category.any():
+        return data_frame.fillna(value)
+
+    col_order = np.concatenate(
+        [np.flatnonzero(~is_category), np.flatnonzero(is_category)]
+    )
+    filled_data_frame = pd.concat(
+        [
+            data_frame.iloc[:, ~is_category].fillna(value),
+            data_frame.iloc[:, is_category],
+        ],
+        axis=1,
+    )
+
+    return filled_data_frame.iloc[:, np.argsort(col_order)]
+
+
+def packed_keys(key_columns: List[pd.Series], key_bits: List[int]) -> np.ndarray:
+    """
+    Pack non-negative integer columns into one int64 key per row, with each column
+    taking the given number of bits (most significant first), so keys are unique
+    to each combination of values and sort like the columns do.
+
+    Args:
+        key_columns (list): Integer columns to pack.
+        key_bits (list): Number of bits for each column's values.
+
+    Returns:
+        numpy.ndarray of int64 keys.
+    """
+
+    if sum(key_bits) > 63:
+        raise ValueError(
+            "Packed keys must fit in 63 bits to be positive int64s, "
+            f"but the key bits given were {key_bits}"
+        )
+
+    keys = np.zeros(len(key_columns[0]), dtype=np.int64)
+
+    for key_column, n_bits in zip(key_columns, key_bits):
+        key_values = key_column.values.astype(np.int64)
+
+        if ((key_values < 0) | (key_values >= 2 ** n_bits)).any():
+            raise ValueError(
+                f"To pack {key_column.name} into {n_bits} bits, its values must be "
+                f"between 0 and {2 ** n_bits - 1}, but the values given were between "
+                f"{key_values.min()} and {key_values.max()}"
+            )
+
+        keys = (keys << n_bits) | key_values
+
+    return keys
+
+
+def memory_report(data_frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Memory used by each of the given data frames (in MB, including string values)
+    by dtype, with a total
+    """
+
+    dtype_memory = {
+        label: pd.Series(
+            data_frame.memory_usage(deep=True, index=False).values,
+            index=[dtype.name for dtype in data_frame.dtypes],
+        )
+        .groupby(level=0)
+        .sum()
+        .append(pd.Series({"index": data_frame.index.memory_usage(deep=True)}))
+        / 1e6
+        for label, data_frame in data_frames.items()
+    }
+    report = pd.DataFrame(dtype_memory).fillna(0)
+
+    return report.append(report.sum().rename("total"))
@@ -0,0 +1,205 @@
+"""Module for sweeping ELO parameters in a single pass through matches.
+
+Tuning the ELO constants in feature_functions one set at a time means walking
+through the full match history once per set, so instead each team's rating
+for every parameter set is kept in a (n_params x n_teams) matrix, and each round
+updates all of them at once by broadcasting the parameters across the round's teams.
+"""
+
+from typing import List, Tuple
+import pandas as pd
+import numpy as np
+
+from .team_timeline import opponent_rows, take_rows
+from .feature_functions import (
+    _elo_formula,
+    _round_boundaries,
+    _round_rows,
+    _validate_team_state_data,
+    BASE_RATING,
+    K,
+    X,
+    M,
+    HGA,
+    S,
+    CARRYOVER,
+)
+
+# Parameter names & default values for ELO parameter sweeps
+ELO_PARAMS = {"k": K, "x": X, "m": M, "hga": HGA, "s": S, "carryover": CARRYOVER}
+
+
+def elo_param_grid(**param_values: List[float]) -> pd.DataFrame:
+    """
+    Build a data frame of ELO parameter sets for sweep_elo_ratings with every
+    combination of the given values. Parameters that aren't given keep their
+    default values (see ELO_PARAMS).
+    """
+
+    unknown_params = [param for param in param_values if param not in ELO_PARAMS]
+
+    if any(unknown_params):
+        raise ValueError(
+            f"ELO parameters must be among {list(ELO_PARAMS.keys())}, "
+            f"but received {unknown_params}"
+        )
+
+    param_grid = pd.MultiIndex.from_product(
+        [param_values.get(param, [value]) for param, value in ELO_PARAMS.items()],
+        names=list(ELO_PARAMS.keys()),
+    )
+
+    return param_grid.to_frame(index=False)
+
+
+def _sweep_elo_rounds(
+    data_frame: pd.DataFrame, elo_params: pd.DataFrame
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Walk through matches once in (year, round_number) order, keeping each team's
+    ELO rating for every parameter set in a (n_params x n_teams) matrix.
+
+    Returns:
+        Tuple of pre-match ELO ratings (n_rows x n_params, in the data frame's
+            row order) and the number of correctly-predicted results per parameter set.
+    """
+
+    team_codes, team_names = pd.factorize(
+        pd.concat([data_frame["team"], data_frame["oppo_team"]]), sort=True
+    )
+    n_rows = len(data_frame)
+
+    teams = team_codes[:n_rows]
+    oppo_teams = team_codes[n_rows:]
+    years = data_frame["year"].values
+    round_numbers = data_frame["round_number"].values
+    margins = (data_frame["score"] - data_frame["oppo_score"]).values.astype(float)
+    results = (margins > 0) + ((margins == 0) * 0.5)
+    at_home = (
+        data_frame["at_home"].values.astype(float)
+        if "at_home" in data_frame.columns
+        else np.full(n_rows, np.nan)
+    )
+
+    sort_order = np.lexsort((teams, round_numbers, years))
+    sorted_teams = teams[sort_order]
+    sorted_oppo_teams = oppo_teams[sort_order]
+    sorted_years = years[sort_order]
+    sorted_round_numbers = round_numbers[sort_order]
+    sorted_margins = margins[sort_order]
+    sorted_results = results[sort_order]
+    sorted_at_home = at_home[sort_order]
+
+    # Parameters are rows, so they broadcast across each round's teams
+    k, x, m, hga, s, carryover = [
+        elo_params[param].values.astype(float)[:, np.newaxis] for param in ELO_PARAMS
+    ]
+    n_params = len(elo_params)
+
+    sorted_opponent_rows = opponent_rows(
+        sorted_years, sorted_round_numbers, sorted_teams, sorted_oppo_teams
+    )
+
+    team_years = np.zeros(len(team_names))
+    team_ratings = np.full((n_params, len(team_names)), np.nan)
+    sorted_elo_ratings = np.empty((n_params, n_rows))
+    correct_predictions = np.zeros(n_params)
+    round_boundaries = _round_boundaries(sorted_years, sorted_round_numbers)
+
+    for round_start, round_end in zip(round_boundaries[:-1], round_boundaries[1:]):
+        round_slice = slice(round_start, round_end)
+        round_teams = sorted_teams[round_slice]
+        year = sorted_years[round_start]
+        prev_years = team_years[round_teams]
+
+        elo_ratings = np.where(
+            prev_years == year,
+            team_ratings[:, round_teams],
+            (team_ratings[:, round_teams] * carryover)
+            + (BASE_RATING * (1 - carryover)),
+        )
+        # Teams that didn't play this season or last season start from scratch
+        elo_ratings = np.where(prev_years >= year - 1, elo_ratings, BASE_RATING)
+
+        if np.isnan(elo_ratings).any():
+            raise ValueError(
+                f"Could not calculate ELO ratings for {year}, round "
+                f"{sorted_round_numbers[round_start]}, "
+                "because some teams' previous matches are missing 'at_home' values "
+                "or the opposition team's row from the same round."
+            )
+
+        oppo_elo_ratings = take_rows(
+            elo_ratings.T, _round_rows(sorted_opponent_rows[round_slice], round_start)
+        ).T
+
+        # Same predicted results as add_elo_pred_win
+        predicted_results = (elo_ratings > oppo_elo_ratings) + (
+            (elo_ratings == oppo_elo_ratings) * 0.5
+        )
+        correct_predictions += (predicted_results == sorted_results[round_slice]).sum(
+            axis=1
+        )
+
+        sorted_elo_ratings[:, round_slice] = elo_ratings
+        team_years[round_teams] = year
+        team_ratings[:, round_teams] = _elo_formula(
+            elo_ratings,
+            oppo_elo_ratings,
+            sorted_margins[round_slice],
+            sorted_at_home[round_slice],
+            k=k,
+            x=x,
+            m=m,
+            hga=hga,
+            s=s,
+        )
+
+    elo_ratings = np.empty((n_rows, n_params))
+    elo_ratings[sort_order] = sorted_elo_ratings.T
+
+    return elo_ratings, correct_predictions
+
+
+def sweep_elo_ratings(
+    data_frame: pd.DataFrame, elo_params: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Calculate teams' pre-match ELO ratings for many sets of ELO parameters
+    in a single pass through the matches.
+
+    Args:
+        data_frame (pandas.DataFrame): Team-match data, as for add_elo_rating.
+        elo_params (pandas.DataFrame): One row per set of ELO parameters, with a column
+            for each parameter in ELO_PARAMS (see elo_param_grid).
+
+    Returns:
+        Tuple of data frames: ELO ratings with the data frame's index
+            and an 'elo_rating_<param set label>' column per parameter set,
+            and elo_params with an 'accuracy' column for the proportion of results
+            correctly predicted by the higher pre-match rating (as in add_elo_pred_win).
+    """
+
+    _validate_team_state_data(data_frame, "ELO ratings")
+
+    missing_params = [param for param in ELO_PARAMS if param not in elo_params.columns]
+
+    if any(missing_params):
+        raise ValueError(
+            f"To sweep ELO ratings, all ELO parameters ({list(ELO_PARAMS.keys())}) "
+            "must be in the parameter data frame, but the columns given were "
+            f"{list(elo_params.columns)}"
+        )
+
+    elo_ratings, correct_predictions = _sweep_elo_rounds(data_frame, elo_params)
+
+    elo_rating_data_frame = pd.DataFrame(
+        elo_ratings,
+        index=data_frame.index,
+        columns=[f"elo_rating_{label}" for label in elo_params.index],
+    )
+
+    return (
+        elo_rating_data_frame,
+        elo_params.assign(accuracy=correct_predictions / len(data_frame)),
+    )
@@ -1,9 +1,14 @@
-from typing import List
+from typing import List, Optional
 import pandas as pd
 
-from server.ml_models.ml_model import DataTransformerMixin
+from server.ml_models.ml_model import DataTransformerMixin, index_data_frame
 from server.ml_models.data_config import INDEX_COLS
 from server.types import DataFrameTransformer
+from .team_timeline import active_team_timeline
+from .feature_plan import plan_features
+from .column_builder import active_column_builder
+from .feature_cache import FeatureCache, memoize_features
+from .season_partitions import partition_season_local_features
 
 REQUIRED_COLS: List[str] = INDEX_COLS + ["oppo_team"]
 
@@ -13,22 +18,100 @@ class FeatureBuilder(DataTransformerMixin):
 
     Args:
         feature_funcs (iterable): Iterable containing instances of Feature.
+        output_cols (iterable, optional): Columns needed from the transformed
+            data frame. If given, only the feature functions needed to produce them
+            are run (see feature_plan.plan_features). The model data classes
+            don't pass output columns yet, because their pipelines use every column
+            of the built data, so there's nothing to prune at prediction time.
+        cache (FeatureCache, optional): Cache for memoizing feature functions
+            with declared columns (see feature_cache.memoize_features).
+        season_partitions (int, optional): If given, consecutive season-local
+            feature functions run on this many partitions of seasons in a pool
+            of forked processes (see season_partitions.SeasonPartitionedFeatures),
+            and the others run on the whole data frame.
+        lookback_seasons (int): Number of previous seasons to include with each
+            partition, so that feature functions that read up to that many previous
+            seasons can run on the partitions too.
+        max_workers (int, optional): Number of processes for season partitions.
+            Defaults to the number of CPUs.
 
     Attributes:
         feature_funcs (iterable): Iterable containing instances of Feature.
+        feature_plan (FeaturePlan, optional): Planned feature functions and report
+            for the output columns.
     """
 
     def __init__(
         self,
         index_cols: List[str] = INDEX_COLS,
         feature_funcs: List[DataFrameTransformer] = [],
+        output_cols: Optional[List[str]] = None,
+        cache: Optional[FeatureCache] = None,
+        season_partitions: Optional[int] = None,
+        lookback_seasons: int = 0,
+        max_workers: Optional[int] = None,
     ) -> None:
         self.index_cols = index_cols
-        self._data_transformers = feature_funcs
+        self.feature_plan = (
+            None if output_cols is None else plan_features(feature_funcs, output_cols)
+        )
+
+        planned_feature_funcs = (
+            feature_funcs
+            if self.feature_plan is None
+            else self.feature_plan.feature_funcs
+        )
+        feature_stages = (
+            planned_feature_funcs
+            if cache is None
+            else [
+                memoize_features(feature_func, cache=cache)
+                for feature_func in planned_feature_funcs
+            ]
+        )
+        self._data_transformers = (
+            feature_stages
+            if season_partitions is None
+            else partition_season_local_features(
+                feature_stages,
+                season_partitions,
+                lookback_seasons=lookback_seasons,
+                max_workers=max_workers,
+            )
+        )
 
     def transform(self, data_frame: pd.DataFrame) -> pd.DataFrame:
         """Add new features to the given data frame."""
 
+        self.__validate_columns(data_frame)
+
+        # index_data_frame returns a copy, so the data frame is ours to add columns to
+        return self.transform_indexed(index_data_frame(data_frame, self.index_cols))
+
+    def transform_indexed(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add new features to a data frame that's already indexed & sorted by index_cols
+        (e.g. by a TransformerPlan). The data frame gets columns added in place,
+        so it mustn't be used anywhere else.
+        """
+
+        self.__validate_columns(data_frame)
+
+        # Feature functions share team groupings via the timeline rather than
+        # each grouping the same rows again, and add their columns to the builder's
+        # data frame rather than each copying it
+        with active_team_timeline(data_frame), active_column_builder(
+            data_frame
+        ) as column_builder:
+            return column_builder.materialize(
+                self._compose_transformers(data_frame)  # pylint: disable=E1102
+            )
+
+    @property
+    def data_transformers(self) -> List[DataFrameTransformer]:
+        return self._data_transformers
+
+    def __validate_columns(self, data_frame: pd.DataFrame) -> None:
         required_cols = REQUIRED_COLS + self.index_cols
 
         if any((req_col not in data_frame.columns for req_col in required_cols)):
@@ -37,20 +120,3 @@ class FeatureBuilder(DataTransformerMixin):
                 f"({required_cols}) must be in data frame, "
                 f"but the columns given were {data_frame.columns}"
             )
-
-        return self._compose_transformers(  # pylint: disable=E1102
-            data_frame.copy()
-            .set_index(self.index_cols, drop=False)
-            .rename_axis([None] * len(self.index_cols))
-            .sort_index()
-        )
-
-    @property
-    def data_transformers(self) -> List[DataFrameTransformer]:
-        return self._data_transformers
-
-    @staticmethod
-    def __compose_two(
-        composed_func: DataFrameTransformer, func_element: DataFrameTransformer
-    ) -> DataFrameTransformer:
-        return lambda x: composed_func(func_element(x))
@@ -0,0 +1,381 @@
+"""Module for memoizing feature functions and calculators by the data they read.
+
+Results are keyed by a hash of the function, its parameters, and the index & values
+of the columns that it declares as required (see feature_plan.declare_columns),
+so functions rerun on the same data (e.g. when AllModelData rebuilds the data
+of other models) reuse earlier results, even if other columns differ.
+The shared FEATURE_CACHE is disabled unless a caller enables it around a build
+that reuses work.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial, wraps
+import hashlib
+import os
+import pickle
+import pandas as pd
+import numpy as np
+
+from .feature_plan import feature_columns
+from .column_builder import add_columns, drop_columns
+
+DEFAULT_MAX_SIZE_MB = 256
+
+F = TypeVar("F", bound=Callable)
+
+
+def _function_key(func: Callable) -> Optional[str]:
+    # Functions defined inside other functions (including lambdas) can have the same
+    # qualified name but different behaviour, so they can't be memoized
+    if isinstance(func, partial):
+        func_key = _function_key(func.func)
+
+        if func_key is None:
+            return None
+
+        param_keys = [_value_key(arg) for arg in func.args] + [
+            f"{key}={_value_key(value)}" for key, value in sorted(func.keywords.items())
+        ]
+
+        if any([param_key is None for param_key in param_keys]):
+            return None
+
+        return f"{func_key}({', '.join(param_keys)})"  # type: ignore
+
+    qualname = getattr(func, "__qualname__", None)
+
+    if qualname is None or "<" in qualname:
+        return None
+
+    return f"{func.__module__}.{qualname}"
+
+
+def _value_key(value: Any) -> Optional[str]:
+    if callable(value):
+        return _function_key(value)
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _data_digest(value)
+
+    if isinstance(value, np.ndarray):
+        return hashlib.sha1(value.tobytes()).hexdigest()
+
+    if isinstance(value, (list, tuple)):
+        item_keys = [_value_key(item) for item in value]
+
+        return None if None in item_keys else repr(item_keys)
+
+    if isinstance(value, dict):
+        dict_item_keys = [(key, _value_key(item)) for key, item in value.items()]
+
+        return (
+            None
+            if any([item_key is None for _, item_key in dict_item_keys])
+            else repr(dict_item_keys)
+        )
+
+    return repr(value)
+
+
+def _data_digest(data: Any) -> str:
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+
+    if isinstance(data, pd.DataFrame):
+        digest.update(repr(list(data.columns)).encode())
+
+    return digest.hexdigest()
+
+
+def _data_size(data: Any) -> int:
+    if isinstance(data, dict):
+        return sum([_data_size(values) for values in data.values()])
+
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return int(np.sum(data.memory_usage(index=True)))
+
+    return getattr(data, "nbytes", 0)
+
+
+class FeatureCache:
+    """Bounded least-recently-used cache of feature results, with optional disk tier.
+
+    Args:
+        max_size_mb (float): Maximum total size of results held in memory.
+            Larger results are only cached on disk.
+        cache_dir (str, optional): Directory in which to also save results,
+            so other processes can reuse them.
+        enabled (bool): Whether memoized functions use the cache. Disabled caches
+            leave functions to calculate their results as usual.
+
+    Attributes:
+        hits (int): Number of results found in the cache.
+        misses (int): Number of results that had to be calculated.
+    """
+
+    def __init__(
+        self,
+        max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+        cache_dir: Optional[str] = None,
+        enabled: bool = True,
+    ) -> None:
+        self.max_size = max_size_mb * 1e6
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+        self._results: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._size = 0
+
+    def __repr__(self) -> str:
+        # Keeps keys of functions with a cache parameter the same across processes
+        return (
+            f"FeatureCache(max_size_mb={self.max_size / 1e6}, "
+            f"cache_dir={repr(self.cache_dir)})"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached result (None if there isn't one)"""
+
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key][0]
+
+        if self.cache_dir is None or not os.path.isfile(self.__path(key)):
+            return None
+
+        with open(self.__path(key), "rb") as cache_file:
+            result = pickle.load(cache_file)
+
+        self.__remember(key, result)
+
+        return result
+
+    def set(self, key: str, result: Any) -> None:
+        """Cache a result, evicting the least-recently-used results as necessary"""
+
+        self.__remember(key, result)
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            with open(self.__path(key), "wb") as cache_file:
+                pickle.dump(result, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @contextmanager
+    def enable(self):
+        """Enable the cache inside the context"""
+
+        was_enabled = self.enabled
+        self.enabled = True
+
+        try:
+            yield self
+        finally:
+            self.enabled = was_enabled
+
+    def clear(self) -> None:
+        """Remove all results from memory (but not from disk)"""
+
+        self._results.clear()
+        self._size = 0
+
+    def __remember(self, key: str, result: Any) -> None:
+        result_size = _data_size(result)
+
+        if result_size > self.max_size:
+            return
+
+        if key in self._results:
+            self._size -= self._results.pop(key)[1]
+
+        self._results[key] = (result, result_size)
+        self._size += result_size
+
+        while self._size > self.max_size:
+            _, (_, evicted_size) = self._results.popitem(last=False)
+            self._size -= evicted_size
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.cache_dir or "", f"{key}.pkl")
+
+
+FEATURE_CACHE = FeatureCache(enabled=False)
+
+
+def _result_key(func_key: str, required: Any, data_frame: pd.DataFrame) -> str:
+    return hashlib.sha1(
+        (func_key + _data_digest(data_frame[list(required)])).encode()
+    ).hexdigest()
+
+
+def _can_memoize(func: Callable) -> bool:
+    return feature_columns(func) is not None and _function_key(func) is not None
+
+
+def memoize_features(feature_func: F, cache: FeatureCache = FEATURE_CACHE) -> F:
+    """
+    Memoize a feature function by its declared required columns & parameters.
+    Cached results are replayed on the data frame by adding the columns that
+    the function added or produced, then dropping the columns that it dropped.
+    Functions without declared columns, or that are defined inside other functions,
+    are returned as they are.
+    """
+
+    if not _can_memoize(feature_func):
+        return feature_func
+
+    func_key = str(_function_key(feature_func))
+    columns = feature_columns(feature_func)
+    required, produced = (columns.required, columns.produced)  # type: ignore
+
+    @wraps(feature_func)
+    def memoized_feature_func(data_frame: pd.DataFrame) -> pd.DataFrame:
+        if not cache.enabled or any(
+            [col not in data_frame.columns for col in required]
+        ):
+            return feature_func(data_frame)
+
+        key = _result_key(func_key, required, data_frame)
+        cached_result: Optional[Dict[str, Any]] = cache.get(key)
+
+        if cached_result is not None:
+            cache.hits += 1
+            return drop_columns(
+                add_columns(
+                    data_frame,
+                    **{
+                        label: values.copy()
+                        for label, values in cached_result["values"].items()
+                    },
+                ),
+                *[
+                    label
+                    for label in cached_result["dropped"]
+                    if label in data_frame.columns
+                ],
+            )
+
+        cache.misses += 1
+        # Feature functions run by a ColumnBuilder can change the data frame in place,
+        # so its labels have to be read before calling them
+        labels = list(data_frame.columns)
+        index = data_frame.index
+        result = feature_func(data_frame)
+
+        added_values = {
+            label: result[label].values.copy()
+            for label in result.columns
+            if label in produced or label not in labels
+        }
+        dropped_labels = [label for label in labels if label not in result.columns]
+        replayed_labels = [label for label in labels if label not in dropped_labels] + [
+            label for label in added_values if label not in labels
+        ]
+
+        # Results with rows in a different order than the data frame's can't be
+        # added to other data frames, and replaying reordered columns would give
+        # a different column order
+        if result.index.equals(index) and list(result.columns) == replayed_labels:
+            cache.set(key, {"values": added_values, "dropped": dropped_labels})
+
+        return result
+
+    return cast(F, memoized_feature_func)
+
+
+def memoize_calculator(data_calculator: F, cache: FeatureCache = FEATURE_CACHE) -> F:
+    """
+    Memoize a calculator function (as returned by e.g. calculate_rolling_rate)
+    by its declared required columns & parameters. Calculators without declared
+    columns, or that are defined inside other functions, are returned as they are.
+    """
+
+    if not _can_memoize(data_calculator):
+        return data_calculator
+
+    func_key = str(_function_key(data_calculator))
+    required = feature_columns(data_calculator).required  # type: ignore
+
+    @wraps(data_calculator)
+    def memoized_calculator(data_frame: pd.DataFrame):
+        if not cache.enabled or any(
+            [col not in data_frame.columns for col in required]
+        ):
+            return data_calculator(data_frame)
+
+        key = _result_key(func_key, required, data_frame)
+        result = cache.get(key)
+
+        if result is not None:
+            cache.hits += 1
+            return result.copy()
+
+        cache.misses += 1
+        result = data_calculator(data_frame)
+        cache.set(key, result.copy())
+
+        return result
+
+    return cast(F, memoized_calculator)
+
+
+def _calculation_key(
+    data_calculator: Callable, data_frame: pd.DataFrame
+) -> Optional[str]:
+    if not _can_memoize(data_calculator):
+        return None
+
+    required = feature_columns(data_calculator).required  # type: ignore
+
+    if any([col not in data_frame.columns for col in required]):
+        return None
+
+    return _result_key(str(_function_key(data_calculator)), required, data_frame)
+
+
+def memoize_calculations(
+    data_calculators: List[Callable],
+    data_frame: pd.DataFrame,
+    calculate: Callable[[List[Callable]], List[Any]],
+    cache: FeatureCache = FEATURE_CACHE,
+) -> List[Any]:
+    """
+    Get calculators' results for the data frame, memoized like memoize_calculator,
+    calculating the uncached results with the given function (e.g. in a process pool).
+    The cache is only read & updated in the calling process, so results calculated
+    in forked processes or threads still get cached (once).
+    """
+
+    if not cache.enabled:
+        return calculate(data_calculators)
+
+    keys = [
+        _calculation_key(data_calculator, data_frame)
+        for data_calculator in data_calculators
+    ]
+    cached_results = [None if key is None else cache.get(key) for key in keys]
+    uncached_idxs = [idx for idx, result in enumerate(cached_results) if result is None]
+
+    cache.hits += len(cached_results) - len(uncached_idxs)
+    calculated_results = (
+        calculate([data_calculators[idx] for idx in uncached_idxs])
+        if len(uncached_idxs) > 0
+        else []
+    )
+
+    # Cached results get copied, like memoize_calculator, so callers can't change them
+    results = [None if result is None else result.copy() for result in cached_results]
+
+    for idx, result in zip(uncached_idxs, calculated_results):
+        key = keys[idx]
+
+        if key is not None:
+            cache.misses += 1
+            cache.set(key, result.copy())
+
+        results[idx] = result
+
+    return results
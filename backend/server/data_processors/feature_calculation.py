@@ -1,17 +1,23 @@
-from typing import Tuple, List, Callable, Sequence, Dict
+from typing import Tuple, List, Callable, Sequence, Dict, Union, Optional
 from functools import partial, reduce
+from multiprocessing.pool import ThreadPool
+import ast
 import itertools
+import multiprocessing
 import pandas as pd
 import numpy as np
 
 from server.types import DataFrameTransformer
 from server.ml_models.data_config import AVG_SEASON_LENGTH
+from .team_timeline import get_team_timeline, TEAM_GROUP
+from .feature_plan import declare_columns, feature_columns
+from .column_builder import add_columns
+from .feature_cache import FeatureCache, memoize_calculations
 
-DataFrameCalculator = Callable[[pd.DataFrame], pd.Series]
+DataFrameCalculator = Callable[[pd.DataFrame], Union[pd.Series, pd.DataFrame]]
 Calculator = Callable[[Sequence[str]], DataFrameCalculator]
 CalculatorPair = Tuple[Calculator, List[Sequence[str]]]
 
-TEAM_LEVEL = 0
 # Varies by season and number of teams, but teams play each other about 1.5 times per season,
 # and I found a rolling window of 3 for such aggregations to one of the most predictive
 # of match results
@@ -23,6 +29,30 @@ ROLLING_OPPO_TEAM_WINDOW = 3
 ROLLING_VENUE_WINDOW = 8
 
 ROLLING_WINDOWS = {"oppo_team": ROLLING_OPPO_TEAM_WINDOW, "venue": ROLLING_VENUE_WINDOW}
+EXECUTORS = [None, "thread", "process"]
+
+BINARY_OPERATORS: Dict[type, Callable[..., np.ndarray]] = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+}
+UNARY_OPERATORS: Dict[type, Callable[..., np.ndarray]] = {
+    ast.UAdd: np.positive,
+    ast.USub: np.negative,
+}
+EXPRESSION_NODES = (
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Name,
+    ast.Num,
+    ast.Load,
+    *BINARY_OPERATORS.keys(),
+    *UNARY_OPERATORS.keys(),
+)
+INF_POLICIES = ["keep", "zero", "nan", "raise"]
+NAN_POLICIES = ["keep", "zero", "raise"]
 
 
 def _calculate_feature_col(
@@ -37,22 +67,160 @@ def _calculate_feature_col(
     return [data_calculator(column_set) for column_set in column_sets]
 
 
-def _calculate_features(calculators: List[CalculatorPair], data_frame: pd.DataFrame):
+# Calculators & data frame for the current process-pool calculation. Forked worker
+# processes inherit them, so only the calculated columns get pickled
+_FORKED_CALCULATION: List[Tuple[List[DataFrameCalculator], pd.DataFrame]] = []
+
+
+def _calculate_forked_feature_col(
+    calculator_idx: int
+) -> Union[pd.Series, pd.DataFrame]:
+    calculator_funcs, data_frame = _FORKED_CALCULATION[-1]
+
+    return calculator_funcs[calculator_idx](data_frame)
+
+
+def _run_calculators(
+    calculator_funcs: List[DataFrameCalculator],
+    data_frame: pd.DataFrame,
+    executor: Optional[str],
+    max_workers: Optional[int],
+) -> List[Union[pd.Series, pd.DataFrame]]:
+    if executor is None:
+        return [calc_func(data_frame) for calc_func in calculator_funcs]
+
+    # Pool.map returns results in the order of calculator_funcs, so columns
+    # are always assembled in the same order
+    if executor == "thread":
+        with ThreadPool(max_workers) as pool:
+            return pool.map(lambda calc_func: calc_func(data_frame), calculator_funcs)
+
+    _FORKED_CALCULATION.append((calculator_funcs, data_frame))
+
+    try:
+        with multiprocessing.get_context("fork").Pool(max_workers) as pool:
+            return pool.map(_calculate_forked_feature_col, range(len(calculator_funcs)))
+    finally:
+        _FORKED_CALCULATION.pop()
+
+
+def _calculate_features(
+    calculators: List[CalculatorPair],
+    data_frame: pd.DataFrame,
+    executor: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    cache: Optional[FeatureCache] = None,
+):
     calculator_func_lists = [
         _calculate_feature_col(calculator, column_sets)
         for calculator, column_sets in calculators
     ]
-    calculator_funcs = list(itertools.chain.from_iterable(calculator_func_lists))
-    calculated_cols = [calc_func(data_frame) for calc_func in calculator_funcs]
+    calculator_funcs: List[DataFrameCalculator] = list(
+        itertools.chain.from_iterable(calculator_func_lists)
+    )
+    run_calculators = partial(
+        _run_calculators,
+        data_frame=data_frame,
+        executor=executor,
+        max_workers=max_workers,
+    )
+
+    # Looking up & caching results here, rather than in each calculator, keeps
+    # the results calculated in forked processes, which have their own copy
+    # of the cache
+    calculated_cols = (
+        run_calculators(calculator_funcs)
+        if cache is None
+        else memoize_calculations(calculator_funcs, data_frame, run_calculators, cache)
+    )
+
+    new_columns: Dict[str, pd.Series] = {}
+
+    for calculated_col in calculated_cols:
+        if isinstance(calculated_col, pd.DataFrame):
+            new_columns.update(calculated_col.items())
+        else:
+            new_columns[calculated_col.name] = calculated_col
+
+    return add_columns(data_frame, **new_columns)
+
+
+def feature_calculator(
+    calculators: List[CalculatorPair],
+    executor: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    cache: Optional[FeatureCache] = None,
+) -> DataFrameTransformer:
+    """
+    Create a feature function that adds the columns calculated by each calculator.
+
+    Args:
+        calculators (list): Pairs of calculator & list of column sets to calculate.
+        executor (str, optional): Run the calculators concurrently with a 'thread'
+            pool or a 'process' pool of forked processes, which share the data frame
+            with the parent process rather than copying it. Runs them serially
+            by default.
+        max_workers (int, optional): Number of threads/processes for the executor.
+            Defaults to the number of CPUs.
+        cache (FeatureCache, optional): Cache for memoizing calculators with declared
+            columns (see feature_cache.memoize_calculations).
+
+    Returns:
+        Feature function for FeatureBuilder.
+    """
+
+    if executor not in EXECUTORS:
+        raise ValueError(
+            f"Feature calculator executor must be one of {EXECUTORS}, "
+            f"but received {executor}"
+        )
+
+    if executor == "process" and "fork" not in multiprocessing.get_all_start_methods():
+        raise ValueError(
+            "The 'process' executor needs to fork processes, which this platform "
+            "doesn't support. Use the 'thread' executor instead."
+        )
+
+    calculate_features = partial(
+        _calculate_features,
+        calculators,
+        executor=executor,
+        max_workers=max_workers,
+        cache=cache,
+    )
+    calculator_columns = [
+        feature_columns(calc_func)
+        for calculator, column_sets in calculators
+        for calc_func in _calculate_feature_col(calculator, column_sets)
+    ]
+    declared_columns = [
+        columns for columns in calculator_columns if columns is not None
+    ]
 
-    return pd.concat([data_frame, *calculated_cols], axis=1)
+    # Can only plan around the calculated features if all the calculators declare
+    # their columns
+    if len(declared_columns) < len(calculator_columns):
+        return calculate_features
 
+    lookbacks = [
+        columns.lookback_seasons
+        for columns in declared_columns
+        if columns.lookback_seasons is not None
+    ]
 
-def feature_calculator(calculators: List[CalculatorPair]) -> DataFrameTransformer:
-    return partial(_calculate_features, calculators)
+    return declare_columns(
+        required=sorted(
+            {col for columns in declared_columns for col in columns.required}
+        ),
+        produced=[col for columns in declared_columns for col in columns.produced],
+        # Season-local if all the calculators are
+        lookback_seasons=max(lookbacks, default=0)
+        if len(lookbacks) == len(declared_columns)
+        else None,
+    )(calculate_features)
 
 
-def _rolling_rate(column: str, data_frame: pd.DataFrame) -> pd.Series:
+def _rolling_rate(column: str, window: int, data_frame: pd.DataFrame) -> pd.Series:
     if column not in data_frame.columns:
         raise ValueError(
             f"To calculate rolling rate, '{column}' "
@@ -60,44 +228,49 @@ def _rolling_rate(column: str, data_frame: pd.DataFrame) -> pd.Series:
             f"{data_frame.columns}"
         )
 
-    groups = data_frame[column].groupby(level=TEAM_LEVEL, group_keys=False)
-
-    # Using mean season length (23) for rolling window due to a combination of
-    # testing different window values for a previous model and finding 23 to be
-    # a good window for data vis.
-    # Not super scientific, but it works well enough.
-    rolling_rate = groups.rolling(window=AVG_SEASON_LENGTH).mean()
-
-    # Only select rows that are NaNs in rolling series
-    blank_rolling_rows = rolling_rate.isna()
-    expanding_rate = groups.expanding(1).mean()[blank_rolling_rows]
+    # Teams' first window - 1 matches get expanding means instead of rolling means
+    rolling_rate = (
+        get_team_timeline(data_frame)
+        .grouping(TEAM_GROUP)
+        .rolling_mean(data_frame[column].values, window)
+    )
 
-    return (
-        pd.concat([rolling_rate, expanding_rate], join="inner")
-        .dropna()
-        .sort_index()
-        .rename(f"rolling_{column}_rate")
+    return pd.Series(
+        rolling_rate, index=data_frame.index, name=f"rolling_{column}_rate"
     )
 
 
-def calculate_rolling_rate(column: Sequence[str]) -> DataFrameCalculator:
-    """Calculate the rolling mean of a column"""
+# Using mean season length (23) for rolling window due to a combination of
+# testing different window values for a previous model and finding 23 to be
+# a good window for data vis.
+# Not super scientific, but it works well enough.
+def calculate_rolling_rate(
+    column: Sequence[str], window: int = AVG_SEASON_LENGTH
+) -> DataFrameCalculator:
+    """
+    Calculate the rolling mean of a column per team over the given window of matches,
+    using the expanding mean for teams' first window - 1 matches
+    """
 
     if len(column) != 1:
         raise ValueError(
             "Can only calculate one rolling average at a time, but received "
             f"{column}"
         )
-    return partial(_rolling_rate, column[0])
 
+    if window < 1:
+        raise ValueError(f"Rolling window must be at least 1, but received {window}")
 
-def _rolling_mean_by_dimension(
-    column_pair: Sequence[str],
-    rolling_windows: Dict[str, int],
-    data_frame: pd.DataFrame,
-) -> pd.Series:
-    dimension_column, metric_column = column_pair
-    required_columns = ["team", *column_pair]
+    return declare_columns(
+        required=["team", column[0]], produced=[f"rolling_{column[0]}_rate"]
+    )(partial(_rolling_rate, column[0], window))
+
+
+def _rolling_means_by_dimension(
+    columns: Sequence[str], rolling_windows: Dict[str, int], data_frame: pd.DataFrame
+) -> pd.DataFrame:
+    dimension_column, *metric_columns = columns
+    required_columns = ["team", *columns]
     rolling_window = (
         rolling_windows[dimension_column]
         if dimension_column in rolling_windows.keys()
@@ -106,33 +279,41 @@ def _rolling_mean_by_dimension(
 
     if any([col not in data_frame.columns for col in required_columns]):
         raise ValueError(
-            f"To calculate rolling rate, 'team', {dimension_column}, and '{metric_column}' "
+            f"To calculate rolling rate, 'team', {dimension_column}, and {metric_columns} "
             "must be in data frame, but the columns given were "
             f"{data_frame.columns}"
         )
 
-    prev_match_values = (
-        data_frame.groupby(["team", dimension_column])[metric_column].shift().fillna(0)
+    # All metrics share the grouping, shift & cumulative sums as columns of one array
+    team_dimensions = get_team_timeline(data_frame).grouping(["team", dimension_column])
+    prev_match_values = team_dimensions.shift(
+        data_frame[metric_columns].values.astype(float)
+    )
+    prev_match_values[np.isnan(prev_match_values)] = 0
+    rolling_rates = team_dimensions.rolling_mean(prev_match_values, rolling_window)
+
+    return pd.DataFrame(
+        rolling_rates,
+        index=data_frame.index,
+        columns=[
+            _rolling_mean_by_dimension_label(dimension_column, metric_column)
+            for metric_column in metric_columns
+        ],
     )
-    prev_match_values_label = f"prev_{metric_column}_by_{dimension_column}"
 
-    groups = data_frame.assign(**{prev_match_values_label: prev_match_values}).groupby(
-        ["team", dimension_column], group_keys=False
-    )[prev_match_values_label]
 
-    rolling_rate = groups.rolling(window=rolling_window).mean()
+def _rolling_mean_by_dimension_label(dimension_column: str, metric_column: str) -> str:
+    return f"rolling_mean_{metric_column}_by_{dimension_column}"
 
-    # Only select rows that are NaNs in rolling series
-    blank_rolling_rows = rolling_rate.isna()
-    expanding_rate = groups.expanding(1).mean()[blank_rolling_rows]
 
-    return (
-        pd.concat([rolling_rate, expanding_rate], join="inner")
-        .reset_index(level=[0, 1], drop=True)
-        .dropna()
-        .sort_index()
-        .rename(f"rolling_mean_{metric_column}_by_{dimension_column}")
-    )
+def _rolling_mean_by_dimension(
+    column_pair: Sequence[str],
+    rolling_windows: Dict[str, int],
+    data_frame: pd.DataFrame,
+) -> pd.Series:
+    return _rolling_means_by_dimension(column_pair, rolling_windows, data_frame)[
+        _rolling_mean_by_dimension_label(*column_pair)
+    ]
 
 
 def calculate_rolling_mean_by_dimension(
@@ -151,7 +332,207 @@ def calculate_rolling_mean_by_dimension(
             f"at a time, but received {column_pair}"
         )
 
-    return partial(_rolling_mean_by_dimension, column_pair, rolling_windows)
+    return declare_columns(
+        required=["team", *column_pair],
+        produced=[_rolling_mean_by_dimension_label(*column_pair)],
+    )(partial(_rolling_mean_by_dimension, column_pair, rolling_windows))
+
+
+def calculate_rolling_means_by_dimension(
+    columns: Sequence[str], rolling_windows: Dict[str, int] = ROLLING_WINDOWS
+) -> DataFrameCalculator:
+    """
+    Calculate the rolling means of a team's metric columns when grouped by a dimension
+    column, given as (dimension, metric, metric, ...). Produces the same columns as
+    calculate_rolling_mean_by_dimension for each (dimension, metric) pair, but groups
+    the data frame once for all the metrics. The same note about 'prev_match' metric
+    columns applies.
+    """
+
+    if len(columns) < 2:
+        raise ValueError(
+            "Must have a dimension column and at least one metric column to calculate "
+            f"rolling averages, but received {columns}"
+        )
+
+    dimension_column, *metric_columns = columns
+
+    return declare_columns(
+        required=["team", *columns],
+        produced=[
+            _rolling_mean_by_dimension_label(dimension_column, metric_column)
+            for metric_column in metric_columns
+        ],
+    )(partial(_rolling_means_by_dimension, columns, rolling_windows))
+
+
+def _ewm_walk(
+    sorted_values: np.ndarray,
+    group_starts: np.ndarray,
+    states: np.ndarray,
+    alpha: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Walk through contiguous groups of values one position at a time,
+    updating each group's exponentially weighted mean as a single float.
+
+    Args:
+        sorted_values (np.ndarray): Values sorted by group, in chronological order
+            within each group.
+        group_starts (np.ndarray): Positions at which each group starts.
+        states (np.ndarray): Each group's mean before its first value
+            (NaN if it doesn't have one).
+        alpha (float): Weight of each new value.
+
+    Returns:
+        Tuple of np.ndarrays: each row's mean before its value, and each group's
+            mean after its last value.
+    """
+
+    group_sizes = np.diff(np.append(group_starts, len(sorted_values)))
+    sorted_rates = np.empty(len(sorted_values))
+    states = states.astype(float)
+
+    # Looping over positions within groups rather than rows means that each step
+    # updates all the groups that are that long at once
+    for position in range(group_sizes.max() if len(group_sizes) else 0):
+        groups = np.flatnonzero(group_sizes > position)
+        rows = group_starts[groups] + position
+        prev_states = states[groups]
+        values = sorted_values[rows]
+
+        sorted_rates[rows] = prev_states
+        # Groups start from their first value, and missing values (e.g. unplayed
+        # matches) leave states as they are
+        states[groups] = np.where(
+            np.isnan(values),
+            prev_states,
+            np.where(
+                np.isnan(prev_states),
+                values,
+                prev_states + (alpha * (values - prev_states)),
+            ),
+        )
+
+    return sorted_rates, states
+
+
+class EwmRate:
+    """Exponentially weighted mean of a metric column per team, or per team
+    & dimension, from the matches before each row.
+
+    Each group's state is a single float, so new rounds can be added with update
+    without recalculating the match history.
+
+    Args:
+        columns (sequence of str): Metric column, or dimension & metric columns.
+        span (int): Number of matches that the weights decay over
+            (alpha = 2 / (span + 1)).
+
+    Attributes:
+        label (str): Name of the calculated column.
+        states (pandas.Series): Each group's mean after its latest match,
+            indexed by team (or team & dimension).
+    """
+
+    def __init__(self, columns: Sequence[str], span: int) -> None:
+        *dimension_columns, self._metric_column = columns
+        self._group_columns = ["team", *dimension_columns]
+        self._alpha = 2 / (span + 1)
+
+        self.label = f"ewm_{self._metric_column}_rate" + "".join(
+            [f"_by_{col}" for col in dimension_columns]
+        )
+        self.states = pd.Series([], name=self.label, dtype=float)
+
+    def __call__(self, data_frame: pd.DataFrame) -> pd.Series:
+        """Calculate rates from the full match history, replacing current states"""
+
+        return self._calculate(data_frame, pd.Series([], name=self.label, dtype=float))
+
+    def update(self, round_results: pd.DataFrame) -> pd.Series:
+        """
+        Calculate rates for rounds after the current states, then add the rounds'
+        metric values to the states. Rows without metric values (e.g. for unplayed
+        matches) get rates without changing the states.
+        """
+
+        return self._calculate(round_results, self.states)
+
+    def _calculate(self, data_frame: pd.DataFrame, states: pd.Series) -> pd.Series:
+        required_columns = [*self._group_columns, self._metric_column]
+
+        if any([col not in data_frame.columns for col in required_columns]):
+            raise ValueError(
+                f"To calculate exponentially weighted rate, {required_columns} "
+                "must be in data frame, but the columns given were "
+                f"{data_frame.columns}"
+            )
+
+        grouping = get_team_timeline(data_frame).grouping(self._group_columns)
+        first_rows = grouping.order[grouping.starts]
+        group_index = pd.MultiIndex.from_arrays(
+            [data_frame[col].values[first_rows] for col in self._group_columns],
+            names=self._group_columns,
+        )
+        # A one-level MultiIndex doesn't align with a plain team index
+        group_index = (
+            group_index.get_level_values(0)
+            if len(self._group_columns) == 1
+            else group_index
+        )
+
+        sorted_rates, end_states = _ewm_walk(
+            data_frame[self._metric_column].values[grouping.order].astype(float),
+            grouping.starts,
+            states.reindex(group_index).values,
+            self._alpha,
+        )
+
+        group_states = pd.Series(end_states, index=group_index, name=self.label)
+        self.states = (
+            group_states
+            if states.empty
+            else pd.concat(
+                [states[~states.index.isin(group_index)], group_states]
+            ).sort_index()
+        )
+
+        rates = np.empty(len(data_frame))
+        rates[grouping.order] = sorted_rates
+
+        return pd.Series(rates, index=data_frame.index, name=self.label)
+
+
+def calculate_ewm_rate(
+    columns: Sequence[str], span: int = AVG_SEASON_LENGTH
+) -> EwmRate:
+    """
+    Calculate the exponentially weighted mean of a team's metric column,
+    given as (metric,), or when grouped by a dimension column, given as
+    (dimension, metric), from the team's matches before each row. Teams' first
+    matches (per dimension) have NaN rates. Unlike calculate_rolling_rate, this uses
+    current-match metric columns (e.g. 'result' rather than 'prev_match_result').
+
+    Data frames must be in chronological order within each team (e.g. sorted
+    by FeatureBuilder). Use EwmRate.update to add new rounds to the calculated
+    history.
+    """
+
+    if len(columns) not in [1, 2]:
+        raise ValueError(
+            "Can only calculate one exponentially weighted rate at a time, "
+            f"grouped by at most one dimension, but received {columns}"
+        )
+
+    if span < 1:
+        raise ValueError(f"EWM span must be at least 1, but received {span}")
+
+    ewm_rate = EwmRate(columns, span)
+
+    return declare_columns(required=["team", *columns], produced=[ewm_rate.label])(
+        ewm_rate
+    )
 
 
 def _division(column_pair: Sequence[str], data_frame: pd.DataFrame) -> pd.Series:
@@ -182,7 +563,13 @@ def calculate_division(column_pair: Sequence[str]) -> DataFrameCalculator:
             f"{column_pair}"
         )
 
-    return partial(_division, column_pair)
+    first_col, second_col = column_pair
+
+    return declare_columns(
+        required=column_pair,
+        produced=[f"{first_col}_divided_by_{second_col}"],
+        lookback_seasons=0,
+    )(partial(_division, column_pair))
 
 
 def _multiplication(column_pair: Sequence[str], data_frame: pd.DataFrame) -> pd.Series:
@@ -208,7 +595,13 @@ def calculate_multiplication(column_pair: Sequence[str]) -> DataFrameCalculator:
             f"{column_pair}"
         )
 
-    return partial(_multiplication, column_pair)
+    first_col, second_col = column_pair
+
+    return declare_columns(
+        required=column_pair,
+        produced=[f"{first_col}_multiplied_by_{second_col}"],
+        lookback_seasons=0,
+    )(partial(_multiplication, column_pair))
 
 
 def _add_columns(
@@ -242,4 +635,184 @@ def calculate_addition(columns: Sequence[str]) -> DataFrameCalculator:
             "Must have at least two columns to add together, but received " f"{columns}"
         )
 
-    return partial(_addition, columns)
+    return declare_columns(
+        required=columns, produced=["_plus_".join(columns)], lookback_seasons=0
+    )(partial(_addition, columns))
+
+
+def _parse_expression(expression: str) -> Tuple[str, ast.expr]:
+    try:
+        statements = ast.parse(expression).body
+    except SyntaxError:
+        statements = []
+
+    statement = statements[0] if len(statements) == 1 else None
+    target = (
+        statement.targets[0]
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1
+        else None
+    )
+
+    if not isinstance(statement, ast.Assign) or not isinstance(target, ast.Name):
+        raise ValueError(
+            "Expressions must have the form '<column label> = <arithmetic expression>', "
+            f"but received '{expression}'"
+        )
+
+    label, tree = target.id, statement.value
+
+    if any([not isinstance(node, EXPRESSION_NODES) for node in ast.walk(tree)]):
+        raise ValueError(
+            "Expressions can only contain column names, numbers, parentheses "
+            f"and the operators + - * / **, but received '{expression}'"
+        )
+
+    return label, tree
+
+
+def _expression_columns(tree: ast.expr) -> List[str]:
+    return sorted({node.id for node in ast.walk(tree) if isinstance(node, ast.Name)})
+
+
+def _evaluate_expression(tree: ast.expr, values: Dict[str, np.ndarray]):
+    if isinstance(tree, ast.BinOp):
+        return BINARY_OPERATORS[type(tree.op)](
+            _evaluate_expression(tree.left, values),
+            _evaluate_expression(tree.right, values),
+        )
+
+    if isinstance(tree, ast.UnaryOp):
+        return UNARY_OPERATORS[type(tree.op)](
+            _evaluate_expression(tree.operand, values)
+        )
+
+    if isinstance(tree, ast.Name):
+        return values[tree.id]
+
+    if isinstance(tree, ast.Num):
+        return tree.n
+
+    raise ValueError(f"Can't evaluate expression node {ast.dump(tree)}")
+
+
+def _apply_value_policies(
+    label: str, values: np.ndarray, inf_policy: str, nan_policy: str
+) -> np.ndarray:
+    is_inf = np.isinf(values)
+
+    if inf_policy == "raise" and is_inf.any():
+        raise ValueError(f"Expression for '{label}' resulted in infinite values")
+
+    if inf_policy == "nan" and is_inf.any():
+        values = np.where(is_inf, np.nan, values)
+
+    # Like calculate_division, only positive infinity becomes 0
+    if inf_policy == "zero" and (values == np.inf).any():
+        values = np.where(values == np.inf, 0, values)
+
+    is_nan = np.isnan(values)
+
+    if nan_policy == "raise" and is_nan.any():
+        raise ValueError(f"Expression for '{label}' resulted in NaN values")
+
+    if nan_policy == "zero" and is_nan.any():
+        values = np.where(is_nan, 0, values)
+
+    return values
+
+
+def _expressions(
+    parsed_expressions: List[Tuple[str, ast.expr]],
+    required_columns: List[str],
+    inf_policy: str,
+    nan_policy: str,
+    data_frame: pd.DataFrame,
+) -> pd.DataFrame:
+    if any([col not in data_frame.columns for col in required_columns]):
+        raise ValueError(
+            f"To calculate expressions for {[label for label, _ in parsed_expressions]}, "
+            f"all of {required_columns} must be in data frame, but the columns given "
+            f"were {data_frame.columns}"
+        )
+
+    values = {col: data_frame[col].values.astype(float) for col in required_columns}
+
+    for label, tree in parsed_expressions:
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            expression_values = np.broadcast_to(
+                _evaluate_expression(tree, values), (len(data_frame),)
+            ).astype(float)
+
+        values[label] = _apply_value_policies(
+            label, expression_values, inf_policy, nan_policy
+        )
+
+    labels = [label for label, _ in parsed_expressions]
+
+    return pd.DataFrame(
+        {label: values[label] for label in labels},
+        index=data_frame.index,
+        columns=labels,
+    )
+
+
+def calculate_expression(
+    expressions: Sequence[str], inf_policy: str = "zero", nan_policy: str = "keep"
+) -> DataFrameCalculator:
+    """
+    Calculate named arithmetic expressions of columns in one pass, given as
+    ('label = expression', ...). Expressions can use column names, numbers,
+    parentheses and + - * / **, and can refer to the labels of earlier expressions.
+
+    Args:
+        expressions (sequence of str): Expressions, evaluated in order.
+        inf_policy (str): What to do with infinite results (e.g. from dividing by 0):
+            'zero' (default) replaces positive infinity with 0 (as calculate_division
+            does) and leaves negative infinity as it is, 'nan' replaces both with NaN,
+            'keep' leaves them as they are, and 'raise' raises a ValueError.
+        nan_policy (str): What to do with NaN results: 'keep' (default) leaves them
+            as they are, 'zero' replaces them with 0, and 'raise' raises a ValueError.
+            Applied after inf_policy.
+
+    Returns:
+        Calculator that returns a data frame with a column per expression.
+    """
+
+    if len(expressions) < 1:
+        raise ValueError("Must have at least one expression to calculate")
+
+    if inf_policy not in INF_POLICIES:
+        raise ValueError(
+            f"inf_policy must be one of {INF_POLICIES}, but received {inf_policy}"
+        )
+
+    if nan_policy not in NAN_POLICIES:
+        raise ValueError(
+            f"nan_policy must be one of {NAN_POLICIES}, but received {nan_policy}"
+        )
+
+    parsed_expressions = [_parse_expression(expression) for expression in expressions]
+    labels = [label for label, _ in parsed_expressions]
+
+    if len(labels) != len(set(labels)):
+        raise ValueError(
+            f"Each expression must have a unique label, but received {labels}"
+        )
+
+    # Names that don't refer to earlier expressions have to be data frame columns
+    required_columns = sorted(
+        {
+            col
+            for expression_idx, (_, tree) in enumerate(parsed_expressions)
+            for col in _expression_columns(tree)
+            if col not in labels[:expression_idx]
+        }
+    )
+
+    return declare_columns(
+        required=required_columns, produced=labels, lookback_seasons=0
+    )(
+        partial(
+            _expressions, parsed_expressions, required_columns, inf_policy, nan_policy
+        )
+    )
@@ -7,22 +7,36 @@ Args:
 
 Returns:
     pandas.DataFrame
+
+Functions add their columns via add_columns rather than DataFrame.assign,
+so that FeatureBuilder can add them without copying the data frame.
 """
 
-from typing import List, Tuple, Optional
-import math
-from functools import partial, reduce
+from typing import List, Tuple, Optional, Dict, Union
+from functools import partial
 import pandas as pd
 import numpy as np
 
-from server.ml_models.data_config import INDEX_COLS, CITIES, TEAM_CITIES, VENUE_CITIES
+from server.ml_models.data_config import (
+    INDEX_COLS,
+    CITIES,
+    TEAM_CITIES,
+    VENUE_CITIES,
+    AVG_SEASON_LENGTH,
+)
+from .team_timeline import (
+    get_team_timeline,
+    key_values,
+    opponent_rows,
+    take_rows,
+    TEAM_GROUP,
+    TEAM_YEAR_GROUP,
+)
+from .feature_plan import declare_columns
+from .column_builder import add_columns, drop_columns, reorder_rows
+from .group_moments import shifted_rolling_means
 
 TEAM_LEVEL = 0
-YEAR_LEVEL = 1
-ROUND_LEVEL = 2
-REORDERED_TEAM_LEVEL = 2
-REORDERED_YEAR_LEVEL = 0
-REORDERED_ROUND_LEVEL = 1
 WIN_POINTS = 4
 EARTH_RADIUS = 6371
 
@@ -36,10 +50,63 @@ HGA = 9
 S = 250
 CARRYOVER = 0.575
 
-
-EloIndexType = Tuple[int, int, str]
-
-
+# End-of-round values that are enough to calculate history-dependent features
+# for a team's next match
+TEAM_STATE_COLS = [
+    "year",
+    "round_number",
+    "elo_rating",
+    "cum_win_points",
+    "cum_score",
+    "cum_oppo_score",
+    "cum_percent",
+    "win_streak",
+    "score",
+    "oppo_score",
+    "result",
+    "margin",
+]
+# Columns needed to calculate features from teams' match histories
+TEAM_STATE_DATA_COLS = INDEX_COLS + ["oppo_team", "score", "oppo_score"]
+# Match stats that get replaced with rolling averages of previous matches
+PLAYER_STATS_COLS = [
+    "kicks",
+    "marks",
+    "handballs",
+    "goals",
+    "behinds",
+    "hit_outs",
+    "tackles",
+    "rebounds",
+    "inside_50s",
+    "clearances",
+    "clangers",
+    "frees_for",
+    "frees_against",
+    "contested_possessions",
+    "uncontested_possessions",
+    "contested_marks",
+    "marks_inside_50",
+    "one_percenters",
+    "bounces",
+    "goal_assists",
+    "time_on_ground",
+]
+STATE_FEATURE_COLS = [
+    "elo_rating",
+    "prev_match_score",
+    "prev_match_oppo_score",
+    "prev_match_result",
+    "prev_match_margin",
+    "cum_win_points",
+    "cum_percent",
+    "win_streak",
+]
+
+
+@declare_columns(
+    required=["score", "oppo_score"], produced=["result"], lookback_seasons=0
+)
 def add_result(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add a team's match result (win, draw, loss) as float"""
 
@@ -53,9 +120,12 @@ def add_result(data_frame: pd.DataFrame) -> pd.DataFrame:
     wins = (data_frame["score"] > data_frame["oppo_score"]).astype(int)
     draws = (data_frame["score"] == data_frame["oppo_score"]).astype(int) * 0.5
 
-    return data_frame.assign(result=wins + draws)
+    return add_columns(data_frame, result=wins + draws)
 
 
+@declare_columns(
+    required=["score", "oppo_score"], produced=["margin"], lookback_seasons=0
+)
 def add_margin(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add a team's margin from the match"""
 
@@ -66,9 +136,16 @@ def add_margin(data_frame: pd.DataFrame) -> pd.DataFrame:
             f"were {data_frame.columns}"
         )
 
-    return data_frame.assign(margin=data_frame["score"] - data_frame["oppo_score"])
+    return add_columns(
+        data_frame, margin=data_frame["score"] - data_frame["oppo_score"]
+    )
 
 
+@declare_columns(
+    required=["team", "year", "prev_match_score", "prev_match_oppo_score"],
+    produced=["cum_percent"],
+    lookback_seasons=0,
+)
 def add_cum_percent(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add a team's cumulative percent (cumulative score / cumulative opponents' score)"""
 
@@ -82,18 +159,22 @@ def add_cum_percent(data_frame: pd.DataFrame) -> pd.DataFrame:
             f"but the columns given were {data_frame.columns}"
         )
 
-    cum_score = (
-        data_frame["prev_match_score"].groupby(level=[TEAM_LEVEL, YEAR_LEVEL]).cumsum()
-    )
-    cum_oppo_score = (
-        data_frame["prev_match_oppo_score"]
-        .groupby(level=[TEAM_LEVEL, YEAR_LEVEL])
-        .cumsum()
-    )
+    team_years = get_team_timeline(data_frame).grouping(TEAM_YEAR_GROUP)
+    cum_score = team_years.cumsum(data_frame["prev_match_score"].values)
+    cum_oppo_score = team_years.cumsum(data_frame["prev_match_oppo_score"].values)
+
+    # Teams' first matches have 0 / 0 cum percent, which is left as NaN
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cum_percent = cum_score / cum_oppo_score
 
-    return data_frame.assign(cum_percent=cum_score / cum_oppo_score)
+    return add_columns(data_frame, cum_percent=cum_percent)
 
 
+@declare_columns(
+    required=["team", "year", "prev_match_result"],
+    produced=["cum_win_points"],
+    lookback_seasons=0,
+)
 def add_cum_win_points(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add a team's cumulative win points (based on cumulative result)"""
 
@@ -105,14 +186,19 @@ def add_cum_win_points(data_frame: pd.DataFrame) -> pd.DataFrame:
         )
 
     cum_win_points_col = (
-        (data_frame["prev_match_result"] * WIN_POINTS)
-        .groupby(level=[TEAM_LEVEL, YEAR_LEVEL])
-        .cumsum()
+        get_team_timeline(data_frame)
+        .grouping(TEAM_YEAR_GROUP)
+        .cumsum(data_frame["prev_match_result"].values * WIN_POINTS)
     )
 
-    return data_frame.assign(cum_win_points=cum_win_points_col)
+    return add_columns(data_frame, cum_win_points=cum_win_points_col)
 
 
+@declare_columns(
+    required=["win_odds", "oppo_win_odds", "line_odds", "oppo_line_odds"],
+    produced=["betting_pred_win"],
+    lookback_seasons=0,
+)
 def add_betting_pred_win(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add whether a team is predicted to win per the betting odds"""
 
@@ -137,9 +223,14 @@ def add_betting_pred_win(data_frame: pd.DataFrame) -> pd.DataFrame:
     # Give half point for predicted draws
     predicted_results = is_favoured + (odds_are_even * 0.5)
 
-    return data_frame.assign(betting_pred_win=predicted_results)
+    return add_columns(data_frame, betting_pred_win=predicted_results)
 
 
+@declare_columns(
+    required=["elo_rating", "oppo_elo_rating"],
+    produced=["elo_pred_win"],
+    lookback_seasons=0,
+)
 def add_elo_pred_win(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add whether a team is predicted to win per elo ratings"""
 
@@ -159,9 +250,14 @@ def add_elo_pred_win(data_frame: pd.DataFrame) -> pd.DataFrame:
     # Give half point for predicted draws
     predicted_results = is_favoured + (are_even * 0.5)
 
-    return data_frame.assign(elo_pred_win=predicted_results)
+    return add_columns(data_frame, elo_pred_win=predicted_results)
 
 
+@declare_columns(
+    required=INDEX_COLS + ["cum_win_points", "cum_percent"],
+    produced=["ladder_position"],
+    lookback_seasons=0,
+)
 def add_ladder_position(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add a team's current ladder position (based on cumulative win points and percent)"""
 
@@ -174,43 +270,61 @@ def add_ladder_position(data_frame: pd.DataFrame) -> pd.DataFrame:
             f"{data_frame.columns}"
         )
 
-    # Pivot to get round-by-round match points and cumulative percent
-    ladder_pivot_table = data_frame[
-        INDEX_COLS + ["cum_win_points", "cum_percent"]
-    ].pivot_table(
-        index=["year", "round_number"],
-        values=["cum_win_points", "cum_percent"],
-        columns="team",
-        aggfunc={"cum_win_points": np.sum, "cum_percent": np.mean},
+    # Summing win points like the original pivot-table implementation,
+    # which treats missing values as 0
+    ladder_positions = _rank_teams_by_round(
+        data_frame, [data_frame["cum_win_points"].fillna(0), data_frame["cum_percent"]]
     )
 
-    # To get round-by-round ladder ranks, we sort each round by win points & percent,
-    # then save index numbers
-    ladder_index = []
-    ladder_values = []
+    return add_columns(data_frame, ladder_position=ladder_positions)
 
-    for year_round_idx, round_row in ladder_pivot_table.iterrows():
-        sorted_row = round_row.unstack(level=TEAM_LEVEL).sort_values(
-            ["cum_win_points", "cum_percent"], ascending=False
-        )
 
-        for ladder_idx, team_name in enumerate(sorted_row.index.get_values()):
-            ladder_index.append(tuple([team_name, *year_round_idx]))
-            ladder_values.append(ladder_idx + 1)
+def _rank_teams_by_round(
+    data_frame: pd.DataFrame, ranking_cols: List[pd.Series]
+) -> np.ndarray:
+    """
+    Rank teams within each (year, round_number) by the given columns in order
+    of priority, in descending order with NaNs last and ties going to teams
+    in alphabetical order, with a single sort of all team-rounds.
+    """
+
+    team_codes, _ = pd.factorize(data_frame["team"], sort=True)
+    ranking_keys = []
+
+    # np.lexsort sorts by the last key first
+    for ranking_col in reversed(ranking_cols):
+        ranking_values = ranking_col.values.astype(float)
+        is_missing = np.isnan(ranking_values)
+        ranking_keys.extend([-np.where(is_missing, 0, ranking_values), is_missing])
+
+    sort_order = np.lexsort(
+        (
+            team_codes,
+            *ranking_keys,
+            data_frame["round_number"].values,
+            data_frame["year"].values,
+        )
+    )
 
-    ladder_multi_index = pd.MultiIndex.from_tuples(
-        ladder_index, names=tuple(INDEX_COLS)
+    round_boundaries = _round_boundaries(
+        data_frame["year"].values[sort_order],
+        data_frame["round_number"].values[sort_order],
     )
-    ladder_position_col = pd.Series(
-        ladder_values, index=ladder_multi_index, name="ladder_position"
+    round_sizes = np.diff(round_boundaries)
+    sorted_positions = np.arange(len(sort_order)) - np.repeat(
+        round_boundaries[:-1], round_sizes
     )
 
-    return data_frame.assign(ladder_position=ladder_position_col)
+    ranks = np.empty(len(sort_order), dtype=int)
+    ranks[sort_order] = sorted_positions + 1
+
+    return ranks
 
 
 # Calculate win/loss streaks. Positive result (win or draw) adds 1 (or 0.5);
 # negative result subtracts 1. Changes in direction (i.e. broken streak) result in
 # starting at 1 or -1.
+@declare_columns(required=["team", "prev_match_result"], produced=["win_streak"])
 def add_win_streak(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Add a team's running win/loss streak through the end of the current match"""
 
@@ -221,108 +335,184 @@ def add_win_streak(data_frame: pd.DataFrame) -> pd.DataFrame:
             f"{data_frame.columns}"
         )
 
-    win_groups = data_frame["prev_match_result"].groupby(
-        level=TEAM_LEVEL, group_keys=False
-    )
-    streak_groups = []
-
-    for team_group_key, team_group in win_groups:
-        streaks: List = []
-
-        for idx, result in enumerate(team_group):
-            # 1 represents win, 0.5 represents draw
-            if result > 0:
-                if idx == 0 or streaks[idx - 1] <= 0:
-                    streaks.append(result)
-                else:
-                    streaks.append(streaks[idx - 1] + result)
-            # 0 represents loss
-            elif result == 0:
-                if idx == 0 or streaks[idx - 1] >= 0:
-                    streaks.append(-1)
-                else:
-                    streaks.append(streaks[idx - 1] - 1)
-            elif result < 0:
-                raise ValueError(
-                    f"No results should be negative, but {result} "
-                    f"is at index {idx} of group {team_group_key}"
-                )
-            else:
-                # For a team's first match in the data set or any rogue NaNs, we add 0
-                streaks.append(0)
-
-        streak_groups.extend(streaks)
-
-    return data_frame.assign(
-        win_streak=pd.Series(streak_groups, index=data_frame.index)
-    )
-
-
-def add_out_of_state(data_frame: pd.DataFrame) -> pd.DataFrame:
-    """Add whether a team is playing out of their home state."""
+    results = data_frame["prev_match_result"]
+    negative_results = results[results < 0]
 
-    if any([req_col not in data_frame.columns for req_col in ["venue", "team"]]):
+    if not negative_results.empty:
         raise ValueError(
-            "To calculate out of state matches, 'venue' and 'team' "
-            "must be in the data frame, but the columns given were "
-            f"{data_frame.columns}"
+            f"No results should be negative, but {negative_results.iloc[0]} "
+            f"is at index {negative_results.index[0]}"
         )
 
-    venue_state = data_frame["venue"].map(lambda x: CITIES[VENUE_CITIES[x]]["state"])
-    team_state = data_frame["team"].map(lambda x: CITIES[TEAM_CITIES[x]]["state"])
+    team_codes, _ = pd.factorize(data_frame.index.get_level_values(TEAM_LEVEL))
+    # Stable sort keeps each team's matches in their original order
+    sort_order = np.argsort(team_codes, kind="mergesort")
+    sorted_team_codes = team_codes[sort_order]
+    sorted_results = results.values[sort_order].astype(float)
+
+    # 1 represents win streaks (including draws, which add 0.5),
+    # -1 represents losing streaks, and 0 represents a team's first match
+    # in the data set or any rogue NaNs, which break streaks
+    with np.errstate(invalid="ignore"):
+        streak_directions = np.select(
+            [sorted_results > 0, sorted_results == 0], [1, -1], default=0
+        )
+    row_positions = np.arange(len(sorted_results))
+    is_streak_start = np.concatenate(
+        [
+            [True],
+            (np.diff(sorted_team_codes) != 0)
+            | (np.diff(streak_directions) != 0)
+            | (streak_directions[1:] == 0),
+        ]
+    )
+    streak_starts = row_positions[is_streak_start]
+    streak_ids = np.cumsum(is_streak_start) - 1
 
-    return data_frame.assign(out_of_state=(team_state != venue_state).astype(int))
+    win_values = np.where(streak_directions == 1, sorted_results, 0)
+    cum_win_values = np.cumsum(win_values)
+    win_streaks = (
+        cum_win_values - (cum_win_values - win_values)[streak_starts][streak_ids]
+    )
+    loss_streaks = streak_starts[streak_ids] - row_positions - 1
+
+    sorted_streaks = np.select(
+        [streak_directions == 1, streak_directions == -1],
+        [win_streaks, loss_streaks],
+        default=0,
+    )
+    streaks = np.empty(len(sorted_streaks))
+    streaks[sort_order] = sorted_streaks
+
+    return add_columns(
+        data_frame,
+        win_streak=streaks.astype(results.dtype)
+        if pd.api.types.is_integer_dtype(results)
+        else streaks,
+    )
 
 
 # Got the formula from https://www.movable-type.co.uk/scripts/latlong.html
 
 
 def _haversine_formula(
-    lat_long1: Tuple[float, float], lat_long2: Tuple[float, float]
-) -> float:
+    lat_long1: Tuple[np.ndarray, np.ndarray], lat_long2: Tuple[np.ndarray, np.ndarray]
+) -> np.ndarray:
     """Formula for distance between two pairs of latitudes & longitudes"""
 
     lat1, long1 = lat_long1
     lat2, long2 = lat_long2
     # Latitude & longitude are in degrees, so have to convert to radians for
     # trigonometric functions
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
     delta_phi = phi2 - phi1
-    delta_lambda = math.radians(long2 - long1)
-    a = math.sin(delta_phi / 2) ** 2 + (
-        math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    delta_lambda = np.radians(long2 - long1)
+    a = np.sin(delta_phi / 2) ** 2 + (
+        np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
     )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
     return EARTH_RADIUS * c
 
 
-def add_travel_distance(data_frame: pd.DataFrame) -> pd.DataFrame:
-    """Add distance between each team's home city and the venue city for the match"""
+def _city_values(city_names: List[str], key: str) -> np.ndarray:
+    return np.array([CITIES[city_name][key] for city_name in city_names])
+
+
+def _team_venue_lookups() -> Tuple[pd.Index, pd.Index, np.ndarray, np.ndarray]:
+    """
+    Build team-city x venue-city lookup tables for travel distance & out-of-state
+    features, with teams and venues mapped to integer codes via their indexes.
+    """
+
+    team_names = pd.Index(sorted(TEAM_CITIES.keys()))
+    venue_names = pd.Index(sorted(VENUE_CITIES.keys()))
+    team_cities = [TEAM_CITIES[team_name] for team_name in team_names]
+    venue_cities = [VENUE_CITIES[venue_name] for venue_name in venue_names]
+
+    # Teams are rows & venues are columns
+    team_lat_long = (
+        _city_values(team_cities, "lat")[:, np.newaxis],
+        _city_values(team_cities, "long")[:, np.newaxis],
+    )
+    venue_lat_long = (
+        _city_values(venue_cities, "lat")[np.newaxis, :],
+        _city_values(venue_cities, "long")[np.newaxis, :],
+    )
+    distances = _haversine_formula(venue_lat_long, team_lat_long)
+    are_out_of_state = (
+        _city_values(team_cities, "state")[:, np.newaxis]
+        != _city_values(venue_cities, "state")[np.newaxis, :]
+    ).astype(int)
+
+    return team_names, venue_names, distances, are_out_of_state
+
 
+(
+    GEO_TEAM_NAMES,
+    GEO_VENUE_NAMES,
+    TEAM_VENUE_DISTANCES,
+    TEAM_VENUE_OUT_OF_STATE,
+) = _team_venue_lookups()
+
+
+def _team_venue_codes(
+    data_frame: pd.DataFrame, feature_label: str
+) -> Tuple[np.ndarray, np.ndarray]:
     if any([req_col not in data_frame.columns for req_col in ["venue", "team"]]):
         raise ValueError(
-            "To calculate travel distance, 'venue' and 'team' "
+            f"To calculate {feature_label}, 'venue' and 'team' "
             "must be in the data frame, but the columns given were "
             f"{data_frame.columns}"
         )
 
-    venue_lat_long = data_frame["venue"].map(
-        lambda x: (CITIES[VENUE_CITIES[x]]["lat"], CITIES[VENUE_CITIES[x]]["long"])
-    )
-    team_lat_long = data_frame["team"].map(
-        lambda x: (CITIES[TEAM_CITIES[x]]["lat"], CITIES[TEAM_CITIES[x]]["long"])
+    team_codes = GEO_TEAM_NAMES.get_indexer(data_frame["team"])
+    venue_codes = GEO_VENUE_NAMES.get_indexer(data_frame["venue"])
+
+    if (team_codes == -1).any() or (venue_codes == -1).any():
+        unknown_teams = list(data_frame["team"][team_codes == -1].unique())
+        unknown_venues = list(data_frame["venue"][venue_codes == -1].unique())
+
+        raise ValueError(
+            f"To calculate {feature_label}, all teams and venues must have cities "
+            "in TEAM_CITIES and VENUE_CITIES, but the following are missing:\n"
+            f"Teams: {unknown_teams}\nVenues: {unknown_venues}"
+        )
+
+    return team_codes, venue_codes
+
+
+@declare_columns(
+    required=["venue", "team"], produced=["out_of_state"], lookback_seasons=0
+)
+def add_out_of_state(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """Add whether a team is playing out of their home state."""
+
+    team_codes, venue_codes = _team_venue_codes(data_frame, "out of state matches")
+
+    return add_columns(
+        data_frame, out_of_state=TEAM_VENUE_OUT_OF_STATE[team_codes, venue_codes]
     )
 
-    return data_frame.assign(
-        travel_distance=[
-            _haversine_formula(*lats_longs)
-            for lats_longs in zip(venue_lat_long, team_lat_long)
-        ]
+
+@declare_columns(
+    required=["venue", "team"], produced=["travel_distance"], lookback_seasons=0
+)
+def add_travel_distance(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """Add distance between each team's home city and the venue city for the match"""
+
+    team_codes, venue_codes = _team_venue_codes(data_frame, "travel distance")
+
+    return add_columns(
+        data_frame, travel_distance=TEAM_VENUE_DISTANCES[team_codes, venue_codes]
     )
 
 
+@declare_columns(
+    required=["player_id", "year", "brownlow_votes"],
+    produced=["last_year_brownlow_votes"],
+)
 def add_last_year_brownlow_votes(data_frame: pd.DataFrame):
     """Add column for a player's total brownlow votes from the previous season"""
 
@@ -335,55 +525,48 @@ def add_last_year_brownlow_votes(data_frame: pd.DataFrame):
             f"{data_frame.columns}"
         )
 
-    brownlow_last_year = (
-        data_frame[["player_id", "year", "brownlow_votes"]]
-        .groupby(["player_id", "year"], group_keys=True)
-        .sum()
-        # Grouping by player to shift by year
-        .groupby(level=0)
-        .shift()
-        .fillna(0)
-        .rename(columns={"brownlow_votes": "last_year_brownlow_votes"})
+    # Like groupby, rows with missing keys don't get grouped, and their values stay NaN
+    has_key = data_frame["player_id"].notna().values & data_frame["year"].notna().values
+
+    # Group IDs are numbered in (player_id, year) order, so each player's seasons
+    # are contiguous & chronological
+    player_ids = key_values(data_frame["player_id"])[has_key]
+    votes = data_frame["brownlow_votes"].fillna(0).values[has_key]
+    player_year_ids = (
+        pd.Series(votes)
+        .groupby([player_ids, data_frame["year"].values[has_key]])
+        .ngroup()
+        .values
     )
-    return (
-        data_frame.drop("brownlow_votes", axis=1)
-        .merge(brownlow_last_year, on=["player_id", "year"], how="left")
-        .set_index(data_frame.index)
+    yearly_votes = np.bincount(player_year_ids, weights=votes)
+
+    player_year_players = np.empty(len(yearly_votes), dtype=player_ids.dtype)
+    player_year_players[player_year_ids] = player_ids
+
+    last_year_votes = np.zeros(len(yearly_votes))
+    is_same_player = player_year_players[1:] == player_year_players[:-1]
+    last_year_votes[1:][is_same_player] = yearly_votes[:-1][is_same_player]
+
+    last_year_brownlow_votes = np.full(len(data_frame), np.nan)
+    last_year_brownlow_votes[has_key] = last_year_votes[player_year_ids]
+
+    return drop_columns(
+        add_columns(data_frame, last_year_brownlow_votes=last_year_brownlow_votes),
+        "brownlow_votes",
     )
 
 
+@declare_columns(
+    required=["player_id", "year", "round_number", *PLAYER_STATS_COLS],
+    produced=[f"rolling_prev_match_{stats_col}" for stats_col in PLAYER_STATS_COLS],
+)
 def add_rolling_player_stats(data_frame: pd.DataFrame):
     """Replace players' invidual match stats with rolling averages of those stats"""
 
-    STATS_COLS = [
-        "player_id",
-        "kicks",
-        "marks",
-        "handballs",
-        "goals",
-        "behinds",
-        "hit_outs",
-        "tackles",
-        "rebounds",
-        "inside_50s",
-        "clearances",
-        "clangers",
-        "frees_for",
-        "frees_against",
-        "contested_possessions",
-        "uncontested_possessions",
-        "contested_marks",
-        "marks_inside_50",
-        "one_percenters",
-        "bounces",
-        "goal_assists",
-        "time_on_ground",
-    ]
+    STATS_COLS = ["player_id", *PLAYER_STATS_COLS]
 
     rolling_stats_cols = {
-        stats_col: f"rolling_prev_match_{stats_col}"
-        for stats_col in STATS_COLS
-        if stats_col != "player_id"
+        stats_col: f"rolling_prev_match_{stats_col}" for stats_col in PLAYER_STATS_COLS
     }
 
     if any([req_col not in data_frame.columns for req_col in STATS_COLS]):
@@ -393,27 +576,44 @@ def add_rolling_player_stats(data_frame: pd.DataFrame):
             f"given were {list(data_frame.columns)}"
         )
 
-    player_data_frame = data_frame.sort_values(["player_id", "year", "round_number"])
-    player_groups = (
-        player_data_frame[STATS_COLS]
-        .groupby("player_id", group_keys=False)
-        .shift()
-        .assign(player_id=player_data_frame["player_id"])
-        .fillna(0)
-        .groupby("player_id", group_keys=False)
+    player_order = np.lexsort(
+        (
+            data_frame["round_number"].values,
+            data_frame["year"].values,
+            key_values(data_frame["player_id"]),
+        )
     )
-
-    rolling_stats = player_groups.rolling(window=23).mean()
-    expanding_stats = player_groups.expanding(1).mean()
-    player_stats = (
-        rolling_stats.fillna(expanding_stats).drop("player_id", axis=1).sort_index()
+    player_ids = key_values(data_frame["player_id"])[player_order]
+    player_starts = np.flatnonzero(
+        np.concatenate([[True], player_ids[1:] != player_ids[:-1]])
+    )
+    # Stats are small counts, so float32 holds them exactly at half the memory
+    stats_values = np.nan_to_num(
+        data_frame[PLAYER_STATS_COLS].values.astype(np.float32)[player_order]
+    )
+    rolling_stats = shifted_rolling_means(
+        stats_values, player_starts, AVG_SEASON_LENGTH
     )
 
-    return player_data_frame.assign(**player_stats.to_dict("series")).rename(
-        columns=rolling_stats_cols
+    # Overwriting the stats columns while taking the rows copies the data frame once.
+    # Relabelling them afterwards keeps it that way, unlike DataFrame.rename,
+    # which consolidates the overwritten columns into a new copy of their blocks
+    player_data_frame = reorder_rows(
+        data_frame,
+        player_order,
+        **{
+            stats_col: rolling_stats[:, col_idx]
+            for col_idx, stats_col in enumerate(PLAYER_STATS_COLS)
+        },
     )
+    player_data_frame.columns = [
+        rolling_stats_cols.get(col, col) for col in player_data_frame.columns
+    ]
 
+    return player_data_frame
 
+
+@declare_columns(required=["player_id"], produced=["cum_matches_played"])
 def add_cum_matches_played(data_frame: pd.DataFrame):
     """Add cumulative number of matches each player has played"""
 
@@ -424,129 +624,275 @@ def add_cum_matches_played(data_frame: pd.DataFrame):
             f"{list(data_frame.columns)}"
         )
 
-    return data_frame.assign(
-        cum_matches_played=data_frame.groupby("player_id").cumcount()
+    return add_columns(
+        data_frame, cum_matches_played=data_frame.groupby("player_id").cumcount()
     )
 
 
 # Basing ELO calculations on:
 # http://www.matterofstats.com/mafl-stats-journal/2013/10/13/building-your-own-team-rating-system.html
 def _elo_formula(
-    prev_elo_rating: float, prev_oppo_elo_rating: float, margin: int, at_home: bool
-):
-    hga = HGA if at_home else HGA * -1
+    prev_elo_rating: np.ndarray,
+    prev_oppo_elo_rating: np.ndarray,
+    margin: np.ndarray,
+    at_home: np.ndarray,
+    k: Union[float, np.ndarray] = K,
+    x: Union[float, np.ndarray] = X,
+    m: Union[float, np.ndarray] = M,
+    hga: Union[float, np.ndarray] = HGA,
+    s: Union[float, np.ndarray] = S,
+) -> np.ndarray:
+    # Multiplying instead of branching on at_home lets missing values propagate
+    # as NaNs rather than silently counting as home matches
+    home_advantage = hga * ((2 * at_home) - 1)
     expected_outcome = 1 / (
-        1 + 10 ** ((prev_oppo_elo_rating - prev_elo_rating - hga) / S)
+        1 + 10 ** ((prev_oppo_elo_rating - prev_elo_rating - home_advantage) / s)
     )
-    actual_outcome = X + 0.5 - X ** (1 + (margin / M))
+    actual_outcome = x + 0.5 - x ** (1 + (margin / m))
 
-    return prev_elo_rating + (K * (actual_outcome - expected_outcome))
+    return prev_elo_rating + (k * (actual_outcome - expected_outcome))
 
 
-def _calculate_elo_rating(prev_match: pd.Series, cum_elo_ratings: pd.Series, year: int):
-    if cum_elo_ratings is None or prev_match is None:
-        return BASE_RATING
-    else:
-        prev_year, prev_round, _ = prev_match.name
+def _round_boundaries(years: np.ndarray, round_numbers: np.ndarray) -> np.ndarray:
+    """Start positions of each (year, round_number) block plus the end position"""
 
-        prev_elo_rating = cum_elo_ratings.loc[prev_match.name]
+    is_new_round = np.concatenate(
+        [[True], (np.diff(years) != 0) | (np.diff(round_numbers) != 0)]
+    )
 
-        if isinstance(prev_elo_rating, pd.Series):
-            raise TypeError(
-                f"ELO series returned a subsection of itself at index {prev_match.name} "
-                "when a single value is expected. Check the data frame for duplicate "
-                "index values."
-            )
+    return np.append(np.flatnonzero(is_new_round), len(years))
 
-        prev_oppo_elo_rating = cum_elo_ratings.loc[
-            prev_year, prev_round, prev_match["oppo_team"]
-        ]
-        prev_margin = prev_match["score"] - prev_match["oppo_score"]
-        prev_at_home = bool(prev_match["at_home"])
 
-        elo_rating = _elo_formula(
-            prev_elo_rating, prev_oppo_elo_rating, prev_margin, prev_at_home
-        )
+def _round_rows(rows: np.ndarray, round_start: int) -> np.ndarray:
+    """Row positions relative to the start of their round (-1 stays -1)"""
 
-    if prev_match["year"] != year:
-        return (elo_rating * CARRYOVER) + (BASE_RATING * (1 - CARRYOVER))
+    return np.where(rows == -1, -1, rows - round_start)
 
-    return elo_rating
 
+def _next_win_streaks(win_streaks: np.ndarray, results: np.ndarray) -> np.ndarray:
+    return np.select(
+        [results > 0, results == 0],
+        [
+            np.where(win_streaks <= 0, results, win_streaks + results),
+            np.where(win_streaks >= 0, -1, win_streaks - 1),
+        ],
+        default=0,
+    )
 
-def _get_previous_match(
-    data_frame: pd.DataFrame, year: int, round_number: int, team: str
-):
-    prev_team_matches = data_frame.loc[
-        (data_frame["team"] == team)
-        & (data_frame["year"] == year)
-        & (data_frame["round_number"] < round_number),
-        :,
-    ]
 
-    # If we can't find any previous matches this season, filter by last season
-    if not prev_team_matches.any().any():
-        prev_team_matches = data_frame.loc[
-            (data_frame["team"] == team) & (data_frame["year"] == year - 1), :
-        ]
+def _initial_team_states(
+    team_names: pd.Index, team_states: Optional[pd.DataFrame]
+) -> Dict[str, np.ndarray]:
+    n_teams = len(team_names)
+    initial_states = {
+        **{col: np.zeros(n_teams) for col in TEAM_STATE_COLS},
+        # A year of 0 means the team hasn't played yet
+        "year": np.zeros(n_teams, dtype=int),
+        "round_number": np.zeros(n_teams, dtype=int),
+        "elo_rating": np.full(n_teams, np.nan),
+        # Missing previous results are filled with 0, so a team's first match
+        # follows a 'loss'
+        "win_streak": np.full(n_teams, -1.0),
+    }
 
-    if not prev_team_matches.any().any():
-        return None
+    if team_states is None:
+        return initial_states
 
-    return prev_team_matches.iloc[-1, :]
+    team_codes = team_names.get_indexer(team_states.index)
 
+    for col in TEAM_STATE_COLS:
+        initial_states[col][team_codes] = team_states[col].values
 
-# Assumes df sorted by year & round_number, with ascending=True in order to find teams'
-# previous matches
-def _calculate_match_elo_rating(
-    root_data_frame: pd.DataFrame,
-    cum_elo_ratings: Optional[pd.Series],
-    items: Tuple[EloIndexType, pd.Series],
-):
-    data_frame = root_data_frame.copy()
-    index, _ = items
-    year, round_number, team = index
+    return initial_states
 
-    prev_match = _get_previous_match(data_frame, year, round_number, team)
-    elo_rating = _calculate_elo_rating(prev_match, cum_elo_ratings, year)
 
-    elo_data = [elo_rating]
-    elo_index = pd.MultiIndex.from_tuples([(year, round_number, team)])
-    elo_ratings = pd.Series(data=elo_data, index=elo_index)
+def _walk_team_rounds(
+    data_frame: pd.DataFrame, team_states: Optional[pd.DataFrame] = None
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Walk through matches once in (year, round_number) order, keeping each team's
+    state in arrays indexed by team code.
+
+    Args:
+        data_frame (pandas.DataFrame): Team-match data.
+        team_states (pandas.DataFrame, optional): End-of-round states indexed by team
+            from which to continue (see team_states.latest_team_states).
+
+    Returns:
+        Tuple of dicts of arrays in the data frame's row order: teams' pre-match
+            features and teams' end-of-round states.
+    """
 
-    if cum_elo_ratings is None:
-        return elo_ratings.copy()
+    state_teams = [] if team_states is None else list(team_states.index)
+    team_codes, team_names = pd.factorize(
+        pd.concat(
+            [data_frame["team"], data_frame["oppo_team"], pd.Series(state_teams)]
+        ),
+        sort=True,
+    )
+    n_rows = len(data_frame)
+
+    teams = team_codes[:n_rows]
+    oppo_teams = team_codes[n_rows : n_rows * 2]
+    years = data_frame["year"].values
+    round_numbers = data_frame["round_number"].values
+    scores = data_frame["score"].values.astype(float)
+    oppo_scores = data_frame["oppo_score"].values.astype(float)
+    at_home = (
+        data_frame["at_home"].values.astype(float)
+        if "at_home" in data_frame.columns
+        else np.full(n_rows, np.nan)
+    )
+
+    sort_order = np.lexsort((teams, round_numbers, years))
+    sorted_teams = teams[sort_order]
+    sorted_oppo_teams = oppo_teams[sort_order]
+    sorted_years = years[sort_order]
+    sorted_round_numbers = round_numbers[sort_order]
+    sorted_scores = scores[sort_order]
+    sorted_oppo_scores = oppo_scores[sort_order]
+    sorted_at_home = at_home[sort_order]
+
+    sorted_opponent_rows = opponent_rows(
+        sorted_years, sorted_round_numbers, sorted_teams, sorted_oppo_teams
+    )
 
-    return cum_elo_ratings.append(elo_ratings)
+    states = _initial_team_states(team_names, team_states)
+    sorted_features = {col: np.empty(n_rows) for col in STATE_FEATURE_COLS}
+    sorted_states = {col: np.empty(n_rows) for col in TEAM_STATE_COLS}
+    round_boundaries = _round_boundaries(sorted_years, sorted_round_numbers)
+
+    for round_start, round_end in zip(round_boundaries[:-1], round_boundaries[1:]):
+        round_slice = slice(round_start, round_end)
+        round_teams = sorted_teams[round_slice]
+        year = sorted_years[round_start]
+        prev_years = states["year"][round_teams]
+        is_same_season = prev_years == year
+        # Teams that didn't play this season or last season start from scratch
+        has_prev_match = prev_years >= year - 1
+
+        elo_ratings = np.where(
+            is_same_season,
+            states["elo_rating"][round_teams],
+            (states["elo_rating"][round_teams] * CARRYOVER)
+            + (BASE_RATING * (1 - CARRYOVER)),
+        )
+        elo_ratings = np.where(has_prev_match, elo_ratings, BASE_RATING)
+
+        if np.isnan(elo_ratings).any():
+            raise ValueError(
+                f"Could not calculate ELO ratings for {year}, round "
+                f"{sorted_round_numbers[round_start]}, "
+                "because some teams' previous matches are missing 'at_home' values "
+                "or the opposition team's row from the same round."
+            )
 
+        prev_scores = states["score"][round_teams]
+        prev_oppo_scores = states["oppo_score"][round_teams]
+        prev_results = states["result"][round_teams]
+        # Cumulative stats reset each season, but the first match of a season
+        # still includes the result from the previous match
+        cum_scores = np.where(
+            is_same_season, states["cum_score"][round_teams], prev_scores
+        )
+        cum_oppo_scores = np.where(
+            is_same_season, states["cum_oppo_score"][round_teams], prev_oppo_scores
+        )
+        cum_win_points = np.where(
+            is_same_season,
+            states["cum_win_points"][round_teams],
+            prev_results * WIN_POINTS,
+        )
 
+        round_features = {
+            "elo_rating": elo_ratings,
+            "prev_match_score": prev_scores,
+            "prev_match_oppo_score": prev_oppo_scores,
+            "prev_match_result": prev_results,
+            "prev_match_margin": states["margin"][round_teams],
+            "cum_win_points": cum_win_points,
+            "cum_percent": pd.Series(cum_scores).div(cum_oppo_scores).values,
+            "win_streak": states["win_streak"][round_teams],
+        }
+
+        round_scores = sorted_scores[round_slice]
+        round_oppo_scores = sorted_oppo_scores[round_slice]
+        round_margins = round_scores - round_oppo_scores
+        round_results = (round_scores > round_oppo_scores) + (
+            (round_scores == round_oppo_scores) * 0.5
+        )
+        end_cum_scores = cum_scores + round_scores
+        end_cum_oppo_scores = cum_oppo_scores + round_oppo_scores
+
+        round_states = {
+            "year": year,
+            "round_number": sorted_round_numbers[round_start],
+            "elo_rating": _elo_formula(
+                elo_ratings,
+                take_rows(
+                    elo_ratings,
+                    _round_rows(sorted_opponent_rows[round_slice], round_start),
+                ),
+                round_margins,
+                sorted_at_home[round_slice],
+            ),
+            "cum_win_points": cum_win_points + (round_results * WIN_POINTS),
+            "cum_score": end_cum_scores,
+            "cum_oppo_score": end_cum_oppo_scores,
+            "cum_percent": pd.Series(end_cum_scores).div(end_cum_oppo_scores).values,
+            "win_streak": _next_win_streaks(
+                round_features["win_streak"], round_results
+            ),
+            "score": round_scores,
+            "oppo_score": round_oppo_scores,
+            "result": round_results,
+            "margin": round_margins,
+        }
+
+        for col in STATE_FEATURE_COLS:
+            sorted_features[col][round_slice] = round_features[col]
+
+        for col in TEAM_STATE_COLS:
+            states[col][round_teams] = round_states[col]
+            sorted_states[col][round_slice] = round_states[col]
+
+    features = {col: np.empty(n_rows) for col in STATE_FEATURE_COLS}
+    end_of_round_states = {col: np.empty(n_rows) for col in TEAM_STATE_COLS}
+
+    for col in STATE_FEATURE_COLS:
+        features[col][sort_order] = sorted_features[col]
+
+    for col in TEAM_STATE_COLS:
+        end_of_round_states[col][sort_order] = sorted_states[col]
+
+    return features, end_of_round_states
+
+
+@declare_columns(required=TEAM_STATE_DATA_COLS + ["at_home"], produced=["elo_rating"])
 def add_elo_rating(data_frame: pd.DataFrame):
     """Add ELO rating of team prior to matches"""
 
-    if "score" not in data_frame.columns or "oppo_score" not in data_frame.columns:
+    _validate_team_state_data(data_frame, "ELO ratings")
+    features, _ = _walk_team_rounds(data_frame)
+
+    return add_columns(data_frame, elo_rating=features["elo_rating"])
+
+
+def _validate_team_state_data(data_frame: pd.DataFrame, feature_label: str) -> None:
+    required_cols = TEAM_STATE_DATA_COLS
+
+    if any((req_col not in data_frame.columns for req_col in required_cols)):
         raise ValueError(
-            "To calculate ELO ratings, 'score' and 'oppo_score' must be "
-            "in the data frame, but the columns given were "
+            f"To calculate {feature_label}, all required columns ({required_cols}) "
+            "must be in the data frame, but the columns given were "
             f"{list(data_frame.columns)}"
         )
 
-    elo_data_frame = data_frame.reorder_levels(
-        [YEAR_LEVEL, ROUND_LEVEL, TEAM_LEVEL]
-    ).sort_index(ascending=True)
-
-    elo_column = (
-        reduce(
-            partial(_calculate_match_elo_rating, elo_data_frame),
-            elo_data_frame.iterrows(),
-            None,
-        )
-        .reorder_levels(
-            [REORDERED_TEAM_LEVEL, REORDERED_YEAR_LEVEL, REORDERED_ROUND_LEVEL]
+    if data_frame.duplicated(subset=INDEX_COLS).any():
+        raise ValueError(
+            f"{feature_label} can only be calculated with one row per team per round. "
+            "Check the data frame for duplicate team/year/round_number values."
         )
-        .sort_index()
-    )
-
-    return data_frame.assign(elo_rating=elo_column)
 
 
 def _shift_features(columns: List[str], shift: bool, data_frame: pd.DataFrame):
@@ -567,14 +913,25 @@ def _shift_features(columns: List[str], shift: bool, data_frame: pd.DataFrame):
     # Group by team (not team & year) to get final score from previous season for round 1.
     # This reduces number of rows that need to be dropped and prevents gaps
     # for cumulative features
+    previous_rows = get_team_timeline(data_frame).grouping(TEAM_GROUP).previous_rows()
+    has_previous_match = np.repeat(
+        (previous_rows != -1)[:, np.newaxis], len(columns_to_shift), axis=1
+    )
     shifted_features = (
-        data_frame.groupby("team")[columns_to_shift]
-        .shift()
+        data_frame[columns_to_shift]
+        .iloc[np.maximum(previous_rows, 0)]
+        .set_index(data_frame.index)
+        .where(has_previous_match)
         .fillna(0)
-        .rename(columns=shifted_col_names)
     )
 
-    return pd.concat([data_frame, shifted_features], axis=1)
+    return add_columns(
+        data_frame,
+        **{
+            shifted_col_names[col]: shifted_features[col].values
+            for col in columns_to_shift
+        },
+    )
 
 
 def add_shifted_team_features(
@@ -595,5 +952,14 @@ def add_shifted_team_features(
 
     shift = any(shift_columns)
     columns = shift_columns if shift else keep_columns
+    shift_features = partial(_shift_features, columns, shift)
+
+    # Shifted columns for keep_columns depend on the data frame, so they can't be
+    # declared ahead of time
+    if not shift:
+        return shift_features
 
-    return partial(_shift_features, columns, shift)
+    return declare_columns(
+        required=["team", *shift_columns],
+        produced=[f"prev_match_{col}" for col in shift_columns],
+    )(shift_features)
@@ -0,0 +1,239 @@
+"""Module for planning which feature functions to run for a set of output columns.
+
+Feature functions and calculators declare the columns that they require
+and produce via declare_columns (and optionally how many previous seasons they read,
+so FeatureBuilder can run season-local ones on partitions of seasons).
+Given the columns that are needed downstream, plan_features drops the feature
+functions that don't contribute to them and orders the rest so that every function
+runs after the functions producing its required columns.
+"""
+
+from typing import (
+    Callable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+)
+from functools import partial
+import pandas as pd
+
+from server.types import DataFrameTransformer
+
+F = TypeVar("F", bound=Callable)
+
+
+class FeatureColumns(NamedTuple):
+    """
+    Columns that a feature function requires from & adds to data frames,
+    and the number of previous seasons that it reads to calculate a season's values
+    (None if it can read any earlier rows)
+    """
+
+    required: Sequence[str]
+    produced: Sequence[str]
+    lookback_seasons: Optional[int] = None
+
+
+class FeaturePlan(NamedTuple):
+    """Feature functions to run, in order, with a report of the planning decisions.
+
+    Attributes:
+        feature_funcs (list): Feature functions needed for the output columns.
+        report (pandas.DataFrame): One row per original feature function with its
+            name, declared columns, whether it's included and its order in the plan.
+    """
+
+    feature_funcs: List[DataFrameTransformer]
+    report: pd.DataFrame
+
+
+def declare_columns(
+    required: Iterable[str] = (),
+    produced: Iterable[str] = (),
+    lookback_seasons: Optional[int] = None,
+) -> Callable[[F], F]:
+    """
+    Attach column declarations to a feature function or calculator.
+    Works as a decorator or on partials (e.g. declare_columns(...)(partial(...))).
+    Feature functions that only read rows from the same season as each row
+    are season-local, with lookback_seasons=0.
+    """
+
+    def decorator(feature_func: F) -> F:
+        setattr(
+            feature_func,
+            "feature_columns",
+            FeatureColumns(
+                required=list(required),
+                produced=list(produced),
+                lookback_seasons=lookback_seasons,
+            ),
+        )
+
+        return feature_func
+
+    return decorator
+
+
+def feature_columns(feature_func: Callable) -> Optional[FeatureColumns]:
+    """Get a feature function's declared columns (None if it doesn't have any)"""
+
+    return getattr(feature_func, "feature_columns", None)
+
+
+def is_season_local(feature_func: Callable, lookback_seasons: int = 0) -> bool:
+    """
+    Whether a feature function's values for a season only depend on rows from
+    that season & the given number of previous seasons
+    """
+
+    columns = feature_columns(feature_func)
+
+    return (
+        columns is not None
+        and columns.lookback_seasons is not None
+        and columns.lookback_seasons <= lookback_seasons
+    )
+
+
+def feature_name(feature_func: Callable) -> str:
+    if isinstance(feature_func, partial):
+        return feature_name(feature_func.func)
+
+    # Memoized functions wrap the original
+    if hasattr(feature_func, "__wrapped__"):
+        return feature_name(getattr(feature_func, "__wrapped__"))
+
+    return getattr(feature_func, "__name__", repr(feature_func))
+
+
+def _dependencies(declarations: List[Optional[FeatureColumns]]) -> List[Set[int]]:
+    dependencies: List[Set[int]] = []
+
+    for func_idx, declaration in enumerate(declarations):
+        # Undeclared functions could use or change any column, so they have to
+        # stay after every function that comes before them
+        undeclared_dependencies = {
+            other_idx
+            for other_idx, other_declaration in enumerate(declarations[:func_idx])
+            if declaration is None or other_declaration is None
+        }
+        producer_dependencies = (
+            set()
+            if declaration is None
+            else {
+                other_idx
+                for other_idx, other_declaration in enumerate(declarations)
+                if other_idx != func_idx
+                and other_declaration is not None
+                and set(other_declaration.produced) & set(declaration.required)
+            }
+        )
+
+        dependencies.append(undeclared_dependencies | producer_dependencies)
+
+    return dependencies
+
+
+def _required_idxs(
+    declarations: List[Optional[FeatureColumns]],
+    dependencies: List[Set[int]],
+    output_cols: Iterable[str],
+) -> Set[int]:
+    output_col_set = set(output_cols)
+    # We can't tell whether undeclared functions produce output columns,
+    # so they always run
+    unvisited_idxs = [
+        func_idx
+        for func_idx, declaration in enumerate(declarations)
+        if declaration is None or set(declaration.produced) & output_col_set
+    ]
+    required_idxs: Set[int] = set()
+
+    while unvisited_idxs:
+        func_idx = unvisited_idxs.pop()
+
+        if func_idx in required_idxs:
+            continue
+
+        required_idxs.add(func_idx)
+        unvisited_idxs.extend(dependencies[func_idx] - required_idxs)
+
+    return required_idxs
+
+
+def _topological_order(func_idxs: Set[int], dependencies: List[Set[int]]) -> List[int]:
+    ordered_idxs: List[int] = []
+    remaining_idxs = sorted(func_idxs)
+
+    while remaining_idxs:
+        # Taking the earliest function whose dependencies have all run keeps
+        # the original order wherever it's already valid, and moves functions
+        # after the functions that produce their required columns otherwise
+        next_idx = next(
+            (
+                func_idx
+                for func_idx in remaining_idxs
+                if not (dependencies[func_idx] & set(remaining_idxs))
+            ),
+            None,
+        )
+
+        if next_idx is None:
+            raise ValueError(
+                "Feature functions have circular column dependencies: "
+                f"{remaining_idxs}"
+            )
+
+        ordered_idxs.append(next_idx)
+        remaining_idxs.remove(next_idx)
+
+    return ordered_idxs
+
+
+def plan_features(
+    feature_funcs: List[DataFrameTransformer], output_cols: Iterable[str]
+) -> FeaturePlan:
+    """
+    Plan the feature functions needed to produce the given output columns.
+
+    Args:
+        feature_funcs (list): Feature functions in the order they would run.
+        output_cols (iterable): Columns needed from the final data frame.
+
+    Returns:
+        FeaturePlan with the needed feature functions in topological order.
+    """
+
+    declarations = [feature_columns(feature_func) for feature_func in feature_funcs]
+    dependencies = _dependencies(declarations)
+    required_idxs = _required_idxs(declarations, dependencies, output_cols)
+    ordered_idxs = _topological_order(required_idxs, dependencies)
+
+    report = pd.DataFrame(
+        {
+            "feature_func": [feature_name(func) for func in feature_funcs],
+            "required": [
+                None if declaration is None else list(declaration.required)
+                for declaration in declarations
+            ],
+            "produced": [
+                None if declaration is None else list(declaration.produced)
+                for declaration in declarations
+            ],
+            "included": [idx in required_idxs for idx in range(len(feature_funcs))],
+            "order": [
+                ordered_idxs.index(idx) if idx in required_idxs else None
+                for idx in range(len(feature_funcs))
+            ],
+        },
+        columns=["feature_func", "required", "produced", "included", "order"],
+    )
+
+    return FeaturePlan(
+        feature_funcs=[feature_funcs[idx] for idx in ordered_idxs], report=report
+    )
@@ -0,0 +1,203 @@
+"""Module for aggregating groups of rows by their moments in one pass.
+
+GroupBy.aggregate calculates each aggregation of each column separately
+(and skew with a Python function per group), so instead the rows get sorted once
+by group, and count, sum, min, max & sums of powers of all columns are reduced
+over each group's contiguous rows together. Mean, std, var & skew are derived
+from those moments, with the same conventions as pandas (ddof=1 for std & var,
+adjusted Fisher-Pearson skew, missing values skipped). Rows sorted by group
+also give rolling means of each row's previous values as differences between
+cumulative sums at group start offsets (see shifted_rolling_means).
+"""
+
+from typing import List, NamedTuple, Tuple
+import pandas as pd
+from pandas.api.types import is_categorical_dtype
+import numpy as np
+
+MOMENT_AGGREGATIONS = ["count", "sum", "min", "max", "mean", "std", "var", "skew"]
+# pandas zeroes out moments this small, which it treats as floating-point error
+# (see pandas.core.nanops._zero_out_fperr)
+FLOATING_POINT_ERROR = 1e-14
+
+
+class GroupMoments(NamedTuple):
+    """Moments of each column for each group, as (group x column) arrays.
+
+    Attributes:
+        n_values (numpy.ndarray): Number of non-missing values.
+        sum (numpy.ndarray): Sum of values.
+        min (numpy.ndarray): Minimum value (NaN if there aren't any values).
+        max (numpy.ndarray): Maximum value (NaN if there aren't any values).
+        power_sums (tuple): Sums of the 1st, 2nd & 3rd powers of values' differences
+            from the group's minimum. Shifting the values keeps the sums small
+            enough that the central moments don't lose precision to cancellation.
+    """
+
+    n_values: np.ndarray
+    sum: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    power_sums: Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def sorted_groups(key_columns: List[pd.Series]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sort rows by the given key columns the way GroupBy does, dropping rows with
+    missing keys.
+
+    Returns:
+        Tuple of the sorted row positions & the positions (in the sorted rows)
+        where each group starts.
+    """
+
+    key_codes = np.array(
+        [
+            key_column.cat.codes.values
+            if is_categorical_dtype(key_column)
+            else pd.factorize(key_column, sort=True)[0]
+            for key_column in key_columns
+        ]
+    )
+
+    # np.lexsort sorts by the last key first
+    sort_order = np.lexsort(key_codes[::-1])
+    sort_order = sort_order[(key_codes[:, sort_order] != -1).all(axis=0)]
+
+    sorted_key_codes = key_codes[:, sort_order]
+    is_group_start = np.concatenate(
+        [[True], (sorted_key_codes[:, 1:] != sorted_key_codes[:, :-1]).any(axis=0)]
+    )
+
+    return sort_order, np.flatnonzero(is_group_start[: len(sort_order)])
+
+
+def group_moments(values: np.ndarray, group_starts: np.ndarray) -> GroupMoments:
+    """
+    Calculate the moments of each column of values (sorted by group)
+    for the groups starting at the given rows.
+    """
+
+    is_present = ~np.isnan(values)
+
+    # fmin/fmax ignore NaNs unless all the values are NaN
+    group_mins = np.fmin.reduceat(values, group_starts)
+    group_maxes = np.fmax.reduceat(values, group_starts)
+
+    group_sizes = np.diff(np.append(group_starts, len(values)))
+    shifted_values = np.where(
+        is_present, values - np.repeat(group_mins, group_sizes, axis=0), 0
+    )
+
+    return GroupMoments(
+        n_values=np.add.reduceat(is_present.astype(int), group_starts),
+        sum=np.add.reduceat(np.where(is_present, values, 0), group_starts),
+        min=group_mins,
+        max=group_maxes,
+        power_sums=(
+            np.add.reduceat(shifted_values, group_starts),
+            np.add.reduceat(shifted_values ** 2, group_starts),
+            np.add.reduceat(shifted_values ** 3, group_starts),
+        ),
+    )
+
+
+def _central_moments(moments: GroupMoments) -> Tuple[np.ndarray, np.ndarray]:
+    """Sums of the 2nd & 3rd powers of values' differences from their mean"""
+
+    count = moments.n_values
+    first_power_sum, second_power_sum, third_power_sum = moments.power_sums
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shifted_mean = first_power_sum / count
+        second_central_moment = second_power_sum - first_power_sum * shifted_mean
+        third_central_moment = (
+            third_power_sum
+            - 3 * shifted_mean * second_power_sum
+            + 2 * shifted_mean ** 2 * first_power_sum
+        )
+
+    return tuple(  # type: ignore
+        np.where(np.abs(central_moment) < FLOATING_POINT_ERROR, 0, central_moment)
+        for central_moment in (second_central_moment, third_central_moment)
+    )
+
+
+def aggregate_moments(moments: GroupMoments, aggregation: str) -> np.ndarray:
+    """Derive an aggregation (one of MOMENT_AGGREGATIONS) from groups' moments"""
+
+    if aggregation not in MOMENT_AGGREGATIONS:
+        raise ValueError(
+            f"Aggregation must be one of {MOMENT_AGGREGATIONS}, "
+            f"but received {aggregation}"
+        )
+
+    if aggregation == "count":
+        return moments.n_values
+
+    if aggregation in ["sum", "min", "max"]:
+        return getattr(moments, aggregation)
+
+    count = moments.n_values.astype(float)
+
+    if aggregation == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return moments.sum / count
+
+    second_central_moment, third_central_moment = _central_moments(moments)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if aggregation in ["var", "std"]:
+            variance = np.where(
+                count > 1, np.maximum(second_central_moment, 0) / (count - 1), np.nan
+            )
+
+            return variance if aggregation == "var" else np.sqrt(variance)
+
+        skew = (
+            count
+            * (count - 1) ** 0.5
+            / (count - 2)
+            * (third_central_moment / second_central_moment ** 1.5)
+        )
+
+    return np.where(count < 3, np.nan, np.where(second_central_moment == 0, 0, skew))
+
+
+def shifted_rolling_means(
+    values: np.ndarray, group_starts: np.ndarray, window: int
+) -> np.ndarray:
+    """
+    Calculate rolling means of each row's previous values within contiguous groups
+    of rows, treating the previous value of a group's first row as 0.
+    Rows with fewer than `window` values to average get expanding means instead.
+
+    Args:
+        values (np.ndarray): 2D array of values sorted by group.
+        group_starts (np.ndarray): Row positions at which each group starts.
+        window (int): Number of previous values to include in each mean.
+
+    Returns:
+        np.ndarray of float64 means with the same shape as values.
+    """
+
+    n_rows = len(values)
+
+    shifted_values = np.zeros_like(values)
+    shifted_values[1:] = values[:-1]
+    shifted_values[group_starts] = 0
+
+    # Summing in float64 keeps window differences exact for large cumulative sums
+    cum_values = np.zeros((n_rows + 1, values.shape[1]))
+    np.cumsum(shifted_values, axis=0, dtype=np.float64, out=cum_values[1:])
+
+    row_positions = np.arange(n_rows)
+    group_sizes = np.diff(np.append(group_starts, n_rows))
+    window_sizes = np.minimum(
+        row_positions - np.repeat(group_starts, group_sizes) + 1, window
+    )
+    window_ends = row_positions + 1
+
+    return (
+        cum_values[window_ends] - cum_values[window_ends - window_sizes]
+    ) / window_sizes[:, np.newaxis]
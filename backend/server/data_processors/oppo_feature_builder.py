@@ -1,7 +1,10 @@
 from typing import List, Optional
 import pandas as pd
+import numpy as np
 
+from server.ml_models.ml_model import index_data_frame
 from server.ml_models.data_config import INDEX_COLS
+from .team_timeline import get_team_timeline
 
 REQUIRED_COLS: List[str] = INDEX_COLS + ["oppo_team"]
 
@@ -21,6 +24,7 @@ class OppoFeatureBuilder:
             columns. All unlisted columns will be converted.
         oppo_feature_cols (list): List of column names for columns to convert to 'oppo'
             columns, then add to the data frame.
+        index_cols (list): Column names that data frames get indexed & sorted by.
     """
 
     def __init__(
@@ -35,10 +39,27 @@ class OppoFeatureBuilder:
 
         self.oppo_feature_cols = oppo_feature_cols
         self.match_cols = match_cols
+        self.index_cols = INDEX_COLS
 
     def transform(self, data_frame: pd.DataFrame) -> pd.DataFrame:
         """Add new opposition features to the given data frame."""
 
+        self.__validate_columns(data_frame)
+
+        return self.transform_indexed(index_data_frame(data_frame, self.index_cols))
+
+    def transform_indexed(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add new opposition features to a data frame that's already indexed & sorted
+        by index_cols (e.g. by a TransformerPlan).
+        """
+
+        self.__validate_columns(data_frame)
+
+        # concat materializes the data frame with its new columns in one go
+        return pd.concat([data_frame, self.__oppo_features(data_frame)], axis=1)
+
+    def __validate_columns(self, data_frame: pd.DataFrame) -> None:
         required_cols = REQUIRED_COLS + self.__cols_to_convert(data_frame)
 
         if any((req_col not in data_frame.columns for req_col in required_cols)):
@@ -48,17 +69,6 @@ class OppoFeatureBuilder:
                 f"but the columns given were {data_frame.columns}"
             )
 
-        transform_data_frame = (
-            data_frame.copy()
-            .set_index(INDEX_COLS, drop=False)
-            .rename_axis([None] * len(INDEX_COLS))
-            .sort_index()
-        )
-
-        return pd.concat(
-            [transform_data_frame, self.__oppo_features(transform_data_frame)], axis=1
-        )
-
     def __cols_to_convert(self, data_frame: pd.DataFrame) -> List[str]:
         if any(self.oppo_feature_cols):
             return self.oppo_feature_cols
@@ -74,16 +84,18 @@ class OppoFeatureBuilder:
             return None
 
         oppo_cols = {col_name: f"oppo_{col_name}" for col_name in cols_to_convert}
-        oppo_col_names = oppo_cols.values()
-        column_translations = {**{"oppo_team": "team"}, **oppo_cols}
-
-        return (
-            data_frame.reset_index(drop=True)
-            .loc[:, ["year", "round_number", "oppo_team"] + list(cols_to_convert)]
-            # We switch out oppo_team for team in the index,
-            # then assign feature as oppo_{feature_column}
-            .rename(columns=column_translations)
-            .set_index(INDEX_COLS)
-            .sort_index()
-            .loc[:, list(oppo_col_names)]
+        opponent_rows = get_team_timeline(data_frame).opponent_rows()
+
+        # Gathering the opposition rows by position lines them up with the data frame
+        # without re-indexing or sorting
+        oppo_features = (
+            data_frame.loc[:, list(cols_to_convert)]
+            .take(np.maximum(opponent_rows, 0))
+            .rename(columns=oppo_cols)
         )
+        oppo_features.index = data_frame.index
+
+        if (opponent_rows == -1).any():
+            oppo_features.loc[opponent_rows == -1, :] = np.nan
+
+        return oppo_features
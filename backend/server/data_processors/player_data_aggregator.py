@@ -1,8 +1,15 @@
 from typing import List, Dict, Union, Tuple
 import pandas as pd
+from pandas.api.types import is_integer_dtype
 import numpy as np
 
 from server.ml_models.data_config import INDEX_COLS
+from .group_moments import (
+    MOMENT_AGGREGATIONS,
+    sorted_groups,
+    group_moments,
+    aggregate_moments,
+)
 
 STATS_COLS = [
     "rolling_prev_match_kicks",
@@ -66,20 +73,12 @@ class PlayerDataAggregator:
                 f"{missing_cols}"
             )
 
-        # 'oppo_team' isn't an index column, but including it in the groupby
-        # doesn't change the grouping and makes it easier to keep for the final
-        # data frame.
         agg_data_frame = (
-            data_frame.drop(["player_id", "player_name"], axis=1)
-            .groupby(self.index_cols + ["oppo_team"])
-            .aggregate(self.__aggregations())
+            self.__aggregate_moments(data_frame)
+            if all([agg in MOMENT_AGGREGATIONS for agg in self.aggregations])
+            else self.__aggregate_groups(data_frame)
         )
 
-        agg_data_frame.columns = [
-            self.__agg_column_name(column_pair)
-            for column_pair in agg_data_frame.columns.values
-        ]
-
         # Various finals matches have been draws and replayed,
         # and sometimes home/away is switched requiring us to drop duplicates
         # at the end.
@@ -88,7 +87,6 @@ class PlayerDataAggregator:
         # not too worried about the loss of that data.
         return (
             agg_data_frame.dropna(axis=1)
-            .reset_index()
             .drop_duplicates(subset=self.index_cols, keep="last")
             .astype(
                 {
@@ -101,11 +99,63 @@ class PlayerDataAggregator:
             .sort_index()
         )
 
-    def __aggregations(self) -> Dict[str, Union[str, List[str]]]:
+    def __aggregate_moments(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        # 'oppo_team' isn't an index column, but including it in the group keys
+        # doesn't change the grouping and makes it easier to keep for the final
+        # data frame.
+        group_cols = self.index_cols + ["oppo_team"]
+        sort_order, group_starts = sorted_groups(
+            [data_frame[group_col] for group_col in group_cols]
+        )
+        group_rows = sort_order[group_starts]
+
+        value_cols = STATS_COLS + MATCH_STATS_COLS
+        moments = group_moments(
+            data_frame[value_cols].values.astype(float)[sort_order], group_starts
+        )
+        aggregated_values = {
+            agg: aggregate_moments(moments, agg)
+            for agg in set(self.aggregations + ["mean"])
+        }
+
+        agg_columns: Dict[str, Union[np.ndarray, pd.Series]] = {
+            group_col: data_frame[group_col].iloc[group_rows].values
+            for group_col in group_cols
+        }
+
+        for col_idx, col in enumerate(value_cols):
+            for agg in self.__aggregations()[col]:
+                agg_columns[self.__agg_column_name((col, agg))] = self.__agg_dtype(
+                    aggregated_values[agg][:, col_idx], data_frame[col].dtype, agg
+                )
+
+        return pd.DataFrame(agg_columns, columns=list(agg_columns.keys()))
+
+    def __aggregate_groups(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        agg_data_frame = (
+            data_frame.drop(["player_id", "player_name"], axis=1)
+            # Aggregating on a plain index avoids slicing the data frame's
+            # multi-index for every group
+            .reset_index(drop=True)
+            # Categorical teams would otherwise get a group for every combination
+            # of categories
+            .groupby(self.index_cols + ["oppo_team"], observed=True).aggregate(
+                self.__aggregations()
+            )
+        )
+
+        agg_data_frame.columns = [
+            self.__agg_column_name(column_pair)
+            for column_pair in agg_data_frame.columns.values
+        ]
+
+        return agg_data_frame.reset_index()
+
+    def __aggregations(self) -> Dict[str, List[str]]:
         player_aggs = {col: self.aggregations for col in STATS_COLS}
         # Since match stats are the same across player rows, taking the mean
         # is the easiest way to aggregate them
-        match_aggs = {col: "mean" for col in MATCH_STATS_COLS}
+        match_aggs = {col: ["mean"] for col in MATCH_STATS_COLS}
 
         return {**player_aggs, **match_aggs}
 
@@ -115,3 +165,12 @@ class PlayerDataAggregator:
         return (
             column_label if column_label in MATCH_STATS_COLS else "_".join(column_pair)
         )
+
+    @staticmethod
+    def __agg_dtype(values: np.ndarray, dtype: np.dtype, agg: str) -> np.ndarray:
+        # Like GroupBy, keep integer dtypes for aggregations of integer columns
+        # that can't be fractional
+        if not is_integer_dtype(dtype) or agg not in ["count", "sum", "min", "max"]:
+            return values
+
+        return values.astype(dtype if agg in ["min", "max"] else np.int64)
@@ -1,5 +1,8 @@
-from typing import List, Callable
+from typing import List
 import pandas as pd
+import numpy as np
+
+from .team_stacking import TEAM_TYPES, stacked_columns, stacked_data_frame, equal_values
 
 REQUIRED_COLS: List[str] = [
     "playing_for",
@@ -9,6 +12,7 @@ REQUIRED_COLS: List[str] = [
     "away_score",
     "match_id",
 ]
+DROPPED_COLS: List[str] = ["match_id", "playing_for"]
 
 
 class PlayerDataStacker:
@@ -31,28 +35,24 @@ class PlayerDataStacker:
                 f"{data_frame.columns}"
             )
 
-        team_dfs = [
-            self.__team_df(data_frame, "home"),
-            self.__team_df(data_frame, "away"),
+        # Players for the home team followed by players for the away team
+        team_type_rows = [
+            np.flatnonzero(
+                equal_values(data_frame["playing_for"], data_frame[f"{team_type}_team"])
+            )
+            for team_type in TEAM_TYPES
         ]
+        player_rows = np.concatenate(team_type_rows)
+        is_home = np.repeat([True, False], [len(rows) for rows in team_type_rows])
 
-        return pd.concat(team_dfs, sort=True).drop(["match_id", "playing_for"], axis=1)
-
-    def __team_df(self, data_frame: pd.DataFrame, team_type: str) -> pd.DataFrame:
-        return self.__sort_columns(
-            data_frame[data_frame["playing_for"] == data_frame[f"{team_type}_team"]]
-            .rename(columns=self.__replace_col_names(team_type))
-            .assign(at_home=1 if team_type == "home" else 0)
-        )
-
-    @staticmethod
-    def __replace_col_names(team_type: str) -> Callable[[str], str]:
-        oppo_team_type = "away" if team_type == "home" else "home"
-
-        return lambda col_name: (
-            col_name.replace(f"{team_type}_", "").replace(f"{oppo_team_type}_", "oppo_")
+        player_columns = [
+            stacked_column
+            for stacked_column in stacked_columns(data_frame.columns)
+            if stacked_column.label not in DROPPED_COLS
+        ]
+        player_data_frame = stacked_data_frame(
+            data_frame, player_columns, player_rows, is_home, sort_columns=True
         )
+        player_data_frame.index = data_frame.index.take(player_rows)
 
-    @staticmethod
-    def __sort_columns(data_frame: pd.DataFrame) -> pd.DataFrame:
-        return data_frame[data_frame.columns.sort_values()]
+        return player_data_frame
@@ -0,0 +1,244 @@
+"""Module for running season-local feature functions on partitions of seasons.
+
+Feature functions that declare lookback_seasons (see feature_plan.declare_columns)
+only read rows from the same season as each row, plus that many previous seasons,
+so their values can be calculated separately for partitions of consecutive seasons
+(with the previous seasons' rows included) in a pool of forked processes. The values
+for each partition's own seasons are then put back together in the data frame's
+row order.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import itertools
+import multiprocessing
+import pandas as pd
+import numpy as np
+
+from server.types import DataFrameTransformer
+from .team_timeline import active_team_timeline
+from .feature_plan import feature_columns, is_season_local, feature_name
+from .column_builder import active_column_builder, add_columns
+
+
+class SeasonPartition(NamedTuple):
+    """Rows of a data frame to calculate features for one partition of seasons.
+
+    Attributes:
+        rows (numpy.ndarray): Positions of the partition's rows in the data frame,
+            including the rows of the previous seasons that its features read.
+        season_rows (numpy.ndarray): Whether each of the partition's rows
+            belongs to the partition's own seasons.
+    """
+
+    rows: np.ndarray
+    season_rows: np.ndarray
+
+
+def partition_seasons(
+    years: np.ndarray, n_partitions: int, lookback_seasons: int = 0
+) -> List[SeasonPartition]:
+    """
+    Split rows into (at most) n_partitions partitions of consecutive seasons,
+    each also including the rows of the lookback_seasons seasons (that are in
+    the data) before its first season.
+    """
+
+    seasons = np.unique(years)
+
+    if len(seasons) == 0:
+        return []
+
+    season_idxs = np.searchsorted(seasons, years)
+    partitions = []
+
+    for partition_season_idxs in np.array_split(
+        np.arange(len(seasons)), min(n_partitions, len(seasons))
+    ):
+        first_season_idx = partition_season_idxs[0]
+        partition_rows = np.flatnonzero(
+            (season_idxs >= first_season_idx - lookback_seasons)
+            & (season_idxs <= partition_season_idxs[-1])
+        )
+
+        partitions.append(
+            SeasonPartition(
+                rows=partition_rows,
+                season_rows=season_idxs[partition_rows] >= first_season_idx,
+            )
+        )
+
+    return partitions
+
+
+# Feature stage, data frame & partitions for the current process-pool calculation.
+# Forked worker processes inherit them, so only the calculated columns get pickled
+_FORKED_PARTITIONS: List[
+    Tuple["SeasonPartitionedFeatures", pd.DataFrame, List[SeasonPartition]]
+] = []
+
+
+def _calculate_forked_partition(partition_idx: int) -> Dict[str, np.ndarray]:
+    partitioned_features, data_frame, partitions = _FORKED_PARTITIONS[-1]
+
+    return partitioned_features.calculate_partition(
+        data_frame, partitions[partition_idx]
+    )
+
+
+class SeasonPartitionedFeatures:
+    """Season-local feature functions to run on partitions of seasons in parallel.
+
+    Args:
+        feature_funcs (list): Feature functions that are season-local for
+            lookback_seasons (see feature_plan.is_season_local).
+        n_partitions (int): Number of partitions of consecutive seasons.
+        lookback_seasons (int): Number of previous seasons to include with
+            each partition.
+        max_workers (int, optional): Number of processes. Defaults to the number
+            of CPUs.
+
+    Attributes:
+        feature_funcs (list): Season-local feature functions.
+        produced_columns (list): Columns that the feature functions add.
+    """
+
+    def __init__(
+        self,
+        feature_funcs: List[DataFrameTransformer],
+        n_partitions: int,
+        lookback_seasons: int = 0,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        if not all(
+            [
+                is_season_local(feature_func, lookback_seasons)
+                for feature_func in feature_funcs
+            ]
+        ):
+            raise ValueError(
+                "To run feature functions on partitions of seasons, all of them "
+                f"must declare lookback_seasons of at most {lookback_seasons}, "
+                "but the feature functions given were "
+                f"{[feature_name(feature_func) for feature_func in feature_funcs]}"
+            )
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError(
+                "Running feature functions on partitions of seasons needs to fork "
+                "processes, which this platform doesn't support."
+            )
+
+        self.feature_funcs = feature_funcs
+        self.n_partitions = n_partitions
+        self.lookback_seasons = lookback_seasons
+        self.max_workers = max_workers
+
+        self.produced_columns = [
+            col
+            for feature_func in feature_funcs
+            for col in feature_columns(feature_func).produced  # type: ignore
+        ]
+
+    def __repr__(self) -> str:
+        feature_names = [
+            feature_name(feature_func) for feature_func in self.feature_funcs
+        ]
+
+        return f"SeasonPartitionedFeatures({', '.join(feature_names)})"
+
+    def __call__(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        partitions = partition_seasons(
+            data_frame["year"].values, self.n_partitions, self.lookback_seasons
+        )
+
+        # Forking isn't worth it for one partition (e.g. a single season of data)
+        if len(partitions) < 2:
+            return self.__run_feature_funcs(data_frame)
+
+        _FORKED_PARTITIONS.append((self, data_frame, partitions))
+
+        try:
+            with multiprocessing.get_context("fork").Pool(
+                min(self.max_workers or multiprocessing.cpu_count(), len(partitions))
+            ) as pool:
+                partition_columns = pool.map(
+                    _calculate_forked_partition, range(len(partitions))
+                )
+        finally:
+            _FORKED_PARTITIONS.pop()
+
+        # Partitions' own seasons cover each row exactly once
+        partition_season_rows = np.concatenate(
+            [partition.rows[partition.season_rows] for partition in partitions]
+        )
+        row_order = np.argsort(partition_season_rows)
+
+        return add_columns(
+            data_frame,
+            **{
+                col: np.concatenate([columns[col] for columns in partition_columns])[
+                    row_order
+                ]
+                for col in self.produced_columns
+            },
+        )
+
+    def calculate_partition(
+        self, data_frame: pd.DataFrame, partition: SeasonPartition
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate the features for a partition of the data frame's seasons,
+        returning the produced columns' values for the partition's own seasons
+        """
+
+        # iloc returns a copy, so the partition's data frame is ours to add columns to
+        partition_data_frame = data_frame.iloc[partition.rows]
+
+        with active_team_timeline(partition_data_frame), active_column_builder(
+            partition_data_frame
+        ):
+            feature_data_frame = self.__run_feature_funcs(partition_data_frame)
+
+        return {
+            col: feature_data_frame[col].values[partition.season_rows]
+            for col in self.produced_columns
+        }
+
+    def __run_feature_funcs(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        for feature_func in self.feature_funcs:
+            data_frame = feature_func(data_frame)
+
+        return data_frame
+
+
+def partition_season_local_features(
+    feature_funcs: List[DataFrameTransformer],
+    n_partitions: int,
+    lookback_seasons: int = 0,
+    max_workers: Optional[int] = None,
+) -> List[DataFrameTransformer]:
+    """
+    Group consecutive season-local feature functions into stages that run
+    on partitions of seasons, leaving the other feature functions as they are.
+    """
+
+    feature_stages: List[DataFrameTransformer] = []
+
+    for season_local, feature_func_group in itertools.groupby(
+        feature_funcs,
+        key=lambda feature_func: is_season_local(feature_func, lookback_seasons),
+    ):
+        feature_stages.extend(
+            [
+                SeasonPartitionedFeatures(
+                    list(feature_func_group),
+                    n_partitions,
+                    lookback_seasons=lookback_seasons,
+                    max_workers=max_workers,
+                )
+            ]
+            if season_local
+            else feature_func_group
+        )
+
+    return feature_stages
@@ -1,8 +1,15 @@
-from typing import List, Callable
+from typing import List
 import pandas as pd
 import numpy as np
 
 from server.ml_models.data_config import INDEX_COLS
+from .team_stacking import (
+    TEAM_TYPES,
+    stacked_columns,
+    stacked_values,
+    stacked_data_frame,
+    last_rows_by_key,
+)
 
 REQUIRED_COLS: List[str] = ["home_team", "year", "round_number"]
 
@@ -37,48 +44,46 @@ class TeamDataStacker:
                 f"{data_frame.columns}"
             )
 
-        team_dfs = [
-            self.__team_df(data_frame, "home"),
-            self.__team_df(data_frame, "away"),
+        # Columns that only one team type has get dropped, like an inner join
+        # of the home & away team rows
+        team_columns = [
+            stacked_column
+            for stacked_column in stacked_columns(data_frame.columns)
+            if stacked_column.home_column is not None
+            and stacked_column.away_column is not None
         ]
-
-        return (
-            pd.concat(team_dfs, join="inner")
-            # Various finals matches have been draws and replayed,
-            # and sometimes home/away is switched requiring us to drop duplicates
-            # at the end.
-            # This eliminates some matches from Round 15 in 1897, because they
-            # played some sort of round-robin tournament for finals, but I'm
-            # not too worried about the loss of that data.
-            .drop_duplicates(subset=self.index_cols, keep="last").sort_index()
+        index_columns = {
+            stacked_column.label: stacked_column
+            for stacked_column in team_columns
+            if stacked_column.label in self.index_cols
+        }
+
+        # Home team rows followed by away team rows
+        match_rows = np.tile(np.arange(len(data_frame)), len(TEAM_TYPES))
+        is_home = np.repeat([True, False], len(data_frame))
+
+        # Various finals matches have been draws and replayed,
+        # and sometimes home/away is switched requiring us to drop duplicates.
+        # This eliminates some matches from Round 15 in 1897, because they
+        # played some sort of round-robin tournament for finals, but I'm
+        # not too worried about the loss of that data.
+        team_rows = last_rows_by_key(
+            [
+                stacked_values(
+                    data_frame, index_columns[index_col], match_rows, is_home
+                )
+                for index_col in self.index_cols
+            ]
         )
 
-    def __team_df(self, data_frame: pd.DataFrame, team_type: str) -> pd.DataFrame:
-        is_at_home = team_type == "home"
-
-        if is_at_home:
-            oppo_team_type = "away"
-            at_home_col = np.ones(len(data_frame))
-        else:
-            oppo_team_type = "home"
-            at_home_col = np.zeros(len(data_frame))
-
         return (
-            data_frame.rename(
-                columns=self.__replace_col_names(team_type, oppo_team_type)
+            stacked_data_frame(
+                data_frame,
+                team_columns,
+                match_rows[team_rows],
+                is_home[team_rows],
+                at_home_dtype=float,
             )
-            .assign(at_home=at_home_col)
             .set_index(self.index_cols, drop=False)
             .rename_axis([None] * len(self.index_cols))
-            # Gotta drop duplicates, because St Kilda & Carlton tied a Grand Final
-            # in 2010 and had to replay it, so let's just pretend that never happened
-            .drop_duplicates(subset=self.index_cols, keep="last")
-        )
-
-    @staticmethod
-    def __replace_col_names(
-        team_type: str, oppo_team_type: str
-    ) -> Callable[[str], str]:
-        return lambda col_name: (
-            col_name.replace(f"{team_type}_", "").replace(f"{oppo_team_type}_", "oppo_")
         )
@@ -0,0 +1,176 @@
+"""Module for stacking the home & away team columns of match rows into team rows.
+
+Match rows have a 'home_' & 'away_' version of each team column, and stacking them
+gives a row per team, with the team's columns unprefixed and their opponent's
+prefixed with 'oppo_'. Rather than renaming & concatenating a copy of the data frame
+for each team type, the mapping from stacked columns to the home & away columns
+that they come from is worked out once, and each stacked column is taken straight
+from its source columns' values for the stacked rows.
+"""
+
+from typing import Iterable, List, NamedTuple, Optional, Union
+import pandas as pd
+from pandas.api.types import is_categorical_dtype
+import numpy as np
+
+from .group_moments import sorted_groups
+
+TEAM_TYPES = ["home", "away"]
+
+
+class StackedColumn(NamedTuple):
+    """Column of stacked team rows and the columns that it comes from.
+
+    Attributes:
+        label (str): Column label in the stacked data frame.
+        home_column (str, optional): Column with the values for home team rows.
+        away_column (str, optional): Column with the values for away team rows.
+    """
+
+    label: str
+    home_column: Optional[str]
+    away_column: Optional[str]
+
+
+def _team_column_label(column: str, team_type: str) -> str:
+    oppo_team_type = "away" if team_type == "home" else "home"
+
+    return column.replace(f"{team_type}_", "").replace(f"{oppo_team_type}_", "oppo_")
+
+
+def stacked_columns(columns: Iterable[str]) -> List[StackedColumn]:
+    """
+    Map the columns of match rows to the columns of stacked team rows,
+    in the order of the home team rows' columns followed by any columns that only
+    away team rows have.
+    """
+
+    columns = list(columns)
+    team_type_columns = {
+        team_type: {_team_column_label(col, team_type): col for col in columns}
+        for team_type in TEAM_TYPES
+    }
+    labels = list(team_type_columns["home"].keys()) + [
+        label
+        for label in team_type_columns["away"].keys()
+        if label not in team_type_columns["home"]
+    ]
+
+    return [
+        StackedColumn(
+            label=label,
+            home_column=team_type_columns["home"].get(label),
+            away_column=team_type_columns["away"].get(label),
+        )
+        for label in labels
+    ]
+
+
+def _source_values(
+    data_frame: pd.DataFrame, column: Optional[str], rows: np.ndarray
+) -> Union[np.ndarray, pd.Categorical]:
+    if column is None:
+        return np.full(len(rows), np.nan)
+
+    return data_frame[column].values.take(rows)
+
+
+def stacked_values(
+    data_frame: pd.DataFrame,
+    stacked_column: StackedColumn,
+    rows: np.ndarray,
+    is_home: np.ndarray,
+) -> Union[np.ndarray, pd.Categorical]:
+    """
+    Values of a stacked column for the given rows of the data frame,
+    taken from the home or away column depending on is_home. Values get the dtype
+    that concatenating the home & away columns would give them.
+    """
+
+    if stacked_column.home_column == stacked_column.away_column:
+        return _source_values(data_frame, stacked_column.home_column, rows)
+
+    home_values = _source_values(data_frame, stacked_column.home_column, rows)
+    away_values = _source_values(data_frame, stacked_column.away_column, rows)
+
+    if (
+        isinstance(home_values, pd.Categorical)
+        and isinstance(away_values, pd.Categorical)
+        and home_values.dtype == away_values.dtype
+    ):
+        return pd.Categorical.from_codes(
+            np.where(is_home, home_values.codes, away_values.codes),
+            categories=home_values.categories,
+            ordered=home_values.ordered,
+        )
+
+    # Like pd.concat, categoricals with different categories become objects
+    return np.where(is_home, np.asarray(home_values), np.asarray(away_values))
+
+
+def equal_values(left_values: pd.Series, right_values: pd.Series) -> np.ndarray:
+    """
+    Whether each pair of values is equal, comparing categoricals by their codes
+    if they have the same categories (and by value otherwise, unlike Series.eq)
+    """
+
+    if (
+        is_categorical_dtype(left_values)
+        and is_categorical_dtype(right_values)
+        and left_values.dtype == right_values.dtype
+    ):
+        left_codes = left_values.cat.codes.values
+
+        return (left_codes == right_values.cat.codes.values) & (left_codes != -1)
+
+    return np.asarray(left_values) == np.asarray(right_values)
+
+
+def last_rows_by_key(
+    key_columns: List[Union[np.ndarray, pd.Categorical]]
+) -> np.ndarray:
+    """
+    Positions of the last row for each key (like drop_duplicates with keep='last'),
+    sorted by key.
+    """
+
+    sort_order, group_starts = sorted_groups(
+        [pd.Series(key_values) for key_values in key_columns]
+    )
+    group_ends = np.append(group_starts[1:], len(sort_order)) - 1
+
+    # np.lexsort is stable, so each key's rows stay in their original order
+    return sort_order[group_ends]
+
+
+def stacked_data_frame(
+    data_frame: pd.DataFrame,
+    columns: List[StackedColumn],
+    rows: np.ndarray,
+    is_home: np.ndarray,
+    at_home_dtype: type = int,
+    sort_columns: bool = False,
+) -> pd.DataFrame:
+    """
+    Stack the given rows of match data as home or away team rows (per is_home),
+    with the given columns, and 'at_home' (1 for home teams, 0 for away teams)
+    in place of any existing 'at_home' column or at the end (or with all columns
+    sorted by label).
+    """
+
+    stacked_column_values = {
+        stacked_column.label: stacked_values(data_frame, stacked_column, rows, is_home)
+        for stacked_column in columns
+    }
+    stacked_column_values["at_home"] = is_home.astype(at_home_dtype)
+
+    labels = list(stacked_column_values.keys())
+
+    # DataFrame keeps dicts' order, and passing it columns instead would have it
+    # build an intermediate Series of all the arrays
+    return pd.DataFrame(
+        {
+            label: stacked_column_values[label]
+            for label in (sorted(labels) if sort_columns else labels)
+        }
+    )
@@ -0,0 +1,144 @@
+"""Module for persisting teams' end-of-round states between feature calculations.
+
+ELO ratings, cumulative win points & percent, win streaks and previous-match values
+depend on teams' full match histories, but each team's state at the end
+of a round is enough to continue calculating them for later rounds.
+team_round_states calculates those states for every round, so they can be saved
+(see scripts/data/team_round_states.py), and add_team_state_features
+and update_team_round_states continue from the latest saved states
+rather than from the first season of data. MatchModelData doesn't use them
+(yet), because its rolling features still need the full match history.
+"""
+
+from typing import Dict, Optional
+from functools import partial
+import pandas as pd
+import numpy as np
+
+from server.ml_models.data_config import INDEX_COLS
+from server.types import DataFrameTransformer
+from .feature_plan import declare_columns
+from .column_builder import add_columns
+from .feature_functions import (
+    add_ladder_position,
+    _validate_team_state_data,
+    _walk_team_rounds,
+    TEAM_LEVEL,
+    TEAM_STATE_COLS,
+    TEAM_STATE_DATA_COLS,
+    STATE_FEATURE_COLS,
+)
+
+
+def team_round_states(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate each team's state at the end of every round that it played:
+    ELO rating, cumulative win points & percent, win streak, and last-match values.
+    The result (indexed by team, year & round_number) can be persisted
+    (e.g. with DataFrame.to_pickle) and used with add_team_state_features
+    and update_team_round_states to avoid recalculating the full match history.
+    """
+
+    _validate_team_state_data(data_frame, "team states")
+    _, end_of_round_states = _walk_team_rounds(data_frame)
+
+    return _team_round_state_data_frame(data_frame, end_of_round_states)
+
+
+def _team_round_state_data_frame(
+    data_frame: pd.DataFrame, end_of_round_states: Dict[str, np.ndarray]
+) -> pd.DataFrame:
+    state_index = pd.MultiIndex.from_arrays(
+        [data_frame[col].values for col in INDEX_COLS]
+    )
+
+    return (
+        pd.DataFrame(end_of_round_states, index=state_index, columns=TEAM_STATE_COLS)
+        .astype({"year": int, "round_number": int})
+        .sort_index()
+    )
+
+
+def latest_team_states(
+    team_states: pd.DataFrame,
+    year: Optional[int] = None,
+    round_number: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Get each team's most-recent state (indexed by team) from the output
+    of team_round_states, optionally as of the end of the given year & round_number.
+    """
+
+    if year is not None:
+        is_before_round = (team_states["year"] < year) | (
+            (team_states["year"] == year)
+            & (team_states["round_number"] <= (round_number or np.inf))
+        )
+        team_states = team_states[is_before_round]
+
+    return (
+        team_states.sort_values(["year", "round_number"])
+        .groupby(level=TEAM_LEVEL)
+        .last()
+        .loc[:, TEAM_STATE_COLS]
+    )
+
+
+def _validate_rounds_after_states(
+    team_states: pd.DataFrame, data_frame: pd.DataFrame
+) -> None:
+    latest_state_round = max(zip(team_states["year"], team_states["round_number"]))
+    earliest_data_round = min(zip(data_frame["year"], data_frame["round_number"]))
+
+    if earliest_data_round <= latest_state_round:
+        raise ValueError(
+            "Team states can only be used to calculate features for rounds after "
+            f"the latest state ({latest_state_round}), but the data frame starts "
+            f"at {earliest_data_round}."
+        )
+
+
+def _team_state_features(
+    team_states: pd.DataFrame, data_frame: pd.DataFrame
+) -> pd.DataFrame:
+    _validate_team_state_data(data_frame, "team state features")
+    latest_states = latest_team_states(team_states)
+    _validate_rounds_after_states(latest_states, data_frame)
+
+    features, _ = _walk_team_rounds(data_frame, team_states=latest_states)
+
+    return add_ladder_position(add_columns(data_frame, **features))
+
+
+def add_team_state_features(team_states: pd.DataFrame) -> DataFrameTransformer:
+    """
+    Incrementally calculate the features that depend on teams' full match history
+    (ELO rating, cumulative win points & percent, ladder position, win streak,
+    and previous match score, oppo_score, result & margin), starting from
+    the latest of the given team states (see team_round_states), so only rounds
+    after those states need to be in the data frame.
+    """
+
+    return declare_columns(
+        required=TEAM_STATE_DATA_COLS + ["at_home"],
+        produced=STATE_FEATURE_COLS + ["ladder_position"],
+    )(partial(_team_state_features, team_states))
+
+
+def update_team_round_states(
+    team_states: pd.DataFrame, data_frame: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Add end-of-round states for the rounds in the data frame, which must come after
+    the latest of the given team states, to the output of team_round_states.
+    """
+
+    _validate_team_state_data(data_frame, "team states")
+    latest_states = latest_team_states(team_states)
+    _validate_rounds_after_states(latest_states, data_frame)
+
+    _, end_of_round_states = _walk_team_rounds(data_frame, team_states=latest_states)
+
+    return pd.concat(
+        [team_states, _team_round_state_data_frame(data_frame, end_of_round_states)]
+    ).sort_index()
@@ -0,0 +1,316 @@
+"""Module for sharing row groupings between feature functions.
+
+Feature functions that shift, accumulate or roll values over a team's matches
+(or a team's matches per season, opponent or venue) all need the same groupings
+of rows. A TeamTimeline calculates each grouping once per data frame, so feature
+functions called via FeatureBuilder only pay for sorting rows once. Likewise,
+functions that need opposition teams' values look up their rows' positions once
+(see opponent_rows) and gather values with take.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
+import pandas as pd
+from pandas.api.types import is_categorical_dtype
+import numpy as np
+
+TEAM_GROUP = ("team",)
+TEAM_YEAR_GROUP = ("team", "year")
+TEAM_OPPO_TEAM_GROUP = ("team", "oppo_team")
+TEAM_VENUE_GROUP = ("team", "venue")
+
+
+def key_values(values: pd.Series) -> np.ndarray:
+    """
+    Values of a column to group, sort or compare rows by. Categorical columns
+    give their category codes, which sort in the same order as their categories.
+    """
+
+    if is_categorical_dtype(values):
+        return values.cat.codes.values
+
+    return values.values
+
+
+class RowGrouping:
+    """Positions of a data frame's rows when sorted into contiguous groups.
+
+    Rows within each group keep their order from the data frame, so grouped
+    calculations give the same results as a pandas groupby on the same columns.
+
+    Args:
+        key_columns (list of np.ndarray): Values of the columns to group by.
+
+    Attributes:
+        order (np.ndarray): Row positions sorted by group.
+        group_ids (np.ndarray): Group number of each row, in data frame order.
+        starts (np.ndarray): Positions in order at which each group starts.
+    """
+
+    def __init__(self, key_columns: List[np.ndarray]) -> None:
+        key_codes = [pd.factorize(values, sort=True)[0] for values in key_columns]
+        n_rows = len(key_codes[0])
+
+        # lexsort is stable and uses the last key as the primary sort key
+        self.order = np.lexsort(key_codes[::-1])
+
+        is_group_start = np.zeros(n_rows, dtype=bool)
+        is_group_start[:1] = True
+        for codes in key_codes:
+            sorted_codes = codes[self.order]
+            is_group_start[1:] |= sorted_codes[1:] != sorted_codes[:-1]
+
+        self.starts = np.flatnonzero(is_group_start)
+        self.group_ids = np.empty(n_rows, dtype=int)
+        self.group_ids[self.order] = np.cumsum(is_group_start) - 1
+
+        self._sorted_group_starts = np.repeat(
+            self.starts, np.diff(np.append(self.starts, n_rows))
+        )
+
+    def previous_rows(self) -> np.ndarray:
+        """Position of each row's previous row in its group (-1 if it's the first)"""
+
+        sorted_previous_rows = np.append(-1, self.order[:-1])
+        sorted_previous_rows[self.starts] = -1
+
+        previous_rows = np.empty(len(self.order), dtype=int)
+        previous_rows[self.order] = sorted_previous_rows
+
+        return previous_rows
+
+    def shift(self, values: np.ndarray) -> np.ndarray:
+        """Each row's previous value within its group (NaN for the first row)"""
+
+        return take_rows(values, self.previous_rows())
+
+    def cumsum(self, values: np.ndarray) -> np.ndarray:
+        """Cumulative sum within each group, skipping (but not filling) NaNs"""
+
+        sorted_values = values[self.order].astype(float)
+        is_blank = np.isnan(sorted_values)
+        sorted_cum_values = self._sorted_cumsum(np.where(is_blank, 0, sorted_values))
+
+        group_cum_values = (
+            sorted_cum_values[1:] - sorted_cum_values[self._sorted_group_starts]
+        )
+        group_cum_values[is_blank] = np.nan
+
+        return self._unsort(group_cum_values)
+
+    def rolling_mean(self, values: np.ndarray, window: int) -> np.ndarray:
+        """
+        Mean of each row's value and its window - 1 previous values within its group.
+        Rows without a full window of non-NaN values get the mean of all
+        non-NaN values in the group up to that row instead (NaN if there are none).
+
+        Args:
+            values (np.ndarray): Values in data frame row order. 2D arrays get
+                rolling means for each column.
+            window (int): Number of rows to include in each rolling mean.
+
+        Returns:
+            np.ndarray of means with the same shape as values.
+        """
+
+        if window < 1:
+            raise ValueError(
+                f"Rolling window must be at least 1, but received {window}"
+            )
+
+        sorted_values = values[self.order].astype(float)
+        is_valid = ~np.isnan(sorted_values)
+        cum_values = self._sorted_cumsum(np.where(is_valid, sorted_values, 0))
+        cum_counts = self._sorted_cumsum(is_valid)
+
+        # Everything is a difference between cumulative sums at the end of each row's
+        # window and at either the start of the window or the start of its group
+        window_ends = np.arange(1, len(sorted_values) + 1)
+        window_starts = np.maximum(window_ends - window, self._sorted_group_starts)
+        has_full_window = _row_mask(
+            window_ends - window >= self._sorted_group_starts, sorted_values.ndim
+        )
+        is_rolling = has_full_window & (
+            cum_counts[window_ends] - cum_counts[window_starts] == window
+        )
+
+        expanding_counts = (
+            cum_counts[window_ends] - cum_counts[self._sorted_group_starts]
+        )
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rolling_means = (
+                cum_values[window_ends] - cum_values[window_starts]
+            ) / window
+            expanding_means = (
+                cum_values[window_ends] - cum_values[self._sorted_group_starts]
+            ) / expanding_counts
+
+        sorted_means = np.where(is_rolling, rolling_means, expanding_means)
+        sorted_means[expanding_counts == 0] = np.nan
+
+        return self._unsort(sorted_means)
+
+    @staticmethod
+    def _sorted_cumsum(values: np.ndarray) -> np.ndarray:
+        # Leading 0s mean group totals are differences between start & end positions
+        cum_values = np.zeros((len(values) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, dtype=float, out=cum_values[1:])
+
+        return cum_values
+
+    def _unsort(self, sorted_values: np.ndarray) -> np.ndarray:
+        values = np.empty_like(sorted_values)
+        values[self.order] = sorted_values
+
+        return values
+
+
+def opponent_rows(
+    years: np.ndarray,
+    round_numbers: np.ndarray,
+    teams: np.ndarray,
+    oppo_teams: np.ndarray,
+) -> np.ndarray:
+    """
+    Position of each row's opposition row, i.e. the row from the same year
+    & round_number whose team is the row's oppo_team (-1 if there isn't one).
+    If a team has more than one row in a round, the last one is used.
+    """
+
+    n_rows = len(teams)
+    team_codes, team_names = pd.factorize(np.concatenate([teams, oppo_teams]))
+    year_codes, _ = pd.factorize(years)
+    round_number_codes, round_number_values = pd.factorize(round_numbers)
+
+    # Combining codes gives each (year, round_number, team) a unique integer key
+    round_keys = year_codes.astype(np.int64) * len(round_number_values) + (
+        round_number_codes
+    )
+    is_valid_round = (year_codes >= 0) & (round_number_codes >= 0)
+
+    row_keys = round_keys * len(team_names) + team_codes[:n_rows]
+    row_keys[~is_valid_round | (team_codes[:n_rows] < 0)] = -1
+    oppo_keys = round_keys * len(team_names) + team_codes[n_rows:]
+    oppo_keys[~is_valid_round | (team_codes[n_rows:] < 0)] = -1
+
+    is_last_row = ~pd.Index(row_keys).duplicated(keep="last") & (row_keys >= 0)
+    key_positions = np.flatnonzero(is_last_row)
+    key_matches = pd.Index(row_keys[is_last_row]).get_indexer(oppo_keys)
+
+    return np.where(
+        (key_matches >= 0) & (oppo_keys >= 0),
+        key_positions[np.maximum(key_matches, 0)],
+        -1,
+    )
+
+
+def take_rows(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Values (by row for 2D arrays) at the given positions, NaN for positions of -1"""
+
+    return np.where(
+        _row_mask(rows == -1, values.ndim), np.nan, values[np.maximum(rows, 0)]
+    )
+
+
+def _row_mask(mask: np.ndarray, ndim: int) -> np.ndarray:
+    # Lets a mask of rows broadcast across the columns of 2D values
+    return mask.reshape((-1,) + (1,) * (ndim - 1))
+
+
+class TeamTimeline:
+    """Row groupings for a data frame of team matches, calculated on first use.
+
+    Args:
+        data_frame (pandas.DataFrame): Data frame whose rows are to be grouped.
+            Groupings can only be reused for data frames with the same index.
+    """
+
+    def __init__(self, data_frame: pd.DataFrame) -> None:
+        self._data_frame = data_frame
+        self._groupings: Dict[Tuple[str, ...], RowGrouping] = {}
+        self._opponent_rows: Optional[np.ndarray] = None
+
+    def matches(self, data_frame: pd.DataFrame) -> bool:
+        """Whether the data frame has the same rows, in the same order, as the timeline"""
+
+        index = self._data_frame.index
+
+        return data_frame.index.is_(index) or (
+            len(data_frame) == len(index) and data_frame.index.equals(index)
+        )
+
+    def grouping(self, group_cols: Sequence[str]) -> RowGrouping:
+        """Grouping of rows by the given columns (e.g. TEAM_YEAR_GROUP)"""
+
+        group_key = tuple(group_cols)
+
+        if group_key not in self._groupings:
+            if any([col not in self._data_frame.columns for col in group_key]):
+                raise ValueError(
+                    f"To group team matches by {list(group_key)}, all of those "
+                    "columns must be in the data frame, but the columns given were "
+                    f"{self._data_frame.columns}"
+                )
+
+            self._groupings[group_key] = RowGrouping(
+                [key_values(self._data_frame[col]) for col in group_key]
+            )
+
+        return self._groupings[group_key]
+
+    def opponent_rows(self) -> np.ndarray:
+        """Position of each row's opposition row (see opponent_rows)"""
+
+        if self._opponent_rows is None:
+            required_cols = ["year", "round_number", "team", "oppo_team"]
+
+            if any([col not in self._data_frame.columns for col in required_cols]):
+                raise ValueError(
+                    f"To find opposition rows, all of {required_cols} must be in "
+                    "the data frame, but the columns given were "
+                    f"{self._data_frame.columns}"
+                )
+
+            self._opponent_rows = opponent_rows(
+                *[key_values(self._data_frame[col]) for col in required_cols]
+            )
+
+        return self._opponent_rows
+
+
+_ACTIVE_TIMELINES: List[TeamTimeline] = []
+
+
+@contextmanager
+def active_team_timeline(data_frame: pd.DataFrame):
+    """
+    Share one TeamTimeline for the data frame among all calls to get_team_timeline
+    inside the context.
+    """
+
+    timeline = TeamTimeline(data_frame)
+    _ACTIVE_TIMELINES.append(timeline)
+
+    try:
+        yield timeline
+    finally:
+        _ACTIVE_TIMELINES.remove(timeline)
+
+
+def get_team_timeline(data_frame: pd.DataFrame) -> TeamTimeline:
+    """
+    Get the active TeamTimeline if it matches the data frame's rows,
+    otherwise a new one for the data frame.
+    """
+
+    active_timeline: Optional[TeamTimeline] = next(
+        (
+            timeline
+            for timeline in reversed(_ACTIVE_TIMELINES)
+            if timeline.matches(data_frame)
+        ),
+        None,
+    )
+
+    return active_timeline or TeamTimeline(data_frame)
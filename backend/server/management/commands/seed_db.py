@@ -65,11 +65,34 @@ class Command(BaseCommand):
         self.data_reader = data_reader
         self.estimators = estimators
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Print the time & memory used by each stage of data transformation.",
+        )
+
     def handle(  # pylint: disable=W0221
-        self, *_args, year_range: str = YEAR_RANGE, verbose: int = 1, **_kwargs
+        self,
+        *_args,
+        year_range: str = YEAR_RANGE,
+        verbose: int = 1,
+        profile: bool = False,
+        **_kwargs,
     ) -> None:  # pylint: disable=W0613
         self.verbose = verbose  # pylint: disable=W0201
 
+        if not profile:
+            return self.__seed_db(year_range)
+
+        with ml_model.profile_transformers() as profiler:
+            self.__seed_db(year_range)
+
+        print(profiler.report.to_string())
+
+        return None
+
+    def __seed_db(self, year_range: str) -> None:
         if self.verbose == 1:
             print("\nSeeding DB...\n")
 
@@ -22,6 +22,7 @@ from server.ml_models import (
     AllModel,
     EnsembleModel,
 )
+from server.ml_models.ml_model import profile_transformers
 from server.ml_models.betting_model import BettingModelData
 from server.ml_models.match_model import MatchModelData
 from server.ml_models.player_model import PlayerModelData
@@ -66,11 +67,31 @@ class Command(BaseCommand):
         self.right_now = datetime.now()
         self.current_year = self.right_now.year
 
-    def handle(self, *_args, verbose=1, **_kwargs) -> None:  # pylint: disable=W0221
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Print the time & memory used by each stage of data transformation.",
+        )
+
+    def handle(  # pylint: disable=W0221
+        self, *_args, verbose=1, profile=False, **_kwargs
+    ) -> None:
         """Run 'tip' command"""
 
         self.verbose = verbose  # pylint: disable=W0201
 
+        if not profile:
+            return self.__tip()
+
+        with profile_transformers() as profiler:
+            self.__tip()
+
+        print(profiler.report.to_string())
+
+        return None
+
+    def __tip(self) -> None:
         fixture_data_frame = self.__fetch_fixture_data(self.current_year)
 
         if fixture_data_frame is None:
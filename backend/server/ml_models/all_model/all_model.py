@@ -13,10 +13,10 @@ from sklearn.exceptions import DataConversionWarning
 from xgboost import XGBRegressor
 
 from server.data_processors import FeatureBuilder
+from server.data_processors.feature_cache import FEATURE_CACHE
 from server.data_processors.feature_calculation import (
     feature_calculator,
-    calculate_division,
-    calculate_multiplication,
+    calculate_expression,
 )
 from server.ml_models.betting_model import BettingModelData
 from server.ml_models.match_model import MatchModelData, CATEGORY_COLS
@@ -33,8 +33,16 @@ DATA_TRANSFORMERS: List[DataFrameTransformer] = [
         feature_funcs=[
             feature_calculator(
                 [
-                    (calculate_division, [("elo_rating", "win_odds")]),
-                    (calculate_multiplication, [("win_odds", "ladder_position")]),
+                    (
+                        calculate_expression,
+                        [
+                            (
+                                "elo_rating_divided_by_win_odds = elo_rating / win_odds",
+                                "win_odds_multiplied_by_ladder_position = "
+                                "win_odds * ladder_position",
+                            )
+                        ],
+                    )
                 ]
             )
         ]
@@ -102,9 +110,18 @@ class AllModelData(MLModelData, DataTransformerMixin):
 
         self._data_transformers = data_transformers
 
-        data_frame = reduce(
-            self.__concat_data_frames, zip(data_readers, data_reader_kwargs), None
-        )
+        # The other models' data share feature functions, so building it reuses
+        # their cached results, which aren't needed once it's built
+        try:
+            with FEATURE_CACHE.enable():
+                data_frame = reduce(
+                    self.__concat_data_frames,
+                    zip(data_readers, data_reader_kwargs),
+                    None,
+                )
+        finally:
+            FEATURE_CACHE.clear()
+
         numeric_data_frame = data_frame.select_dtypes(
             include=["number", "datetime"]
         ).fillna(0)
@@ -119,11 +136,11 @@ class AllModelData(MLModelData, DataTransformerMixin):
         start_year = datetime.strptime(start_date, "%Y-%m-%d").year if start_date else 0
         end_year = datetime.strptime(end_date, "%Y-%m-%d").year if end_date else np.Inf
 
-        self._data = (
-            self._compose_transformers(sorted_data_frame)  # pylint: disable=E1102
+        self.transformer_plan = self._compose_transformers
+        self._data = self.transformer_plan.sort(
+            self.transformer_plan(sorted_data_frame)
             .loc[(data_frame["year"] >= start_year) & (data_frame["year"] <= end_year),]
             .dropna()
-            .sort_index()
         )
 
     @property
@@ -20,6 +20,8 @@ from server.data_processors.feature_functions import (
     add_betting_pred_win,
     add_shifted_team_features,
 )
+from server.data_processors.feature_cache import FEATURE_CACHE
+from server.data_processors.dtype_policy import compact_dtypes, fill_missing_values
 from server.data_processors.feature_calculation import (
     feature_calculator,
     calculate_rolling_rate,
@@ -38,8 +40,9 @@ FEATURE_FUNCS: List[DataFrameTransformer] = [
 ]
 REQUIRED_COLS: List[str] = ["year", "score", "oppo_score"]
 DATA_TRANSFORMERS: List[DataFrameTransformer] = [
+    compact_dtypes,
     TeamDataStacker().transform,
-    FeatureBuilder(feature_funcs=FEATURE_FUNCS).transform,
+    FeatureBuilder(feature_funcs=FEATURE_FUNCS, cache=FEATURE_CACHE).transform,
     OppoFeatureBuilder(
         match_cols=[
             "year",
@@ -56,7 +59,10 @@ DATA_TRANSFORMERS: List[DataFrameTransformer] = [
         ]
     ).transform,
     # Features dependent on oppo columns
-    FeatureBuilder(feature_funcs=[add_cum_percent, add_ladder_position]).transform,
+    FeatureBuilder(
+        feature_funcs=[add_cum_percent, add_ladder_position], cache=FEATURE_CACHE
+    ).transform,
+    compact_dtypes,
 ]
 DATA_READERS = [
     FootywireDataReader().get_betting_odds(),
@@ -126,13 +132,12 @@ class BettingModelData(MLModelData, DataTransformerMixin):
             )
         )
 
-        self._data = (
-            self._compose_transformers(data_frame)  # pylint: disable=E1102
-            .astype({"year": int})
-            .fillna(0)
-            .set_index(index_cols, drop=False)
-            .rename_axis([None] * len(index_cols))
-            .sort_index()
+        self.transformer_plan = self._compose_transformers
+        self._data = self.transformer_plan.index(
+            fill_missing_values(
+                self.transformer_plan(data_frame).astype({"year": int})
+            ),
+            index_cols,
         )
 
     @property
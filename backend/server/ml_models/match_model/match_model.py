@@ -23,11 +23,13 @@ from server.data_processors.feature_functions import (
     add_elo_pred_win,
     add_shifted_team_features,
 )
+from server.data_processors.feature_cache import FEATURE_CACHE
+from server.data_processors.dtype_policy import compact_dtypes, fill_missing_values
 from server.data_processors.feature_calculation import (
     feature_calculator,
     calculate_rolling_rate,
     calculate_division,
-    calculate_rolling_mean_by_dimension,
+    calculate_rolling_means_by_dimension,
 )
 from server.data_readers import FitzroyDataReader
 from server.ml_models.ml_model import MLModel, MLModelData, DataTransformerMixin
@@ -61,22 +63,19 @@ FEATURE_FUNCS: List[DataFrameTransformer] = [
         [
             (calculate_rolling_rate, [("prev_match_result",)]),
             (
-                calculate_rolling_mean_by_dimension,
+                calculate_rolling_means_by_dimension,
                 [
-                    ("oppo_team", "margin"),
-                    ("oppo_team", "result"),
-                    ("oppo_team", "score"),
-                    ("venue", "margin"),
-                    ("venue", "result"),
-                    ("venue", "score"),
+                    ("oppo_team", "margin", "result", "score"),
+                    ("venue", "margin", "result", "score"),
                 ],
             ),
         ]
     ),
 ]
 DATA_TRANSFORMERS: List[DataFrameTransformer] = [
+    compact_dtypes,
     TeamDataStacker(index_cols=INDEX_COLS).transform,
-    FeatureBuilder(feature_funcs=FEATURE_FUNCS).transform,
+    FeatureBuilder(feature_funcs=FEATURE_FUNCS, cache=FEATURE_CACHE).transform,
     OppoFeatureBuilder(
         match_cols=[
             "team",
@@ -112,9 +111,11 @@ DATA_TRANSFORMERS: List[DataFrameTransformer] = [
                     (calculate_division, [("elo_rating", "ladder_position")]),
                 ]
             ),
-        ]
+        ],
+        cache=FEATURE_CACHE,
     ).transform,
     OppoFeatureBuilder(oppo_feature_cols=["cum_percent", "ladder_position"]).transform,
+    compact_dtypes,
 ]
 DATA_READERS: List[Callable] = [FitzroyDataReader().match_results]
 PIPELINE = make_pipeline(
@@ -181,12 +182,9 @@ class MatchModelData(MLModelData, DataTransformerMixin):
             & ((data_frame["year"] != 1924) | (data_frame["round_number"] != 19))
         ]
 
-        self._data = (
-            self._compose_transformers(data_frame)  # pylint: disable=E1102
-            .fillna(0)
-            .set_index(index_cols, drop=False)
-            .rename_axis([None] * len(index_cols))
-            .sort_index()
+        self.transformer_plan = self._compose_transformers
+        self._data = self.transformer_plan.index(
+            fill_missing_values(self.transformer_plan(data_frame)), index_cols
         )
 
     @property
@@ -2,8 +2,11 @@
 
 import os
 import sys
-from typing import Optional, Tuple, Union, List, Type
-from functools import reduce
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple, Union, List, Type
+from functools import partial
 from sklearn.pipeline import Pipeline
 from sklearn.utils.metaestimators import _BaseComposition
 from sklearn.base import RegressorMixin
@@ -159,6 +162,384 @@ class MLModelData:
         return (data_frame["score"] - data_frame["oppo_score"]).rename("margin")
 
 
+def index_data_frame(data_frame: pd.DataFrame, index_cols: List[str]) -> pd.DataFrame:
+    """Index a data frame by the given columns (keeping them as columns) & sort it"""
+
+    return (
+        data_frame.set_index(index_cols, drop=False)
+        .rename_axis([None] * len(index_cols))
+        .sort_index()
+    )
+
+
+def _is_indexed_by(data_frame: pd.DataFrame, index_cols: List[str]) -> bool:
+    index = data_frame.index
+
+    if index.nlevels != len(index_cols) or any(
+        [name is not None for name in index.names]
+    ):
+        return False
+
+    if any([col not in data_frame.columns for col in index_cols]):
+        return False
+
+    for level, col in enumerate(index_cols):
+        level_values = index.get_level_values(level)
+
+        if level_values.dtype != data_frame[col].dtype or not np.array_equal(
+            level_values.values, data_frame[col].values
+        ):
+            return False
+
+    return True
+
+
+class TransformerProfiler:
+    """Per-stage timings, data frame shapes & memory of TransformerPlan runs.
+
+    Memory is traced with tracemalloc, which can't reset its peak before
+    Python 3.9, so each stage restarts tracing and the profiler keeps running totals.
+    Allocations freed after a restart aren't subtracted, so memory figures
+    for stages with nested stages (e.g. FeatureBuilder) are upper bounds.
+    If something else (e.g. an outer profiler) was already tracing memory,
+    the profiler leaves its trace running instead of restarting it, so every
+    stage's peak memory is an upper bound.
+
+    Args:
+        trace_memory (bool): Whether to trace peak memory, which makes
+            the profiled transformers about 50% slower.
+    """
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        self.trace_memory = trace_memory
+
+        self._records: List[Dict[str, Any]] = []
+        self._open_stages: List[Dict[str, Any]] = []
+        self._memory_offset = 0
+        self._owns_memory_trace = False
+
+    def start_memory_trace(self) -> None:
+        """Start tracing memory, unless something else is already tracing it"""
+
+        self._owns_memory_trace = self.trace_memory and not tracemalloc.is_tracing()
+
+        if self._owns_memory_trace:
+            tracemalloc.start()
+
+    def stop_memory_trace(self) -> None:
+        """Stop tracing memory if the profiler started the trace"""
+
+        if self._owns_memory_trace:
+            tracemalloc.stop()
+
+        self._owns_memory_trace = False
+
+    @property
+    def report(self) -> pd.DataFrame:
+        """
+        One row per stage run, in the order that the stages started,
+        with nested stages (e.g. FeatureBuilder feature functions) under their parent
+        """
+
+        return pd.DataFrame(
+            self._records,
+            columns=[
+                "stage",
+                "parent",
+                "depth",
+                "wall_time",
+                "cpu_time",
+                "rows_in",
+                "cols_in",
+                "rows_out",
+                "cols_out",
+                "peak_memory_mb",
+            ],
+        )
+
+    def run_stage(
+        self,
+        stage_name: str,
+        data_transformer: DataFrameTransformer,
+        data_frame: pd.DataFrame,
+    ) -> pd.DataFrame:
+        """Run a data transformer, recording it as a stage"""
+
+        record: Dict[str, Any] = {
+            "stage": stage_name,
+            "parent": self._open_stages[-1]["record"]["stage"]
+            if any(self._open_stages)
+            else None,
+            "depth": len(self._open_stages),
+            "rows_in": data_frame.shape[0],
+            "cols_in": data_frame.shape[1],
+        }
+        self._records.append(record)
+
+        memory_base = self.__restart_memory_trace()
+        self._open_stages.append({"record": record, "memory_peak": memory_base})
+
+        start_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+
+        try:
+            transformed_data_frame = data_transformer(data_frame)
+        finally:
+            open_stage = self._open_stages.pop()
+
+        memory_peak = max(open_stage["memory_peak"], self.__memory_peak())
+
+        if any(self._open_stages):
+            self._open_stages[-1]["memory_peak"] = max(
+                self._open_stages[-1]["memory_peak"], memory_peak
+            )
+
+        record.update(
+            {
+                "wall_time": time.perf_counter() - start_time,
+                "cpu_time": time.process_time() - start_cpu_time,
+                "rows_out": transformed_data_frame.shape[0],
+                "cols_out": transformed_data_frame.shape[1],
+                "peak_memory_mb": (memory_peak - memory_base) / 1e6
+                if self.trace_memory
+                else np.nan,
+            }
+        )
+
+        return transformed_data_frame
+
+    def __restart_memory_trace(self) -> int:
+        if not self.trace_memory:
+            return 0
+
+        memory_peak = self.__memory_peak()
+        for open_stage in self._open_stages:
+            open_stage["memory_peak"] = max(open_stage["memory_peak"], memory_peak)
+
+        current_memory, _ = tracemalloc.get_traced_memory()
+
+        if not self._owns_memory_trace:
+            return self._memory_offset + current_memory
+
+        self._memory_offset += current_memory
+
+        tracemalloc.stop()
+        tracemalloc.start()
+
+        return self._memory_offset
+
+    def __memory_peak(self) -> int:
+        if not self.trace_memory:
+            return 0
+
+        return self._memory_offset + tracemalloc.get_traced_memory()[1]
+
+
+_ACTIVE_PROFILERS: List[TransformerProfiler] = []
+
+
+@contextmanager
+def profile_transformers(trace_memory: bool = True):
+    """
+    Record every stage of the TransformerPlans run inside the context (including
+    the feature functions of FeatureBuilders) with the yielded TransformerProfiler.
+    """
+
+    profiler = TransformerProfiler(trace_memory=trace_memory)
+    _ACTIVE_PROFILERS.append(profiler)
+
+    profiler.start_memory_trace()
+
+    try:
+        yield profiler
+    finally:
+        _ACTIVE_PROFILERS.remove(profiler)
+        profiler.stop_memory_trace()
+
+
+class TransformerPlan:
+    """Data transformers to run in order as stages of one plan.
+
+    Stages that need data frames indexed & sorted by particular columns
+    (i.e. transformers whose object has index_cols and a transform_indexed method,
+    like FeatureBuilder) get the previous stage's data frame as is when it's already
+    indexed & sorted by those columns and isn't used anywhere else, rather than
+    each stage copying & sorting it again.
+
+    Args:
+        data_transformers (list): Data transformer functions in the order to run them.
+
+    Attributes:
+        data_transformers (list): Data transformer functions in the order to run them.
+        copies_eliminated (int): Number of set_index copies skipped in the last run.
+        sorts_eliminated (int): Number of sorts skipped in the last run.
+    """
+
+    def __init__(self, data_transformers: List[DataFrameTransformer]) -> None:
+        self.data_transformers = data_transformers
+        self.copies_eliminated = 0
+        self.sorts_eliminated = 0
+
+        self._stage_reports: List[Dict[str, Any]] = []
+
+    def __call__(self, data_frame: pd.DataFrame) -> pd.DataFrame:
+        self.copies_eliminated = 0
+        self.sorts_eliminated = 0
+        self._stage_reports = []
+
+        # The data frame passed to the plan belongs to the caller,
+        # but data frames returned by stages belong to the plan
+        owns_data_frame = False
+
+        for data_transformer in self.data_transformers:
+            stage_name = self.__stage_name(data_transformer)
+            run_stage: DataFrameTransformer
+
+            if self.__is_indexed_stage(data_transformer):
+                run_stage = partial(
+                    self.__run_indexed_stage,
+                    data_transformer,
+                    copy=not owns_data_frame,
+                    stage_name=stage_name,
+                )
+            else:
+                self.__report_stage(stage_name)
+                run_stage = data_transformer
+
+            transformed_data_frame = (
+                _ACTIVE_PROFILERS[-1].run_stage(stage_name, run_stage, data_frame)
+                if any(_ACTIVE_PROFILERS)
+                else run_stage(data_frame)
+            )
+
+            owns_data_frame = (
+                owns_data_frame or transformed_data_frame is not data_frame
+            )
+            data_frame = transformed_data_frame
+
+        return data_frame
+
+    @property
+    def report(self) -> pd.DataFrame:
+        """
+        Each stage of the last run, with the columns that it needed the data frame
+        to be indexed by, and whether setting the index & sorting were skipped
+        """
+
+        return pd.DataFrame(
+            self._stage_reports,
+            columns=["stage", "index_cols", "copy_eliminated", "sort_eliminated"],
+        )
+
+    def index(
+        self,
+        data_frame: pd.DataFrame,
+        index_cols: List[str],
+        copy: bool = False,
+        stage_name: str = "index",
+    ) -> pd.DataFrame:
+        """
+        Index a data frame by the given columns (keeping them as columns) & sort it,
+        skipping either step if it's already been done.
+
+        Args:
+            data_frame (pandas.DataFrame): Data frame to index.
+            index_cols (list): Column names to use as the index.
+            copy (bool): Whether to return a copy if the data frame is
+                already indexed & sorted (e.g. because the caller doesn't own it).
+            stage_name (str): Label for the step in the plan's report.
+
+        Returns:
+            pandas.DataFrame
+        """
+
+        is_indexed = _is_indexed_by(data_frame, index_cols)
+
+        if is_indexed:
+            indexed_data_frame = data_frame
+        else:
+            indexed_data_frame = data_frame.set_index(
+                index_cols, drop=False
+            ).rename_axis([None] * len(index_cols))
+
+        is_sorted = indexed_data_frame.index.is_monotonic_increasing
+
+        if not is_sorted:
+            indexed_data_frame = indexed_data_frame.sort_index()
+        elif is_indexed and copy:
+            indexed_data_frame = indexed_data_frame.copy()
+
+        copy_eliminated = is_indexed and not (is_sorted and copy)
+
+        self.copies_eliminated += int(copy_eliminated)
+        self.sorts_eliminated += int(is_sorted)
+        self.__report_stage(stage_name, index_cols, copy_eliminated, is_sorted)
+
+        return indexed_data_frame
+
+    def sort(self, data_frame: pd.DataFrame, stage_name: str = "sort") -> pd.DataFrame:
+        """Sort a data frame by its index, unless it's already sorted"""
+
+        is_sorted = data_frame.index.is_monotonic_increasing
+
+        self.sorts_eliminated += int(is_sorted)
+        self.__report_stage(stage_name, sort_eliminated=is_sorted)
+
+        return data_frame if is_sorted else data_frame.sort_index()
+
+    def __run_indexed_stage(
+        self,
+        data_transformer: DataFrameTransformer,
+        data_frame: pd.DataFrame,
+        copy: bool = True,
+        stage_name: str = "index",
+    ) -> pd.DataFrame:
+        stage = getattr(data_transformer, "__self__")
+        indexed_data_frame = self.index(
+            data_frame, stage.index_cols, copy=copy, stage_name=stage_name
+        )
+
+        return stage.transform_indexed(indexed_data_frame)
+
+    def __report_stage(
+        self,
+        stage_name: str,
+        index_cols: Optional[List[str]] = None,
+        copy_eliminated: bool = False,
+        sort_eliminated: bool = False,
+    ) -> None:
+        self._stage_reports.append(
+            {
+                "stage": stage_name,
+                "index_cols": index_cols,
+                "copy_eliminated": copy_eliminated,
+                "sort_eliminated": sort_eliminated,
+            }
+        )
+
+    @staticmethod
+    def __is_indexed_stage(data_transformer: DataFrameTransformer) -> bool:
+        stage = getattr(data_transformer, "__self__", None)
+
+        return (
+            getattr(data_transformer, "__name__", None) == "transform"
+            and hasattr(stage, "index_cols")
+            and hasattr(stage, "transform_indexed")
+        )
+
+    @staticmethod
+    def __stage_name(data_transformer: DataFrameTransformer) -> str:
+        stage = getattr(data_transformer, "__self__", None)
+
+        if stage is not None:
+            return f"{stage.__class__.__name__}.{data_transformer.__name__}"
+
+        if isinstance(data_transformer, partial):
+            return TransformerPlan.__stage_name(data_transformer.func)
+
+        return getattr(data_transformer, "__name__", repr(data_transformer))
+
+
 class DataTransformerMixin:
     """Mixin class for MLModelData classes that use data transformers"""
 
@@ -169,19 +550,10 @@ class DataTransformerMixin:
         raise NotImplementedError("The data_transformers property must be defined.")
 
     @property
-    def _compose_transformers(self) -> DataFrameTransformer:
-        """Combine data transformation functions via composition"""
-
-        # Need to reverse the transformation steps, because composition makes the output
-        # of each new function the argument for the previous
-        return reduce(
-            self.__compose_two_transformers,
-            reversed(self.data_transformers),
-            lambda x: x,
-        )
+    def _compose_transformers(self) -> TransformerPlan:
+        """
+        Combine data transformation functions into a plan that runs them in order,
+        skipping copies & sorts of data frames that are already indexed & sorted
+        """
 
-    @staticmethod
-    def __compose_two_transformers(
-        composed_func: DataFrameTransformer, func_element: DataFrameTransformer
-    ) -> DataFrameTransformer:
-        return lambda x: composed_func(func_element(x))
+        return TransformerPlan(self.data_transformers)
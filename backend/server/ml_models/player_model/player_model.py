@@ -1,6 +1,7 @@
 """Model class trained on player data and its associated data class"""
 
 from typing import List, Callable, Optional
+import pandas as pd
 import numpy as np
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
@@ -21,8 +22,12 @@ from server.data_processors.feature_functions import (
 )
 from server.data_processors.feature_calculation import (
     feature_calculator,
-    calculate_division,
-    calculate_addition,
+    calculate_expression,
+)
+from server.data_processors.dtype_policy import (
+    compact_dtypes,
+    fill_missing_values,
+    packed_keys,
 )
 from server.data_readers import FitzroyDataReader
 from server.ml_models.ml_model import MLModel, MLModelData, DataTransformerMixin
@@ -69,6 +74,9 @@ DROPPABLE_COLS = [
     "date",
     "venue",
 ]
+# Bits for each part of the packed player-match IDs (player_id, match_id, year)
+ID_COLS = ["player_id", "match_id", "year"]
+ID_BITS = [28, 24, 11]
 COL_TRANSLATIONS = {
     "season": "year",
     "time_on_ground__": "time_on_ground",
@@ -83,18 +91,14 @@ FEATURE_FUNCS: List[DataFrameTransformer] = [
     feature_calculator(
         [
             (
-                calculate_addition,
-                [("rolling_prev_match_goals", "rolling_prev_match_behinds")],
-            )
-        ]
-    ),
-    feature_calculator(
-        [
-            (
-                calculate_division,
+                calculate_expression,
                 [
                     (
-                        "rolling_prev_match_goals",
+                        "rolling_prev_match_goals_plus_rolling_prev_match_behinds = "
+                        "rolling_prev_match_goals + rolling_prev_match_behinds",
+                        "rolling_prev_match_goals_divided_by_"
+                        "rolling_prev_match_goals_plus_rolling_prev_match_behinds = "
+                        "rolling_prev_match_goals / "
                         "rolling_prev_match_goals_plus_rolling_prev_match_behinds",
                     )
                 ],
@@ -103,6 +107,7 @@ FEATURE_FUNCS: List[DataFrameTransformer] = [
     ),
 ]
 DATA_TRANSFORMERS: List[DataFrameTransformer] = [
+    compact_dtypes,
     PlayerDataStacker().transform,
     FeatureBuilder(
         feature_funcs=FEATURE_FUNCS,
@@ -110,6 +115,7 @@ DATA_TRANSFORMERS: List[DataFrameTransformer] = [
     ).transform,
     PlayerDataAggregator(aggregations=["sum", "max", "min", "skew", "std"]).transform,
     OppoFeatureBuilder(match_cols=MATCH_STATS_COLS).transform,
+    compact_dtypes,
 ]
 
 fitzroy = FitzroyDataReader()
@@ -177,17 +183,11 @@ class PlayerModelData(MLModelData, DataTransformerMixin):
             .dropna()
             .rename(columns=COL_TRANSLATIONS)
             .astype({"year": int, "match_id": int})
-            .assign(
-                player_name=lambda x: x["first_name"] + " " + x["surname"],
-                # Need to add year to ID, because there are some
-                # player_id/match_id combos, decades apart, that by chance overlap
-                id=self.__id_col,
-            )
+            .assign(player_name=lambda x: x["first_name"] + " " + x["surname"])
             .drop(DROPPABLE_COLS, axis=1)
             # Some early matches (1800s) have fully-duplicated rows
             .drop_duplicates()
-            .set_index("id")
-            .sort_index()
+            .pipe(self.__index_by_id)
         )
 
         # Drawn finals get replayed, which screws up my indexing and a bunch of other
@@ -207,12 +207,9 @@ class PlayerModelData(MLModelData, DataTransformerMixin):
             & (~data_frame["match_id"].isin(duplicate_matches))
         ]
 
-        self._data = (
-            self._compose_transformers(data_frame)  # pylint: disable=E1102
-            .fillna(0)
-            .set_index(index_cols, drop=False)
-            .rename_axis([None] * len(index_cols))
-            .sort_index()
+        self.transformer_plan = self._compose_transformers
+        self._data = self.transformer_plan.index(
+            fill_missing_values(self.transformer_plan(data_frame)), index_cols
         )
 
     @property
@@ -224,9 +221,17 @@ class PlayerModelData(MLModelData, DataTransformerMixin):
         return self._data_transformers
 
     @staticmethod
-    def __id_col(data_frame):
-        return (
-            data_frame["player_id"].astype(str)
-            + data_frame["match_id"].astype(str)
-            + data_frame["year"].astype(str)
-        )
+    def __index_by_id(data_frame):
+        # Need to add year to ID, because there are some
+        # player_id/match_id combos, decades apart, that by chance overlap.
+        # Packed integer IDs are cheaper to build & sort than concatenated strings,
+        # which could also collide (e.g. '12' + '345' & '123' + '45')
+        ids = packed_keys([data_frame[id_col] for id_col in ID_COLS], ID_BITS)
+        id_order = np.argsort(ids, kind="mergesort")
+
+        # Taking the rows in ID order sorts the data frame with one copy,
+        # rather than copying it to add the ID column, set the index & sort it
+        id_data_frame = data_frame.take(id_order)
+        id_data_frame.index = pd.Index(ids[id_order], name="id")
+
+        return id_data_frame
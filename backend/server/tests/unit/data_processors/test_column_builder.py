@@ -0,0 +1,133 @@
+from unittest import TestCase
+import pandas as pd
+import numpy as np
+
+from server.data_processors.column_builder import (
+    active_column_builder,
+    add_columns,
+    drop_columns,
+    reorder_rows,
+)
+
+N_ROWS = 10
+
+
+class TestColumnBuilder(TestCase):
+    def setUp(self):
+        self.data_frame = pd.DataFrame(
+            {
+                "score": np.random.randint(50, 150, N_ROWS),
+                "oppo_score": np.random.randint(50, 150, N_ROWS),
+            }
+        )
+
+    def test_add_columns(self):
+        margin = self.data_frame["score"] - self.data_frame["oppo_score"]
+
+        with self.subTest("outside of a builder"):
+            data_frame = add_columns(self.data_frame, margin=margin)
+
+            self.assertIsNot(data_frame, self.data_frame)
+            self.assertNotIn("margin", self.data_frame.columns)
+            pd.testing.assert_frame_equal(
+                data_frame, self.data_frame.assign(margin=margin)
+            )
+
+        with self.subTest("with the builder's data frame"):
+            builder_data_frame = self.data_frame.copy()
+
+            with active_column_builder(builder_data_frame) as column_builder:
+                data_frame = add_columns(builder_data_frame, margin=margin)
+
+                self.assertIs(data_frame, builder_data_frame)
+                self.assertEqual(column_builder.added_columns, ["margin"])
+                self.assertEqual(column_builder.copies, 0)
+
+                materialized_data_frame = column_builder.materialize(data_frame)
+
+            pd.testing.assert_frame_equal(
+                materialized_data_frame, self.data_frame.assign(margin=margin)
+            )
+
+        with self.subTest("with a data frame that the builder doesn't own"):
+            with active_column_builder(self.data_frame.copy()) as column_builder:
+                data_frame = add_columns(self.data_frame, margin=margin)
+
+                self.assertIsNot(data_frame, self.data_frame)
+                self.assertNotIn("margin", self.data_frame.columns)
+                self.assertTrue(column_builder.owns(data_frame))
+
+                # Later columns get added to the copy in place
+                self.assertIs(add_columns(data_frame, total=margin * 2), data_frame)
+                self.assertEqual(column_builder.copies, 1)
+
+        with self.subTest("with existing columns"):
+            builder_data_frame = self.data_frame.copy()
+
+            with active_column_builder(builder_data_frame) as column_builder:
+                data_frame = add_columns(builder_data_frame, score=margin)
+
+                self.assertIsNot(data_frame, builder_data_frame)
+                self.assertEqual(list(data_frame.columns), ["score", "oppo_score"])
+                self.assertEqual(column_builder.copies, 1)
+
+    def test_drop_columns(self):
+        expected_data_frame = self.data_frame.drop("oppo_score", axis=1)
+
+        with self.subTest("outside of a builder"):
+            data_frame = drop_columns(self.data_frame, "oppo_score")
+
+            pd.testing.assert_frame_equal(data_frame, expected_data_frame)
+            self.assertIn("oppo_score", self.data_frame.columns)
+
+        with self.subTest("with the builder's data frame"):
+            builder_data_frame = self.data_frame.copy()
+
+            with active_column_builder(builder_data_frame) as column_builder:
+                data_frame = drop_columns(builder_data_frame, "oppo_score")
+
+                self.assertIs(data_frame, builder_data_frame)
+                self.assertEqual(column_builder.copies, 0)
+
+            pd.testing.assert_frame_equal(data_frame, expected_data_frame)
+
+        with self.subTest("with a data frame that the builder doesn't own"):
+            with active_column_builder(self.data_frame.copy()) as column_builder:
+                data_frame = drop_columns(self.data_frame, "oppo_score")
+
+                self.assertIn("oppo_score", self.data_frame.columns)
+                self.assertTrue(column_builder.owns(data_frame))
+                self.assertEqual(column_builder.copies, 1)
+
+            pd.testing.assert_frame_equal(data_frame, expected_data_frame)
+
+    def test_reorder_rows(self):
+        rows = np.arange(N_ROWS)[::-1]
+        margin = (self.data_frame["score"] - self.data_frame["oppo_score"]).values
+        expected_data_frame = self.data_frame.iloc[rows].assign(score=margin[rows])
+
+        with self.subTest("outside of a builder"):
+            scores = self.data_frame["score"].copy()
+            data_frame = reorder_rows(self.data_frame, rows, score=margin[rows])
+
+            pd.testing.assert_frame_equal(data_frame, expected_data_frame)
+            pd.testing.assert_series_equal(self.data_frame["score"], scores)
+
+        with self.subTest("with the builder's data frame"):
+            builder_data_frame = self.data_frame.copy()
+
+            with active_column_builder(builder_data_frame) as column_builder:
+                data_frame = reorder_rows(builder_data_frame, rows, score=margin[rows])
+
+                self.assertTrue(column_builder.owns(data_frame))
+                self.assertEqual(column_builder.copies, 1)
+                pd.testing.assert_frame_equal(builder_data_frame, self.data_frame)
+
+                # Later columns get added to the reordered data frame in place
+                self.assertIs(add_columns(data_frame, total=margin), data_frame)
+
+                materialized_data_frame = column_builder.materialize(data_frame)
+
+            pd.testing.assert_frame_equal(
+                materialized_data_frame, expected_data_frame.assign(total=margin)
+            )
@@ -0,0 +1,102 @@
+from unittest import TestCase
+import pandas as pd
+import numpy as np
+
+from server.data_processors.dtype_policy import (
+    compact_dtypes,
+    fill_missing_values,
+    memory_report,
+    packed_keys,
+)
+from server.ml_models.data_config import TEAM_NAMES
+
+N_ROWS = 1000
+
+
+class TestDtypePolicy(TestCase):
+    def setUp(self):
+        self.data_frame = pd.DataFrame(
+            {
+                "team": np.random.choice(TEAM_NAMES[:4], N_ROWS),
+                "player_name": np.random.choice(
+                    ["Gary Ablett", "Jack Riewoldt"], N_ROWS
+                ),
+                "year": 2015,
+                "score": np.random.randint(50, 150, N_ROWS),
+                "kicks": np.random.randint(0, 30, N_ROWS).astype(float),
+                "rolling_kicks": np.random.randint(0, 30, N_ROWS) / 4,
+                "margin_ratio": np.random.random(N_ROWS),
+            }
+        )
+
+    def test_compact_dtypes(self):
+        compact_data_frame = compact_dtypes(self.data_frame)
+
+        self.assertEqual(
+            [str(dtype) for dtype in compact_data_frame.dtypes],
+            ["category", "category", "int64", "int16", "int8", "float32", "float64"],
+        )
+        self.assertEqual(list(compact_data_frame["team"].cat.categories), TEAM_NAMES)
+
+        for label, values in compact_data_frame.iteritems():
+            np.testing.assert_array_equal(
+                np.asarray(values), self.data_frame[label].values
+            )
+
+        with self.subTest("with values that aren't among the categories"):
+            compact_data_frame = compact_dtypes(self.data_frame.assign(team="Wombats"))
+
+            self.assertEqual(
+                list(compact_data_frame["team"].cat.categories),
+                TEAM_NAMES + ["Wombats"],
+            )
+            self.assertFalse(compact_data_frame["team"].isna().any())
+
+        with self.subTest("with missing values"):
+            blank_data_frame = self.data_frame.astype({"kicks": float})
+            blank_data_frame.loc[0, "kicks"] = np.nan
+            compact_data_frame = compact_dtypes(blank_data_frame)
+
+            self.assertEqual(compact_data_frame["kicks"].dtype, np.float32)
+            self.assertTrue(np.isnan(compact_data_frame["kicks"].iloc[0]))
+
+    def test_fill_missing_values(self):
+        blank_data_frame = compact_dtypes(self.data_frame.assign(kicks=np.nan))
+        filled_data_frame = fill_missing_values(blank_data_frame)
+
+        self.assertEqual(
+            list(filled_data_frame.columns), list(blank_data_frame.columns)
+        )
+        self.assertTrue((filled_data_frame["kicks"] == 0).all())
+        self.assertEqual(
+            filled_data_frame["team"].dtype, blank_data_frame["team"].dtype
+        )
+
+    def test_packed_keys(self):
+        player_ids = pd.Series([12, 123, 12, 5], name="player_id")
+        match_ids = pd.Series([345, 45, 346, 9000], name="match_id")
+        keys = packed_keys([player_ids, match_ids], [16, 16])
+
+        self.assertEqual(keys.dtype, np.int64)
+        # Keys that would collide as concatenated strings stay distinct
+        self.assertEqual(len(np.unique(keys)), len(keys))
+        self.assertEqual(list(np.argsort(keys)), [3, 0, 2, 1])
+
+        with self.subTest("with values that don't fit in their bits"):
+            with self.assertRaises(ValueError):
+                packed_keys([player_ids, match_ids], [16, 8])
+
+        with self.subTest("with too many bits"):
+            with self.assertRaises(ValueError):
+                packed_keys([player_ids, match_ids], [32, 32])
+
+    def test_memory_report(self):
+        compact_data_frame = compact_dtypes(self.data_frame)
+        report = memory_report({"before": self.data_frame, "after": compact_data_frame})
+
+        self.assertEqual(list(report.columns), ["before", "after"])
+        self.assertLess(report.loc["total", "after"], report.loc["total", "before"])
+        self.assertAlmostEqual(
+            report.loc["total", "before"],
+            self.data_frame.memory_usage(deep=True).sum() / 1e6,
+        )
@@ -0,0 +1,38 @@
+from unittest import TestCase
+import numpy as np
+
+from server.data_processors.feature_functions import add_elo_rating, K, HGA
+from server.data_processors.elo_sweep import sweep_elo_ratings, elo_param_grid
+from server.tests.unit.data_processors.test_feature_functions import (
+    MATCHES,
+    build_team_match_data_frame,
+)
+
+
+class TestEloSweep(TestCase):
+    def test_sweep_elo_ratings(self):
+        elo_data_frame = build_team_match_data_frame(MATCHES)
+        elo_params = elo_param_grid(k=[20, K], hga=[0, HGA])
+
+        elo_ratings, param_accuracy = sweep_elo_ratings(elo_data_frame, elo_params)
+
+        self.assertEqual(
+            list(elo_ratings.columns), [f"elo_rating_{idx}" for idx in range(4)]
+        )
+        self.assertTrue(elo_ratings.index.equals(elo_data_frame.index))
+        self.assertEqual(list(param_accuracy["k"]), [20, 20, K, K])
+        self.assertTrue(param_accuracy["accuracy"].between(0, 1).all())
+
+        with self.subTest("with default parameters"):
+            np.testing.assert_allclose(
+                elo_ratings["elo_rating_3"],
+                add_elo_rating(elo_data_frame)["elo_rating"],
+            )
+
+        with self.subTest("with a missing parameter"):
+            with self.assertRaises(ValueError):
+                sweep_elo_ratings(elo_data_frame, elo_params.drop("s", axis=1))
+
+        with self.subTest("with an unknown parameter"):
+            with self.assertRaises(ValueError):
+                elo_param_grid(k=[20], home_ground_advantage=[9])
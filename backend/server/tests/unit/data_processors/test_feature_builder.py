@@ -1,10 +1,15 @@
 from unittest import TestCase
+import tracemalloc
 from faker import Faker
 import pandas as pd
 import numpy as np
 
 from server.data_processors import FeatureBuilder
 from server.data_processors.feature_builder import REQUIRED_COLS
+from server.data_processors.feature_plan import declare_columns
+from server.data_processors.feature_functions import add_result, add_margin
+from server.data_processors.season_partitions import SeasonPartitionedFeatures
+from server.ml_models.ml_model import TransformerPlan, profile_transformers
 
 FAKE = Faker()
 
@@ -48,6 +53,108 @@ class TestFeatureBuilder(TestCase):
             self.assertIn("new_col", transformed_df.columns)
             self.assertIn("newer_col", transformed_df.columns)
 
+        with self.subTest("with output_cols"):
+            feature_funcs = [
+                declare_columns(produced=["new_col"])(lambda df: df.assign(new_col=1)),
+                declare_columns(produced=["newer_col"])(
+                    lambda df: df.assign(newer_col=2)
+                ),
+            ]
+            builder = FeatureBuilder(
+                feature_funcs=feature_funcs, output_cols=["newer_col"]
+            )
+
+            transformed_df = builder.transform(valid_data_frame)
+
+            self.assertIn("newer_col", transformed_df.columns)
+            self.assertNotIn("new_col", transformed_df.columns)
+            self.assertEqual(
+                list(builder.feature_plan.report["included"]), [False, True]
+            )
+
+        with self.subTest("in a TransformerPlan"):
+            other_builder = FeatureBuilder(
+                feature_funcs=[lambda df: df.assign(margin=df["score"] - 1)]
+            )
+            plan = TransformerPlan([self.builder.transform, other_builder.transform])
+            original_columns = list(valid_data_frame.columns)
+
+            transformed_df = plan(valid_data_frame)
+
+            self.assertEqual(list(valid_data_frame.columns), original_columns)
+            self.assertIn("newer_col", transformed_df.columns)
+            self.assertIn("margin", transformed_df.columns)
+            self.assertTrue(transformed_df.index.is_monotonic_increasing)
+            # Only the first builder needs to index & sort the data frame
+            self.assertEqual((plan.copies_eliminated, plan.sorts_eliminated), (1, 1))
+            self.assertEqual(list(plan.report["copy_eliminated"]), [False, True])
+
+        with self.subTest("with a profiler"):
+            plan = TransformerPlan([self.builder.transform])
+
+            with profile_transformers() as profiler:
+                plan(valid_data_frame)
+
+            report = profiler.report
+
+            self.assertEqual(
+                list(report["stage"]),
+                ["FeatureBuilder.transform", "<lambda>", "<lambda>"],
+            )
+            self.assertEqual(list(report["depth"]), [0, 1, 1])
+            self.assertEqual(
+                list(report[["cols_in", "cols_out"]].iloc[0]),
+                [len(valid_data_frame.columns), len(valid_data_frame.columns) + 2],
+            )
+            # Feature functions' time is part of the builder's
+            self.assertGreaterEqual(
+                report["wall_time"].iloc[0], report["wall_time"].iloc[1:].sum()
+            )
+            self.assertFalse(
+                report[["wall_time", "cpu_time", "peak_memory_mb"]].isna().any().any()
+            )
+
+        with self.subTest("with nested profilers"):
+            plan = TransformerPlan([self.builder.transform])
+
+            with profile_transformers() as outer_profiler:
+                with profile_transformers() as inner_profiler:
+                    plan(valid_data_frame)
+
+                # The inner profiler leaves the outer profiler's trace running
+                self.assertTrue(tracemalloc.is_tracing())
+                plan(valid_data_frame)
+
+            self.assertFalse(tracemalloc.is_tracing())
+
+            for profiler in [outer_profiler, inner_profiler]:
+                self.assertEqual(len(profiler.report), 3)
+                self.assertFalse(profiler.report["peak_memory_mb"].isna().any())
+                self.assertTrue((profiler.report["peak_memory_mb"] >= 0).all())
+
+        with self.subTest("with season partitions"):
+            season_data_frame = valid_data_frame.assign(
+                year=np.repeat([2014, 2015], 5)
+            ).set_index(["year", "round_number", "team"], drop=False)
+            feature_funcs = [
+                add_result,
+                add_margin,
+                lambda df: df.assign(total=df["score"] + df["oppo_score"]),
+            ]
+            builder = FeatureBuilder(feature_funcs=feature_funcs, season_partitions=2)
+
+            self.assertIsInstance(
+                builder.data_transformers[0], SeasonPartitionedFeatures
+            )
+            # Undeclared feature functions run on the whole data frame
+            self.assertIs(builder.data_transformers[1], feature_funcs[-1])
+            pd.testing.assert_frame_equal(
+                builder.transform(season_data_frame),
+                FeatureBuilder(feature_funcs=feature_funcs).transform(
+                    season_data_frame
+                ),
+            )
+
         for required_col in REQUIRED_COLS:
             with self.subTest(data_frame=valid_data_frame.drop(required_col, axis=1)):
                 data_frame = valid_data_frame.drop(required_col, axis=1)
@@ -0,0 +1,163 @@
+from unittest import TestCase
+import tempfile
+import pandas as pd
+import numpy as np
+
+from server.data_processors.feature_cache import (
+    FeatureCache,
+    memoize_features,
+    memoize_calculator,
+    memoize_calculations,
+)
+from server.data_processors import FeatureBuilder
+from server.data_processors.feature_functions import (
+    add_result,
+    add_last_year_brownlow_votes,
+)
+from server.data_processors.feature_calculation import calculate_rolling_rate
+
+N_ROWS = 10
+
+
+class TestFeatureCache(TestCase):
+    def setUp(self):
+        self.data_frame = (
+            pd.DataFrame(
+                {
+                    "team": np.repeat(["Adelaide", "Brisbane"], N_ROWS // 2),
+                    "year": 2015,
+                    "round_number": np.tile(np.arange(1, N_ROWS // 2 + 1), 2),
+                    "score": np.random.randint(50, 150, N_ROWS),
+                    "oppo_score": np.random.randint(50, 150, N_ROWS),
+                    "venue": "MCG",
+                }
+            )
+            .set_index(["team", "year", "round_number"], drop=False)
+            .rename_axis([None, None, None])
+        )
+        self.cache = FeatureCache()
+
+    def test_memoize_features(self):
+        feature_func = memoize_features(add_result, cache=self.cache)
+        result_data_frame = feature_func(self.data_frame)
+
+        pd.testing.assert_frame_equal(result_data_frame, add_result(self.data_frame))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        with self.subTest("with the same required columns"):
+            cached_data_frame = feature_func(self.data_frame.assign(venue="Gabba"))
+
+            self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+            self.assertEqual(
+                list(cached_data_frame["result"]), list(result_data_frame["result"])
+            )
+
+        with self.subTest("with different required column values"):
+            feature_func(self.data_frame.assign(score=self.data_frame["score"] + 1))
+
+            self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+        with self.subTest("with a function defined in another function"):
+            local_func = lambda df: df  # noqa: E731
+
+            self.assertIs(memoize_features(local_func, cache=self.cache), local_func)
+
+        with self.subTest("with a function that drops columns"):
+            player_data_frame = self.data_frame.assign(
+                oppo_team="Carlton",
+                player_id=np.tile([1, 2], N_ROWS // 2),
+                brownlow_votes=np.random.randint(0, 20, N_ROWS),
+            )
+            builder = FeatureBuilder(
+                feature_funcs=[add_last_year_brownlow_votes], cache=FeatureCache()
+            )
+
+            built_data_frame = builder.transform(player_data_frame)
+            cached_data_frame = builder.transform(player_data_frame)
+
+            self.assertNotIn("brownlow_votes", cached_data_frame.columns)
+            pd.testing.assert_frame_equal(cached_data_frame, built_data_frame)
+
+    def test_memoize_calculator(self):
+        data_calculator = calculate_rolling_rate(("score",))
+        calc_function = memoize_calculator(data_calculator, cache=self.cache)
+
+        rolling_score = calc_function(self.data_frame)
+        pd.testing.assert_series_equal(rolling_score, data_calculator(self.data_frame))
+
+        pd.testing.assert_series_equal(calc_function(self.data_frame), rolling_score)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        with self.subTest("with different parameters"):
+            memoize_calculator(
+                calculate_rolling_rate(("score",), window=3), cache=self.cache
+            )(self.data_frame)
+
+            self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_memoize_calculations(self):
+        data_calculators = [
+            calculate_rolling_rate(("score",)),
+            calculate_rolling_rate(("oppo_score",)),
+            # Calculators defined in other functions can't be memoized
+            lambda df: df["score"].rename("new_score"),
+        ]
+        calculated_calculators = []
+
+        def calculate(calculators):
+            calculated_calculators.append(calculators)
+            return [calculator(self.data_frame) for calculator in calculators]
+
+        results = memoize_calculations(
+            data_calculators, self.data_frame, calculate, cache=self.cache
+        )
+
+        for result, data_calculator in zip(results, data_calculators):
+            pd.testing.assert_series_equal(result, data_calculator(self.data_frame))
+
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+        cached_results = memoize_calculations(
+            data_calculators, self.data_frame, calculate, cache=self.cache
+        )
+
+        for cached_result, result in zip(cached_results, results):
+            pd.testing.assert_series_equal(cached_result, result)
+
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+        # Only the calculator that can't be memoized gets calculated again
+        self.assertEqual(calculated_calculators[-1], data_calculators[-1:])
+
+    def test_feature_cache(self):
+        values = np.zeros(1000)
+
+        with self.subTest("with more results than fit in memory"):
+            cache = FeatureCache(max_size_mb=values.nbytes * 2.5 / 1e6)
+
+            for key in ["a", "b", "c"]:
+                cache.set(key, values)
+
+            self.assertIsNone(cache.get("a"))
+            self.assertIs(cache.get("c"), values)
+
+        with self.subTest("with a disabled cache"):
+            cache = FeatureCache(enabled=False)
+            feature_func = memoize_features(add_result, cache=cache)
+
+            feature_func(self.data_frame)
+            self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+            with cache.enable():
+                feature_func(self.data_frame)
+                feature_func(self.data_frame)
+
+            self.assertFalse(cache.enabled)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        with self.subTest("with a cache directory"):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                FeatureCache(cache_dir=cache_dir).set("a", values)
+
+                np.testing.assert_array_equal(
+                    FeatureCache(cache_dir=cache_dir).get("a"), values
+                )
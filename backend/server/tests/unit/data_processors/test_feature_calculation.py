@@ -9,8 +9,13 @@ from server.data_processors.feature_calculation import (
     calculate_division,
     calculate_multiplication,
     calculate_rolling_mean_by_dimension,
+    calculate_rolling_means_by_dimension,
     calculate_addition,
+    calculate_expression,
+    calculate_ewm_rate,
 )
+from server.data_processors.feature_cache import FeatureCache
+from server.ml_models.data_config import AVG_SEASON_LENGTH
 
 FAKE = Faker()
 
@@ -59,6 +64,36 @@ class TestFeatureCalculations(TestCase):
         self.assertIsInstance(calculated_data_frame, pd.DataFrame)
         self.assertFalse(any(calculated_data_frame.columns.duplicated()))
 
+        for executor in ["thread", "process"]:
+            with self.subTest(executor=executor):
+                calc_function = feature_calculator(
+                    calculators, executor=executor, max_workers=2
+                )
+
+                pd.testing.assert_frame_equal(
+                    calc_function(self.data_frame), calculated_data_frame
+                )
+
+        with self.subTest("with a process executor & cache"):
+            cache = FeatureCache()
+            calc_function = feature_calculator(
+                [(calculate_rolling_rate, [("score",), ("oppo_score",)])],
+                executor="process",
+                max_workers=2,
+                cache=cache,
+            )
+            calculated_data_frame = calc_function(self.data_frame)
+
+            # Results calculated in forked processes get cached in this one
+            pd.testing.assert_frame_equal(
+                calc_function(self.data_frame), calculated_data_frame
+            )
+            self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+        with self.subTest(executor="unknown"):
+            with self.assertRaises(ValueError):
+                feature_calculator(calculators, executor="gpu")
+
     def test_calculate_rolling_rate(self):
         calc_function = calculate_rolling_rate(("score",))
 
@@ -73,6 +108,40 @@ class TestFeatureCalculations(TestCase):
         self.assertIsInstance(rolling_score, pd.Series)
         self.assertEqual(rolling_score.name, "rolling_score_rate")
 
+        with self.subTest("matches pandas rolling & expanding means"):
+            n_rows = 120
+            team_data_frame = (
+                pd.DataFrame(
+                    {
+                        "team": np.repeat(["Adelaide", "Brisbane", "Carlton"], 40),
+                        "year": np.tile(np.repeat([2014, 2015], 20), 3),
+                        "round_number": np.tile(np.arange(1, 21), 6),
+                        "result": np.random.choice([0, 0.5, 1], n_rows),
+                    }
+                )
+                .set_index(["team", "year", "round_number"], drop=False)
+                .rename_axis([None, None, None])
+            )
+            team_data_frame.iloc[[5, 50, 51], -1] = np.nan
+
+            for window in [1, 3, AVG_SEASON_LENGTH]:
+                groups = team_data_frame["result"].groupby(level=0, group_keys=False)
+                expected_rate = (
+                    groups.rolling(window=window)
+                    .mean()
+                    .fillna(groups.expanding(1).mean())
+                )
+
+                rolling_rate = calculate_rolling_rate(("result",), window=window)(
+                    team_data_frame
+                )
+
+                np.testing.assert_allclose(rolling_rate, expected_rate)
+
+        with self.subTest("with an invalid window"):
+            with self.assertRaises(ValueError):
+                calculate_rolling_rate(("score",), window=0)
+
     def test_calculate_division(self):
         calc_function = calculate_division(("score", "oppo_score"))
 
@@ -101,6 +170,80 @@ class TestFeatureCalculations(TestCase):
         self.assertIsInstance(multiplied_scores, pd.Series)
         self.assertEqual(multiplied_scores.name, "score_multiplied_by_oppo_score")
 
+    def test_calculate_ewm_rate(self):
+        calc_function = calculate_ewm_rate(("oppo_team", "score"))
+
+        assert_required_columns(
+            self,
+            req_cols=("oppo_team", "score"),
+            valid_data_frame=self.data_frame,
+            feature_function=calc_function,
+        )
+
+        ewm_oppo_team_score = calc_function(self.data_frame)
+        self.assertIsInstance(ewm_oppo_team_score, pd.Series)
+        self.assertEqual(ewm_oppo_team_score.name, "ewm_score_rate_by_oppo_team")
+
+        n_rows = 120
+        team_data_frame = (
+            pd.DataFrame(
+                {
+                    "team": np.repeat(["Adelaide", "Brisbane", "Carlton"], 40),
+                    "year": np.tile(np.repeat([2014, 2015], 20), 3),
+                    "round_number": np.tile(np.arange(1, 21), 6),
+                    "result": np.random.choice([0, 0.5, 1], n_rows),
+                }
+            )
+            .set_index(["team", "year", "round_number"], drop=False)
+            .rename_axis([None, None, None])
+        )
+        team_data_frame.iloc[[5, 50, 51], -1] = np.nan
+        span = 5
+
+        with self.subTest("matches pandas ewm of previous matches"):
+            expected_rate = (
+                team_data_frame["result"]
+                .groupby(level=0, group_keys=False)
+                .apply(
+                    lambda results: results.ewm(span=span, adjust=False, ignore_na=True)
+                    .mean()
+                    .shift()
+                )
+            )
+
+            ewm_rate = calculate_ewm_rate(("result",), span=span)(team_data_frame)
+
+            np.testing.assert_allclose(ewm_rate, expected_rate)
+
+        with self.subTest("with update"):
+            calc_function = calculate_ewm_rate(("result",), span=span)
+            ewm_rate = calc_function(team_data_frame)
+            expected_states = calc_function.states
+
+            is_history = team_data_frame["year"] == 2014
+            calc_function(team_data_frame[is_history])
+            history_states = calc_function.states
+
+            # Unplayed matches get teams' latest rates without changing states
+            unplayed_rate = calc_function.update(
+                team_data_frame[~is_history].assign(result=np.nan)
+            )
+            np.testing.assert_allclose(
+                unplayed_rate,
+                history_states[team_data_frame[~is_history]["team"]].values,
+            )
+            pd.testing.assert_series_equal(calc_function.states, history_states)
+
+            np.testing.assert_allclose(
+                calc_function.update(team_data_frame[~is_history]),
+                ewm_rate[~is_history],
+            )
+            pd.testing.assert_series_equal(calc_function.states, expected_states)
+
+        with self.subTest("with an invalid span"):
+            with self.assertRaises(ValueError):
+                calculate_ewm_rate(("score",), span=0)
+
     def test_calculate_rolling_mean_by_dimension(self):
         calc_function = calculate_rolling_mean_by_dimension(("oppo_team", "score"))
 
@@ -117,6 +260,40 @@ class TestFeatureCalculations(TestCase):
             rolling_oppo_team_score.name, "rolling_mean_score_by_oppo_team"
         )
 
+    def test_calculate_rolling_means_by_dimension(self):
+        calc_function = calculate_rolling_means_by_dimension(
+            ("oppo_team", "score", "oppo_score")
+        )
+
+        assert_required_columns(
+            self,
+            req_cols=("oppo_team", "score", "oppo_score"),
+            valid_data_frame=self.data_frame,
+            feature_function=calc_function,
+        )
+
+        rolling_oppo_team_scores = calc_function(self.data_frame)
+        self.assertIsInstance(rolling_oppo_team_scores, pd.DataFrame)
+        self.assertEqual(
+            list(rolling_oppo_team_scores.columns),
+            ["rolling_mean_score_by_oppo_team", "rolling_mean_oppo_score_by_oppo_team"],
+        )
+
+        with self.subTest("matches calculate_rolling_mean_by_dimension"):
+            for metric_column in ["score", "oppo_score"]:
+                rolling_oppo_team_score = calculate_rolling_mean_by_dimension(
+                    ("oppo_team", metric_column)
+                )(self.data_frame)
+
+                pd.testing.assert_series_equal(
+                    rolling_oppo_team_scores[rolling_oppo_team_score.name],
+                    rolling_oppo_team_score,
+                )
+
+        with self.subTest("without metric columns"):
+            with self.assertRaises(ValueError):
+                calculate_rolling_means_by_dimension(("oppo_team",))
+
     def test_calculate_addition(self):
         calc_function = calculate_addition(("score", "oppo_score"))
 
@@ -130,3 +307,100 @@ class TestFeatureCalculations(TestCase):
         addition_scores = calc_function(self.data_frame)
         self.assertIsInstance(addition_scores, pd.Series)
         self.assertEqual(addition_scores.name, "score_plus_oppo_score")
+
+    def test_calculate_expression(self):
+        calc_function = calculate_expression(
+            (
+                "score_plus_oppo_score = score + oppo_score",
+                "score_divided_by_score_plus_oppo_score = "
+                "score / score_plus_oppo_score",
+            )
+        )
+
+        assert_required_columns(
+            self,
+            req_cols=("score", "oppo_score"),
+            valid_data_frame=self.data_frame,
+            feature_function=calc_function,
+        )
+
+        expression_scores = calc_function(self.data_frame)
+        self.assertIsInstance(expression_scores, pd.DataFrame)
+        self.assertEqual(
+            list(expression_scores.columns),
+            ["score_plus_oppo_score", "score_divided_by_score_plus_oppo_score"],
+        )
+
+        with self.subTest("matches chained calculators"):
+            addition_scores = calculate_addition(("score", "oppo_score"))(
+                self.data_frame
+            )
+            division_scores = calculate_division(("score", "score_plus_oppo_score"))(
+                self.data_frame.assign(score_plus_oppo_score=addition_scores)
+            )
+
+            np.testing.assert_allclose(
+                expression_scores["score_plus_oppo_score"], addition_scores
+            )
+            np.testing.assert_allclose(
+                expression_scores["score_divided_by_score_plus_oppo_score"],
+                division_scores,
+            )
+
+        zero_data_frame = self.data_frame.assign(oppo_score=0)
+        division_expression = ("score_ratio = score / oppo_score",)
+
+        for inf_policy, expected_value in [("zero", 0), ("nan", np.nan)]:
+            with self.subTest(inf_policy=inf_policy):
+                score_ratio = calculate_expression(
+                    division_expression, inf_policy=inf_policy
+                )(zero_data_frame)["score_ratio"]
+
+                np.testing.assert_array_equal(
+                    score_ratio, np.repeat(expected_value, len(zero_data_frame))
+                )
+
+        negative_data_frame = zero_data_frame.assign(score=-zero_data_frame["score"])
+
+        for inf_policy, expected_value in [("zero", -np.inf), ("nan", np.nan)]:
+            with self.subTest(
+                "with negative values divided by 0", inf_policy=inf_policy
+            ):
+                score_ratio = calculate_expression(
+                    division_expression, inf_policy=inf_policy
+                )(negative_data_frame)["score_ratio"]
+
+                np.testing.assert_array_equal(
+                    score_ratio, np.repeat(expected_value, len(negative_data_frame))
+                )
+
+        with self.subTest("with the same infinite values as calculate_division"):
+            np.testing.assert_array_equal(
+                calculate_expression(division_expression)(negative_data_frame)[
+                    "score_ratio"
+                ],
+                calculate_division(("score", "oppo_score"))(negative_data_frame),
+            )
+
+        with self.subTest(inf_policy="raise"):
+            with self.assertRaises(ValueError):
+                calculate_expression(division_expression, inf_policy="raise")(
+                    zero_data_frame
+                )
+
+        with self.subTest(nan_policy="zero"):
+            score_ratio = calculate_expression(
+                division_expression, inf_policy="nan", nan_policy="zero"
+            )(zero_data_frame)["score_ratio"]
+
+            self.assertEqual(list(score_ratio), [0] * len(zero_data_frame))
+
+        for invalid_expression in [
+            "score + oppo_score",
+            "total = sum(score)",
+            "total = score.sum()",
+            "total = score +",
+        ]:
+            with self.subTest(expression=invalid_expression):
+                with self.assertRaises(ValueError):
+                    calculate_expression((invalid_expression,))
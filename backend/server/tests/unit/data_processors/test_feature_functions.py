@@ -22,6 +22,44 @@ from server.data_processors.feature_functions import (
 )
 
 FAKE = Faker()
+# (year, round_number, home_team, away_team, home_score, away_score)
+MATCHES = [
+    (2013, 1, "Adelaide", "Brisbane", 85, 70),
+    (2013, 1, "Carlton", "Collingwood", 60, 92),
+    (2013, 2, "Adelaide", "Carlton", 77, 77),
+    (2013, 2, "Brisbane", "Collingwood", 101, 64),
+    (2014, 1, "Adelaide", "Collingwood", 55, 90),
+    (2014, 1, "Carlton", "Brisbane", 80, 88),
+    # Skipping a season resets ELO ratings
+    (2016, 1, "Adelaide", "Brisbane", 70, 71),
+    (2016, 2, "Adelaide", "Brisbane", 66, 104),
+]
+
+
+def build_team_match_data_frame(matches):
+    team_matches = [
+        {
+            "team": team,
+            "oppo_team": oppo_team,
+            "year": year,
+            "round_number": round_number,
+            "at_home": at_home,
+            "score": score,
+            "oppo_score": oppo_score,
+        }
+        for year, round_number, home_team, away_team, home_score, away_score in matches
+        for team, oppo_team, at_home, score, oppo_score in [
+            (home_team, away_team, 1, home_score, away_score),
+            (away_team, home_team, 0, away_score, home_score),
+        ]
+    ]
+
+    return (
+        pd.DataFrame(team_matches)
+        .set_index(["team", "year", "round_number"], drop=False)
+        .rename_axis([None, None, None])
+        .sort_index()
+    )
 
 
 def assert_column_added(
@@ -194,6 +232,26 @@ class TestFeatureFunctions(TestCase):
             feature_function=feature_function,
         )
 
+        with self.subTest("with tied teams"):
+            ladder_data_frame = (
+                pd.DataFrame(
+                    {
+                        "team": ["Adelaide", "Brisbane", "Carlton", "Collingwood"] * 2,
+                        "year": 2015,
+                        "round_number": ([1] * 4) + ([2] * 4),
+                        "cum_win_points": [0, 0, 0, 0, 4, 8, 4, 4],
+                        "cum_percent": [np.nan] * 4 + [1.1, 0.8, 1.2, 1.1],
+                    }
+                )
+                .set_index(["team", "year", "round_number"], drop=False)
+                .rename_axis([None, None, None])
+            )
+
+            ladder_positions = feature_function(ladder_data_frame)["ladder_position"]
+
+            # Ties go to teams in alphabetical order
+            self.assertEqual(list(ladder_positions), [1, 2, 3, 4, 3, 1, 2, 4])
+
     def test_add_win_streak(self):
         feature_function = add_win_streak
         valid_data_frame = self.data_frame.assign(
@@ -208,6 +266,59 @@ class TestFeatureFunctions(TestCase):
             feature_function=feature_function,
         )
 
+        with self.subTest("with draws and missing results"):
+            prev_match_results = {
+                "Adelaide": [np.nan, 1, 1, 0.5, 0, 0, 0, 0.5, 1],
+                "Brisbane": [0, 0, 1, np.nan, 0, 1, 0.5, 0.5, 0],
+            }
+            streak_data_frame = (
+                pd.DataFrame(
+                    [
+                        {
+                            "team": team,
+                            "year": 2015,
+                            "round_number": round_number,
+                            "prev_match_result": prev_match_result,
+                        }
+                        for team, team_results in prev_match_results.items()
+                        for round_number, prev_match_result in enumerate(
+                            team_results, start=1
+                        )
+                    ]
+                )
+                .set_index(["team", "year", "round_number"], drop=False)
+                .rename_axis([None, None, None])
+            )
+
+            win_streaks = feature_function(streak_data_frame)["win_streak"]
+
+            # Values calculated with the original loop-based implementation
+            expected_streaks = [
+                0.0,
+                1.0,
+                2.0,
+                2.5,
+                -1.0,
+                -2.0,
+                -3.0,
+                0.5,
+                1.5,
+                -1.0,
+                -2.0,
+                1.0,
+                0.0,
+                -1.0,
+                1.0,
+                1.5,
+                2.0,
+                -1.0,
+            ]
+            self.assertEqual(list(win_streaks), expected_streaks)
+
+        with self.subTest("with negative results"):
+            with self.assertRaises(ValueError):
+                feature_function(valid_data_frame.assign(prev_match_result=-1))
+
     def test_add_out_of_state(self):
         teams = [
             "Adelaide",
@@ -247,6 +358,17 @@ class TestFeatureFunctions(TestCase):
             feature_function=feature_function,
         )
 
+        with self.subTest("with home & away states"):
+            out_of_state = feature_function(valid_data_frame)["out_of_state"]
+            # Adelaide at Football Park is in SA, Brisbane at the S.C.G. is not in QLD
+            self.assertEqual(list(out_of_state[:2]), [0, 1])
+
+        with self.subTest("with an unknown venue"):
+            with self.assertRaisesRegex(ValueError, "Not A Real Oval"):
+                feature_function(
+                    valid_data_frame.assign(venue=venues[:-1] + ["Not A Real Oval"])
+                )
+
     def test_add_travel_distance(self):
         teams = [
             "Adelaide",
@@ -286,6 +408,19 @@ class TestFeatureFunctions(TestCase):
             feature_function=feature_function,
         )
 
+        with self.subTest("with home & away cities"):
+            travel_distance = feature_function(valid_data_frame)["travel_distance"]
+            # Adelaide at Football Park doesn't leave Adelaide
+            self.assertEqual(travel_distance.iloc[0], 0)
+            # Brisbane to Sydney is roughly 730 km
+            self.assertAlmostEqual(travel_distance.iloc[1], 730, delta=10)
+
+        with self.subTest("with an unknown team"):
+            with self.assertRaisesRegex(ValueError, "Not A Real Team"):
+                feature_function(
+                    valid_data_frame.assign(team=teams[:-1] + ["Not A Real Team"])
+                )
+
     def test_add_last_year_brownlow_votes(self):
         feature_function = add_last_year_brownlow_votes
         valid_data_frame = self.data_frame.assign(
@@ -302,6 +437,40 @@ class TestFeatureFunctions(TestCase):
             col_diff=0,
         )
 
+        with self.subTest("with multiple seasons per player"):
+            player_data_frame = pd.DataFrame(
+                {
+                    "player_id": [1, 2, 1, 1, 2, 1],
+                    "year": [2013, 2013, 2013, 2015, 2014, 2016],
+                    "brownlow_votes": [3, 1, 2, 1, np.nan, 0],
+                }
+            )
+
+            last_year_votes = feature_function(player_data_frame)[
+                "last_year_brownlow_votes"
+            ]
+
+            # Previous season is the last one the player played in
+            self.assertEqual(list(last_year_votes), [0, 0, 0, 5, 1, 1])
+
+        with self.subTest("with missing player IDs"):
+            player_data_frame = pd.DataFrame(
+                {
+                    "player_id": [1, np.nan, 1],
+                    "year": [2013, 2013, 2014],
+                    "brownlow_votes": [3, 1, 2],
+                }
+            )
+
+            last_year_votes = feature_function(player_data_frame)[
+                "last_year_brownlow_votes"
+            ]
+
+            np.testing.assert_array_equal(last_year_votes, [0, np.nan, 3])
+            self.assertNotIn(
+                "brownlow_votes", feature_function(player_data_frame).columns
+            )
+
     def test_add_rolling_player_stats(self):
         STATS_COLS = [
             "player_id",
@@ -346,6 +515,31 @@ class TestFeatureFunctions(TestCase):
             col_diff=0,
         )
 
+        with self.subTest("with more matches than the rolling window"):
+            n_matches = 25
+            player_data_frame = (
+                pd.DataFrame(
+                    {
+                        "team": "Adelaide",
+                        "oppo_team": "Brisbane",
+                        "year": [2014] * 20 + [2015] * 5,
+                        "round_number": list(range(1, 21)) + list(range(1, 6)),
+                        **{stats_col: 0 for stats_col in STATS_COLS},
+                    }
+                )
+                .assign(kicks=np.arange(1, n_matches + 1))
+                .sample(frac=1)
+            )
+
+            rolling_kicks = feature_function(player_data_frame)[
+                "rolling_prev_match_kicks"
+            ]
+
+            # First match has no previous stats, then it's the mean of all previous
+            # matches until there are enough for the 23-match window
+            expected_kicks = [idx / 2 for idx in range(23)] + [12, 13]
+            self.assertEqual(list(rolling_kicks), expected_kicks)
+
     def test_add_cum_matches_played(self):
         feature_function = add_cum_matches_played
         valid_data_frame = self.data_frame.assign(
@@ -372,6 +566,32 @@ class TestFeatureFunctions(TestCase):
             feature_function=feature_function,
         )
 
+        with self.subTest("with previous matches"):
+            elo_data_frame = build_team_match_data_frame(MATCHES)
+
+            elo_ratings = feature_function(elo_data_frame)["elo_rating"]
+
+            # Values calculated with the original row-by-row implementation
+            expected_ratings = [
+                1000.0,
+                1000.6409805850026,
+                999.7224288166515,
+                1000.0,
+                999.166690199017,
+                1000.0,
+                999.2407718345604,
+                1001.1852531648535,
+                1000.0,
+                1000.8327845514708,
+                1000.0,
+                995.914231609073,
+                998.296818194942,
+                1000.0,
+                1003.5465308389732,
+                1000.0025613836997,
+            ]
+            np.testing.assert_allclose(elo_ratings, expected_ratings)
+
     def test_add_shifted_team_features(self):
         feature_function = add_shifted_team_features(shift_columns=["score"])
         valid_data_frame = self.data_frame.assign(team=FAKE.company())
@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+from server.data_processors.feature_plan import (
+    declare_columns,
+    feature_columns,
+    plan_features,
+)
+from server.data_processors.feature_functions import (
+    add_result,
+    add_margin,
+    add_shifted_team_features,
+    add_cum_win_points,
+    add_win_streak,
+    add_elo_rating,
+)
+from server.data_processors.feature_calculation import (
+    feature_calculator,
+    calculate_rolling_rate,
+)
+
+FEATURE_FUNCS = [
+    add_result,
+    add_margin,
+    add_shifted_team_features(shift_columns=["score", "oppo_score", "result"]),
+    add_cum_win_points,
+    add_win_streak,
+    add_elo_rating,
+    feature_calculator([(calculate_rolling_rate, [("prev_match_result",)])]),
+]
+
+
+class TestFeaturePlan(TestCase):
+    def test_declare_columns(self):
+        feature_func = declare_columns(required=["score"], produced=["new_score"])(
+            lambda df: df.assign(new_score=df["score"] + 1)
+        )
+
+        self.assertEqual(list(feature_columns(feature_func).required), ["score"])
+        self.assertEqual(list(feature_columns(feature_func).produced), ["new_score"])
+
+        with self.subTest("without declared columns"):
+            self.assertIsNone(feature_columns(lambda df: df))
+
+        with self.subTest("with feature_calculator"):
+            self.assertEqual(
+                list(feature_columns(FEATURE_FUNCS[-1]).produced),
+                ["rolling_prev_match_result_rate"],
+            )
+
+    def test_plan_features(self):
+        plan = plan_features(FEATURE_FUNCS, ["win_streak", "elo_rating"])
+
+        self.assertEqual(
+            plan.feature_funcs,
+            [add_result, FEATURE_FUNCS[2], add_win_streak, add_elo_rating],
+        )
+        self.assertEqual(len(plan.report), len(FEATURE_FUNCS))
+        self.assertEqual(
+            list(plan.report["included"]), [True, False, True, False, True, True, False]
+        )
+
+        with self.subTest("with feature functions out of order"):
+            plan = plan_features(list(reversed(FEATURE_FUNCS)), ["win_streak"])
+
+            self.assertEqual(
+                plan.feature_funcs, [add_result, FEATURE_FUNCS[2], add_win_streak]
+            )
+
+        with self.subTest("with an undeclared feature function"):
+            undeclared_func = lambda df: df  # noqa: E731
+            feature_funcs = FEATURE_FUNCS[:4] + [undeclared_func] + FEATURE_FUNCS[4:]
+
+            plan = plan_features(feature_funcs, ["elo_rating"])
+
+            # Undeclared functions always run, as do all functions before them
+            self.assertEqual(plan.feature_funcs, feature_funcs[:5] + [add_elo_rating])
+
+        with self.subTest("with circular dependencies"):
+            feature_funcs = [
+                declare_columns(required=["a"], produced=["b"])(lambda df: df),
+                declare_columns(required=["b"], produced=["a"])(lambda df: df),
+            ]
+
+            with self.assertRaises(ValueError):
+                plan_features(feature_funcs, ["a"])
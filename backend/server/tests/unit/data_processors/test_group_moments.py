@@ -0,0 +1,82 @@
+from unittest import TestCase
+import pandas as pd
+import numpy as np
+
+from server.data_processors.group_moments import (
+    MOMENT_AGGREGATIONS,
+    sorted_groups,
+    group_moments,
+    aggregate_moments,
+    shifted_rolling_means,
+)
+
+N_ROWS = 30
+
+
+class TestGroupMoments(TestCase):
+    def setUp(self):
+        self.data_frame = pd.DataFrame(
+            {
+                "team": np.random.choice(["Adelaide", "Brisbane", "Carlton"], N_ROWS),
+                "round_number": np.random.randint(1, 4, N_ROWS),
+                "kicks": np.random.randint(0, 30, N_ROWS) / 3,
+                "goals": np.random.randint(0, 5, N_ROWS).astype(float),
+                # Same value for every row, like match stats
+                "score": 100.0,
+            }
+        )
+        self.data_frame.loc[:4, "goals"] = np.nan
+
+    def test_aggregate_moments(self):
+        group_cols = ["team", "round_number"]
+        value_cols = ["kicks", "goals", "score"]
+
+        sort_order, group_starts = sorted_groups(
+            [self.data_frame[col] for col in group_cols]
+        )
+        moments = group_moments(
+            self.data_frame[value_cols].values[sort_order], group_starts
+        )
+        groups = self.data_frame.groupby(group_cols)[value_cols]
+
+        for agg in MOMENT_AGGREGATIONS:
+            with self.subTest(aggregation=agg):
+                np.testing.assert_allclose(
+                    aggregate_moments(moments, agg),
+                    groups.aggregate(agg).values,
+                    rtol=1e-10,
+                    atol=1e-10,
+                )
+
+        with self.subTest("with groups in GroupBy order"):
+            np.testing.assert_array_equal(
+                self.data_frame["team"].values[sort_order[group_starts]],
+                groups.sum().index.get_level_values(0),
+            )
+
+        with self.subTest("with an unsupported aggregation"):
+            with self.assertRaises(ValueError):
+                aggregate_moments(moments, "median")
+
+    def test_shifted_rolling_means(self):
+        value_cols = ["kicks", "score"]
+        window = 3
+
+        sort_order, group_starts = sorted_groups([self.data_frame["team"]])
+        rolling_means = shifted_rolling_means(
+            self.data_frame[value_cols].values[sort_order], group_starts, window
+        )
+
+        sorted_data_frame = self.data_frame.iloc[sort_order]
+        groups = sorted_data_frame.groupby("team")[value_cols]
+        expected_means = (
+            groups.shift()
+            .fillna(0)
+            .groupby(sorted_data_frame["team"])
+            .rolling(window, min_periods=1)
+            .mean()
+            .reset_index(level=0, drop=True)
+            .loc[sorted_data_frame.index, value_cols]
+        )
+
+        np.testing.assert_allclose(rolling_means, expected_means.values)
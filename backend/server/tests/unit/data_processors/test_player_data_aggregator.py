@@ -68,6 +68,20 @@ class TestPlayerDataAggregator(TestCase):
                 transformed_df["rolling_prev_match_kicks_sum"].sum(),
             )
 
+        with self.subTest("with aggregations that aren't derived from moments"):
+            transformer = PlayerDataAggregator(
+                index_cols=self.index_cols, aggregations=["sum", "std", "median"]
+            )
+            transformed_df = transformer.transform(valid_data_frame)
+
+            self.assertIn("rolling_prev_match_kicks_median", transformed_df.columns)
+            pd.testing.assert_frame_equal(
+                transformed_df.drop(
+                    [f"{stats_col}_median" for stats_col in STATS_COLS], axis=1
+                ),
+                self.transformer.transform(valid_data_frame),
+            )
+
         for required_col in REQUIRED_COLS + self.index_cols:
             invalid_data_frame = self.data_frame.drop(required_col, axis=1)
 
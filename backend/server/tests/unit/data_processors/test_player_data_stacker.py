@@ -46,6 +46,24 @@ class TestPlayerDataStacker(TestCase):
             # Half the teams should be marked as 'at_home'
             self.assertEqual(transformed_df["at_home"].sum(), len(transformed_df) / 2)
 
+        with self.subTest("with categorical team columns"):
+            # Each column has its own categories, so they can't be compared
+            # as categoricals
+            categorical_data_frame = valid_data_frame.astype(
+                {
+                    "home_team": "category",
+                    "away_team": "category",
+                    "playing_for": "category",
+                }
+            )
+            transformed_df = self.transformer.transform(categorical_data_frame)
+
+            self.assertEqual(len(valid_data_frame), len(transformed_df))
+            self.assertEqual(
+                list(transformed_df["team"].astype(str)),
+                list(self.transformer.transform(valid_data_frame)["team"]),
+            )
+
         for required_col in REQUIRED_COLS:
             invalid_data_frame = self.data_frame.drop(required_col, axis=1)
 
@@ -0,0 +1,70 @@
+from unittest import TestCase
+import pandas as pd
+import numpy as np
+
+from server.data_processors.season_partitions import (
+    partition_seasons,
+    SeasonPartitionedFeatures,
+)
+from server.data_processors.feature_functions import add_cum_win_points, add_win_streak
+
+TEAMS = ["Adelaide", "Brisbane", "Carlton"]
+YEARS = [2013, 2014, 2015, 2016]
+N_ROUNDS = 3
+
+
+class TestSeasonPartitions(TestCase):
+    def setUp(self):
+        teams, years, round_numbers = np.meshgrid(
+            TEAMS, YEARS, np.arange(1, N_ROUNDS + 1), indexing="ij"
+        )
+        self.data_frame = (
+            pd.DataFrame(
+                {
+                    "team": teams.flatten(),
+                    "year": years.flatten(),
+                    "round_number": round_numbers.flatten(),
+                    "prev_match_result": np.random.choice([0, 0.5, 1], teams.size),
+                }
+            )
+            .set_index(["team", "year", "round_number"], drop=False)
+            .rename_axis([None, None, None])
+        )
+
+    def test_partition_seasons(self):
+        years = self.data_frame["year"].values
+        partitions = partition_seasons(years, 2, lookback_seasons=1)
+
+        self.assertEqual(len(partitions), 2)
+        self.assertEqual(
+            sorted(np.unique(years[partitions[1].rows])), [2014, 2015, 2016]
+        )
+        self.assertEqual(
+            sorted(np.unique(years[partitions[1].rows[partitions[1].season_rows]])),
+            [2015, 2016],
+        )
+
+        # Partitions' own seasons include each row once
+        season_rows = np.concatenate(
+            [partition.rows[partition.season_rows] for partition in partitions]
+        )
+        self.assertEqual(sorted(season_rows), list(range(len(years))))
+
+        with self.subTest("with more partitions than seasons"):
+            self.assertEqual(len(partition_seasons(years, 10)), len(YEARS))
+
+        with self.subTest("without any rows"):
+            self.assertEqual(partition_seasons(np.array([]), 2), [])
+
+    def test_season_partitioned_features(self):
+        partitioned_features = SeasonPartitionedFeatures([add_cum_win_points], 3)
+
+        self.assertEqual(partitioned_features.produced_columns, ["cum_win_points"])
+        pd.testing.assert_frame_equal(
+            partitioned_features(self.data_frame.copy()),
+            add_cum_win_points(self.data_frame),
+        )
+
+        with self.subTest("with a feature function that isn't season-local"):
+            with self.assertRaises(ValueError):
+                SeasonPartitionedFeatures([add_win_streak], 3, lookback_seasons=1)
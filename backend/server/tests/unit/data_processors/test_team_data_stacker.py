@@ -50,6 +50,22 @@ class TestTeamDataStacker(TestCase):
             # Half the teams should be marked as 'at_home'
             self.assertEqual(transformed_df["at_home"].sum(), len(transformed_df) / 2)
 
+        with self.subTest("with a replayed match"):
+            replayed_data_frame = valid_data_frame.iloc[[0, 0]].assign(
+                home_team=[valid_data_frame["home_team"].iloc[0], "Replay Team"],
+                away_team=[valid_data_frame["away_team"].iloc[0]] * 2,
+                home_score=[80, 90],
+            )
+            transformed_df = self.transformer.transform(replayed_data_frame)
+
+            # The replay's away team only has its last (replay) row
+            self.assertEqual(len(transformed_df), 3)
+            away_team_row = transformed_df[
+                transformed_df["team"] == valid_data_frame["away_team"].iloc[0]
+            ]
+            self.assertEqual(list(away_team_row["oppo_score"]), [90])
+            self.assertEqual(list(away_team_row["oppo_team"]), ["Replay Team"])
+
         with self.subTest(data_frame=invalid_data_frame):
             with self.assertRaises(ValueError):
                 self.transformer.transform(invalid_data_frame)
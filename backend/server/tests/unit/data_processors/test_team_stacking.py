@@ -0,0 +1,83 @@
+from unittest import TestCase
+import pandas as pd
+import numpy as np
+
+from server.data_processors.team_stacking import (
+    StackedColumn,
+    stacked_columns,
+    stacked_values,
+    last_rows_by_key,
+)
+
+TEAMS = ["Adelaide", "Brisbane", "Carlton"]
+
+
+class TestTeamStacking(TestCase):
+    def setUp(self):
+        self.data_frame = pd.DataFrame(
+            {
+                "home_team": pd.Categorical(["Adelaide", "Brisbane"], TEAMS),
+                "away_team": pd.Categorical(["Carlton", "Adelaide"], TEAMS),
+                "year": [2015, 2015],
+                "home_score": [80, 90],
+                "away_score": [70.5, 100.5],
+            }
+        )
+
+    def test_stacked_columns(self):
+        self.assertEqual(
+            stacked_columns(self.data_frame.columns),
+            [
+                StackedColumn("team", "home_team", "away_team"),
+                StackedColumn("oppo_team", "away_team", "home_team"),
+                StackedColumn("year", "year", "year"),
+                StackedColumn("score", "home_score", "away_score"),
+                StackedColumn("oppo_score", "away_score", "home_score"),
+            ],
+        )
+
+        with self.subTest("with a column for one team type"):
+            self.assertEqual(
+                stacked_columns(["home_margin"]),
+                [
+                    StackedColumn("margin", "home_margin", None),
+                    StackedColumn("oppo_margin", None, "home_margin"),
+                ],
+            )
+
+    def test_stacked_values(self):
+        rows = np.array([0, 1, 0, 1])
+        is_home = np.array([True, True, False, False])
+        team_column, _, year_column, score_column, _ = stacked_columns(
+            self.data_frame.columns
+        )
+
+        team_values = stacked_values(self.data_frame, team_column, rows, is_home)
+        self.assertEqual(list(team_values.categories), TEAMS)
+        self.assertEqual(
+            list(team_values), ["Adelaide", "Brisbane", "Carlton", "Adelaide"]
+        )
+
+        # Like pd.concat, mixed dtypes get a common dtype
+        score_values = stacked_values(self.data_frame, score_column, rows, is_home)
+        self.assertEqual(score_values.dtype, np.float64)
+        self.assertEqual(list(score_values), [80, 90, 70.5, 100.5])
+
+        self.assertEqual(
+            stacked_values(self.data_frame, year_column, rows, is_home).dtype, np.int64
+        )
+
+        with self.subTest("with different categories"):
+            data_frame = self.data_frame.assign(
+                away_team=self.data_frame["away_team"].cat.add_categories(["Wombats"])
+            )
+
+            self.assertEqual(
+                stacked_values(data_frame, team_column, rows, is_home).dtype, object
+            )
+
+    def test_last_rows_by_key(self):
+        teams = np.array(["Carlton", "Adelaide", "Carlton", "Brisbane", "Adelaide"])
+        years = np.array([2015, 2015, 2015, 2015, 2016])
+
+        self.assertEqual(list(last_rows_by_key([teams, years])), [1, 4, 3, 2])
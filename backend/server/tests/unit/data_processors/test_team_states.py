@@ -0,0 +1,110 @@
+from unittest import TestCase
+import pandas as pd
+import numpy as np
+
+from server.data_processors.feature_functions import (
+    add_result,
+    add_margin,
+    add_cum_percent,
+    add_cum_win_points,
+    add_ladder_position,
+    add_win_streak,
+    add_elo_rating,
+    add_shifted_team_features,
+    STATE_FEATURE_COLS,
+    TEAM_STATE_COLS,
+)
+from server.data_processors.team_states import (
+    add_team_state_features,
+    team_round_states,
+    latest_team_states,
+    update_team_round_states,
+)
+from server.tests.unit.data_processors.test_feature_functions import (
+    MATCHES,
+    build_team_match_data_frame,
+    make_column_assertions,
+)
+
+
+class TestTeamStates(TestCase):
+    def test_team_round_states(self):
+        data_frame = build_team_match_data_frame(MATCHES)
+        team_states = team_round_states(data_frame)
+
+        self.assertEqual(list(team_states.columns), TEAM_STATE_COLS)
+        self.assertEqual(len(team_states), len(data_frame))
+
+        adelaide_2013_states = team_states.loc[("Adelaide", 2013), :]
+        # One win and one draw
+        self.assertEqual(list(adelaide_2013_states["cum_win_points"]), [4, 6])
+        self.assertEqual(list(adelaide_2013_states["win_streak"]), [1, 1.5])
+        self.assertEqual(list(adelaide_2013_states["cum_score"]), [85, 162])
+
+        with self.subTest("latest_team_states"):
+            latest_states = latest_team_states(team_states)
+
+            self.assertEqual(
+                sorted(latest_states.index),
+                ["Adelaide", "Brisbane", "Carlton", "Collingwood"],
+            )
+            self.assertEqual(latest_states.loc["Carlton", "year"], 2014)
+
+            round_states = latest_team_states(team_states, year=2013, round_number=1)
+            self.assertTrue((round_states["round_number"] == 1).all())
+
+        with self.subTest("update_team_round_states"):
+            is_history = data_frame["year"] < 2016
+            updated_states = update_team_round_states(
+                team_round_states(data_frame[is_history]), data_frame[~is_history]
+            )
+
+            pd.testing.assert_frame_equal(updated_states, team_states)
+
+    def test_add_team_state_features(self):
+        data_frame = build_team_match_data_frame(MATCHES)
+        is_history = data_frame["year"] < 2014
+        history_data_frame = data_frame[is_history]
+        new_data_frame = data_frame[~is_history]
+        feature_function = add_team_state_features(
+            team_round_states(history_data_frame)
+        )
+
+        make_column_assertions(
+            self,
+            column_names=STATE_FEATURE_COLS + ["ladder_position"],
+            req_cols=("team", "oppo_team", "year", "round_number", "score"),
+            valid_data_frame=new_data_frame,
+            feature_function=feature_function,
+            col_diff=len(STATE_FEATURE_COLS) + 1,
+        )
+
+        full_feature_funcs = [
+            add_result,
+            add_margin,
+            add_shifted_team_features(
+                shift_columns=["score", "oppo_score", "result", "margin"]
+            ),
+            add_cum_win_points,
+            add_cum_percent,
+            add_win_streak,
+            add_elo_rating,
+            add_ladder_position,
+        ]
+        full_data_frame = data_frame
+
+        for full_feature_func in full_feature_funcs:
+            full_data_frame = full_feature_func(full_data_frame)
+
+        incremental_data_frame = feature_function(new_data_frame)
+
+        for feature_col in STATE_FEATURE_COLS + ["ladder_position"]:
+            with self.subTest(feature_col=feature_col):
+                np.testing.assert_allclose(
+                    incremental_data_frame[feature_col],
+                    full_data_frame.loc[new_data_frame.index, feature_col],
+                )
+
+        with self.subTest("with rounds that overlap the team states"):
+            with self.assertRaises(ValueError):
+                feature_function(data_frame)
@@ -0,0 +1,133 @@
+from unittest import TestCase
+import pandas as pd
+import numpy as np
+
+from server.data_processors.team_timeline import (
+    TeamTimeline,
+    active_team_timeline,
+    get_team_timeline,
+    TEAM_GROUP,
+    TEAM_YEAR_GROUP,
+    TEAM_VENUE_GROUP,
+)
+
+TEAMS = ["Adelaide", "Brisbane", "Carlton"]
+VENUES = ["Football Park", "Gabba", "Princes Park"]
+N_ROWS = 60
+
+
+class TestTeamTimeline(TestCase):
+    def setUp(self):
+        np.random.seed(42)
+
+        self.data_frame = (
+            pd.DataFrame(
+                {
+                    "team": np.repeat(TEAMS, N_ROWS // len(TEAMS)),
+                    "year": np.tile(np.repeat([2014, 2015], 10), len(TEAMS)),
+                    "round_number": np.tile(np.arange(1, 11), 2 * len(TEAMS)),
+                    "venue": np.random.choice(VENUES, N_ROWS),
+                    "score": np.random.randint(50, 150, N_ROWS).astype(float),
+                }
+            )
+            # Rows are grouped in data frame order, so they don't have to be sorted
+            .sample(frac=1)
+            .set_index(["team", "year", "round_number"], drop=False)
+            .rename_axis([None, None, None])
+        )
+        self.data_frame.iloc[[3, 17], -1] = np.nan
+        self.timeline = TeamTimeline(self.data_frame)
+
+    def test_grouping(self):
+        grouping = self.timeline.grouping(TEAM_YEAR_GROUP)
+        group_ids = self.data_frame.groupby(["team", "year"]).ngroup().values
+
+        self.assertEqual(list(grouping.group_ids), list(group_ids))
+        self.assertEqual(list(grouping.starts), list(range(0, N_ROWS, 10)))
+        self.assertEqual(list(np.sort(grouping.order)), list(range(N_ROWS)))
+
+        with self.subTest("with the same group columns"):
+            self.assertIs(self.timeline.grouping(["team", "year"]), grouping)
+
+        with self.subTest("with a missing group column"):
+            with self.assertRaises(ValueError):
+                self.timeline.grouping(["team", "oppo_team"])
+
+    def test_shift(self):
+        for group_cols in [TEAM_GROUP, TEAM_VENUE_GROUP]:
+            with self.subTest(group_cols=group_cols):
+                grouping = self.timeline.grouping(group_cols)
+                expected_scores = (
+                    self.data_frame.groupby(list(group_cols))["score"].shift().values
+                )
+
+                np.testing.assert_array_equal(
+                    grouping.shift(self.data_frame["score"].values), expected_scores
+                )
+
+    def test_cumsum(self):
+        grouping = self.timeline.grouping(TEAM_YEAR_GROUP)
+        expected_scores = (
+            self.data_frame.groupby(["team", "year"])["score"].cumsum().values
+        )
+
+        np.testing.assert_allclose(
+            grouping.cumsum(self.data_frame["score"].values), expected_scores
+        )
+
+    def test_rolling_mean(self):
+        grouping = self.timeline.grouping(TEAM_GROUP)
+        window = 5
+        groups = self.data_frame.groupby("team", sort=False)["score"]
+        # Expanding means fill in rows without a full window of non-NaN values
+        expected_scores = (
+            groups.apply(lambda scores: scores.rolling(window).mean())
+            .fillna(groups.apply(lambda scores: scores.expanding(1).mean()))
+            .values
+        )
+
+        np.testing.assert_allclose(
+            grouping.rolling_mean(self.data_frame["score"].values, window),
+            expected_scores,
+        )
+
+    def test_get_team_timeline(self):
+        with active_team_timeline(self.data_frame) as timeline:
+            with self.subTest("with the same rows"):
+                self.assertIs(
+                    get_team_timeline(self.data_frame.assign(new_col=1)), timeline
+                )
+
+            with self.subTest("with different rows"):
+                self.assertIsNot(
+                    get_team_timeline(self.data_frame.sort_index()), timeline
+                )
+
+        with self.subTest("outside of the active context"):
+            self.assertIsNot(get_team_timeline(self.data_frame), timeline)
+
+    def test_opponent_rows(self):
+        data_frame = self.data_frame.assign(
+            oppo_team=self.data_frame["team"].map(
+                {"Adelaide": "Brisbane", "Brisbane": "Adelaide", "Carlton": "Essendon"}
+            )
+        )
+        opponent_rows = TeamTimeline(data_frame).opponent_rows()
+        has_opponent = data_frame["oppo_team"] != "Essendon"
+
+        self.assertTrue((opponent_rows[~has_opponent.values] == -1).all())
+
+        oppo_data_frame = data_frame.iloc[opponent_rows[has_opponent.values]]
+
+        for col, oppo_col in [
+            ("oppo_team", "team"),
+            ("year", "year"),
+            ("round_number", "round_number"),
+        ]:
+            np.testing.assert_array_equal(
+                data_frame[has_opponent][col].values, oppo_data_frame[oppo_col].values
+            )
+
+        with self.subTest("without oppo_team"):
+            with self.assertRaises(ValueError):
+                self.timeline.opponent_rows()